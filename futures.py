@@ -1,11 +1,16 @@
 import datetime
+import logging
 import time
 import concurrent.futures
 
-from cryptography.hazmat.primitives.asymmetric import ed25519
 import json
+import uuid
 import requests
 
+from trading_bot.core.config import COINSWITCH_REST_URL, RATE_LIMIT_ORDER_RESERVE, RATE_LIMIT_RETRIES, RATE_LIMITS
+from trading_bot.core.rate_limit import RequestScheduler, endpoint_class, retry_after_seconds
+from trading_bot.core.signing import Ed25519Signer
+
 
 class ApiTradingClient:
     secret_key = None,
@@ -14,11 +19,29 @@ class ApiTradingClient:
     def __init__(self, secret_key: str, api_key: str):
         self.secret_key = secret_key
         self.api_key = api_key
-        self.base_url = "https://coinswitch.co"
+        self.base_url = COINSWITCH_REST_URL
         #self.base_url = "https://cs-india-uat.coinswitch.co"  # UAT
         self.headers = {
             "Content-Type": "application/json"
         }
+        self._signer = None
+        self._signer_credentials = None
+        self.scheduler = RequestScheduler(RATE_LIMITS, RATE_LIMIT_ORDER_RESERVE)
+        self.max_retries = RATE_LIMIT_RETRIES
+
+    @property
+    def signer(self):
+        '''
+          The Ed25519 signer for this client. The key is parsed once and reused.
+
+          Raises:
+            ValueError: If the secret key is not a valid Ed25519 private key.
+        '''
+        credentials = (self.api_key, self.secret_key)
+        if self._signer is None or self._signer_credentials != credentials:
+            self._signer = Ed25519Signer(self.api_key, self.secret_key)
+            self._signer_credentials = credentials
+        return self._signer
 
     def call_api(self, url: str, method: str, headers: dict = None, payload: dict = {}):
         '''
@@ -33,16 +56,13 @@ class ApiTradingClient:
         Returns:
           json: The response of the request
         '''
+        return self._send(url, method, headers, payload).json()
+
+    def _send(self, url: str, method: str, headers: dict = None, payload: dict = {}):
         final_headers = self.headers.copy()
         if headers is not None:
             final_headers.update(headers)
-
-        response = requests.request(method, url, headers=headers, json=payload)
-        print("STATUS CODE", response.status_code)
-        if response.status_code == 429:
-            print("rate limiting")
-        # print(response.text)
-        return response.json()
+        return requests.request(method, url, headers=final_headers, json=payload)
 
     def signatureMessage(self, method: str, url: str, payload: dict, epoch_time=""):
         '''
@@ -72,14 +92,11 @@ class ApiTradingClient:
             str: The signature of the request.
         '''
         try:
-            request_string = bytes(request_string, 'utf-8')
-            secret_key_bytes = bytes.fromhex(secret_key)
-            secret_key = ed25519.Ed25519PrivateKey.from_private_bytes(secret_key_bytes)
-            signature_bytes = secret_key.sign(request_string)
-            signature = signature_bytes.hex()
+            if secret_key == self.secret_key:
+                return self.signer.sign(request_string)
+            return Ed25519Signer(self.api_key, secret_key).sign(request_string)
         except ValueError:
             return False
-        return signature
 
     def make_request(self, method: str, endpoint: str, payload: dict = {}, params: dict = {}):
         '''
@@ -101,34 +118,30 @@ class ApiTradingClient:
         decoded_endpoint = endpoint
         if method == "GET" and len(params) != 0:
             endpoint += '?' + '&'.join([f"{key}={value}" for key, value in params.items()])
-            print("endpoint:", endpoint)
             decoded_string = endpoint.replace('+', ' ')
             decoded_endpoint = requests.utils.unquote(decoded_string)
-            print("decoded_endpoint:", decoded_endpoint)
-
-        epoch_time = str(int(datetime.datetime.now().timestamp() * 1000))
-        print(epoch_time)
-
-        signature_msg = self.signatureMessage(method, decoded_endpoint, payload, epoch_time)
-        print("Signature msg:", signature_msg)
-        signature = self.get_signature_of_request(self.secret_key, signature_msg)
-        if not signature:
-            return {"message": "Please Enter Valid Keys"}
-        print("Signature is: ", signature)
-        headers = {
-            "X-AUTH-SIGNATURE": signature,
-            "X-AUTH-APIKEY": api_key,
-            "X-AUTH-EPOCH": epoch_time,
-            "X-REQUEST-ID": "canary-app-abhi"+epoch_time
-        }
-        print(headers)
 
+        lane = endpoint_class(method, decoded_endpoint)
         url = f"{self.base_url}{endpoint}"
-        print(url)
-        # print(payload)
-        response = self.call_api(url, method, headers=headers, payload=payload)
-        # print(response)
-        return json.dumps(response, indent=4)
+        for attempt in range(self.max_retries + 1):
+            # Waits for the rate-limit budget; orders go ahead of everything else.
+            self.scheduler.acquire_sync(lane)
+            epoch_time = str(int(datetime.datetime.now().timestamp() * 1000))
+            try:
+                headers = self.signer.sign_request(method, decoded_endpoint, timestamp=epoch_time,
+                                                   request_id="canary-app-abhi-" + uuid.uuid4().hex)
+            except ValueError:
+                return {"message": "Please Enter Valid Keys"}
+
+            response = self._send(url, method, headers=headers, payload=payload)
+            if response.status_code != 429:
+                self.scheduler.succeeded(lane)
+                break
+            pause = self.scheduler.rate_limited_by_server(lane, retry_after_seconds(response.headers.get("Retry-After")))
+            logging.warning(f"rate limiting on {decoded_endpoint}, backing off for {pause:.1f}s")
+            if attempt == self.max_retries:
+                break
+        return json.dumps(response.json(), indent=4)
 
     def remove_trailing_zeros(self, dictionary):
         for key, value in dictionary.items():
@@ -163,7 +176,6 @@ class ApiTradingClient:
     # Orders
     def futures_create_order(self, payload: dict = {}):
         # payload = self.remove_trailing_zeros(payload)
-        print(payload)
         return self.make_request("POST", "/trade/api/v2/futures/order", payload=payload)
 
     def futures_cancel_order(self, payload: dict = {}):
@@ -6,10 +6,13 @@ setup(
     packages=find_packages(),
     install_requires=[
         "requests",
+        "httpx",
         "websockets",
+        "aiohttp",
         "python-telegram-bot",
         "python-dotenv",
         "pandas",
+        "numpy",
         "pytest",
         "cryptography==40.0.2",
         "python-socketio==5.5.1",
@@ -1,30 +1,62 @@
 import asyncio
 import argparse
 from trading_bot.core.trading_engine import TradingEngine
+from trading_bot.core.config import MARKET_DATA_PAIRS, SHARD_ACCOUNTS, SHARDS, TELEGRAM_BOT_TOKEN
 from trading_bot.core.console import ConsoleInterface
 from trading_bot.core.logging_config import setup_logging
+from trading_bot.core.shards import ShardSupervisor
+from trading_bot.core.telegram_bot import TelegramBot
 
 async def main():
     parser = argparse.ArgumentParser(description='Crypto Trading Bot')
     parser.add_argument('--api-key', type=str, help='CoinSwitch Pro API Key')
     parser.add_argument('--api-secret', type=str, help='CoinSwitch Pro API Secret')
+    parser.add_argument('--replay', type=str, metavar='DIR', help='Replay a stream recording instead of trading live')
+    parser.add_argument('--replay-speed', type=float, default=1.0,
+                        help='Replay speed: 1 = real time, 10 = ten times faster, 0 = as fast as possible')
+    parser.add_argument('--shards', type=int, default=SHARDS,
+                        help='Worker processes to split MARKET_DATA_PAIRS across by symbol (1 = one process)')
     args = parser.parse_args()
 
     setup_logging()
-    engine = TradingEngine()
-    # Set the API key and secret if they are provided as arguments
-    if args.api_key:
-        engine.api_client.api_key = args.api_key
-    if args.api_secret:
-        engine.api_client.api_secret = args.api_secret
+    if args.shards > 1 and not args.replay:
+        # The supervisor stands in for the engine; each shard runs its own in a worker process.
+        accounts = SHARD_ACCOUNTS or ([(args.api_key, args.api_secret)] if args.api_key else [])
+        engine = ShardSupervisor(MARKET_DATA_PAIRS, args.shards, accounts)
+    else:
+        engine = TradingEngine()
+        # Set the API key and secret if they are provided as arguments
+        if args.api_key:
+            engine.api_client.api_key = args.api_key
+        if args.api_secret:
+            engine.api_client.api_secret = args.api_secret
+
+    if args.replay:
+        replayer = await engine.replay(args.replay, args.replay_speed)
+        print(f"Replayed {replayer.frames} frame(s); the strategy produced {len(replayer.signals)} signal(s).")
+        return
 
     console = ConsoleInterface(engine)
 
     # Start the trading engine in a separate task
     engine_task = asyncio.create_task(engine.start())
-    # Start the console interface
-    await console.start()
+    # The Telegram bot polls on this loop too, so commands are answered while the engine runs
+    telegram_task = None
+    if TELEGRAM_BOT_TOKEN:
+        telegram_task = asyncio.create_task(TelegramBot(engine).run())
+    # Start the console interface; a /stop from Telegram ends the session too
+    console_task = asyncio.create_task(console.start())
+    stopped = asyncio.create_task(engine.stopped.wait())
+    await asyncio.wait([console_task, stopped], return_when=asyncio.FIRST_COMPLETED)
+    stopped.cancel()
+    if not console_task.done():
+        # The console thread is still waiting on input() and only ends with it.
+        print("Trading engine stopped. Press Enter to exit.")
+        console_task.cancel()
 
+    if telegram_task is not None:
+        telegram_task.cancel()
+        await asyncio.gather(telegram_task, return_exceptions=True)
     # Wait for the engine to finish
     await engine_task
 
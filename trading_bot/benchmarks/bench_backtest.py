@@ -0,0 +1,32 @@
+"""Backtest speed over a year of 1-minute bars, vectorized vs. incremental.
+
+Run with ``python -m trading_bot.benchmarks.bench_backtest``.
+"""
+import numpy as np
+from trading_bot.core.backtest import run_backtest
+
+BARS = 525_600  # One year of 1-minute candles.
+STRATEGY = 'trading_bot.strategies.strategy'
+
+
+def _klines(n, seed=11):
+    rng = np.random.default_rng(seed)
+    close = 30000 + np.cumsum(rng.normal(0, 8, n))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    return {
+        'open_time': np.arange(n, dtype=np.float64) * 60_000, 'open': open_,
+        'high': np.maximum(open_, close) + 5, 'low': np.minimum(open_, close) - 5,
+        'close': close, 'volume': rng.uniform(1, 5, n),
+    }
+
+
+def main():
+    klines = _klines(BARS)
+    print(f"{'mode':>12} {'seconds':>9} {'trades':>8} {'pnl':>10}")
+    for mode in ('vectorized', 'incremental'):
+        result = run_backtest(STRATEGY, klines, mode=mode)
+        print(f"{mode:>12} {result.elapsed:>9.2f} {result.trades:>8} {result.pnl:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
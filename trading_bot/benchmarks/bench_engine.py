@@ -0,0 +1,179 @@
+"""End-to-end latency and throughput of TradingEngine against the local fake exchange.
+
+Starts ``fake_exchange`` in a subprocess, points an engine at it and streams
+candles for ``--duration`` seconds, with a strategy that signals on every
+``--signal-every``-th update. Reports:
+
+* tick-to-signal: from the exchange sending a candle update to the engine
+  queueing the order its strategy asked for;
+* signal-to-ack: from that signal to the order acknowledgement;
+* messages/sec: candle updates the engine processed, next to those the
+  exchange sent and the inbound queue coalesced.
+
+Client rate limits are lifted so they do not dominate the figures. With
+``--speed 0`` the exchange streams as fast as it can, which measures
+throughput; tick-to-signal then includes time spent queued in the socket.
+
+Run with ``python -m trading_bot.benchmarks.bench_engine``.
+"""
+import argparse
+import asyncio
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from trading_bot.core import trading_engine
+from trading_bot.core.config import RATE_LIMITS
+from trading_bot.core.execution import LatencyStats
+from trading_bot.core.kline_cache import KlineCache
+from trading_bot.core.market_data import split_pair
+from trading_bot.core.rate_limit import RequestScheduler
+
+
+class SignalEvery:
+    """A streaming strategy that alternates BUY and SELL on every n-th update."""
+
+    def __init__(self, n, symbol):
+        self.n = n
+        self.symbol = symbol
+        self.updates = 0
+        self.warming_up = True
+
+    def on_bar(self, bar, new_bar=True, symbol=None, interval=None):
+        self.updates += 1
+        if self.warming_up or self.updates % self.n:
+            return None
+        side = "BUY" if self.updates // self.n % 2 else "SELL"
+        return {"action": side, "symbol": self.symbol, "quantity": 0.001}
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_exchange(args, port):
+    command = [sys.executable, "-m", "trading_bot.benchmarks.fake_exchange", "--port", str(port),
+               "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+               "--speed", str(args.speed), "--ticks-per-bar", str(args.ticks_per_bar)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    # The exchange prints one line once it is listening.
+    if not process.stdout.readline():
+        raise RuntimeError("The fake exchange did not start")
+    return process
+
+
+def _instrument(engine):
+    """Wraps the engine's market-data handler and order submission to time them."""
+    tick_to_signal = LatencyStats()
+    counters = {"updates": 0, "sent_ns": None}
+    handle_market_event = engine._handle_market_event
+    execute_trade = engine.execute_trade
+
+    async def timed_handle(event):
+        data = event.data.get("data", event.data) if isinstance(event.data, dict) else {}
+        counters["updates"] += 1
+        counters["sent_ns"] = data.get("sent_ns")
+        await handle_market_event(event)
+
+    def timed_execute(trade_signal):
+        if counters["sent_ns"]:
+            tick_to_signal.add((time.time_ns() - counters["sent_ns"]) / 1e6)
+        return execute_trade(trade_signal)
+
+    engine._handle_market_event = timed_handle
+    engine.execute_trade = timed_execute
+    return tick_to_signal, counters
+
+
+async def run(args, url, kline_dir):
+    pairs = [pair.strip().upper() for pair in args.pairs.split(",")]
+    trading_engine.MARKET_DATA_PAIRS = pairs
+    engine = trading_engine.TradingEngine()
+    engine.strategy = strategy = SignalEvery(args.signal_every, split_pair(pairs[0])[0])
+    client = engine.api_client
+    client.api_key, client.api_secret = "bench", "bench"
+    client.base_rest_url = url
+    client.base_ws_url = url.replace("http://", "ws://")
+    client.scheduler = RequestScheduler({name: 1e6 for name in RATE_LIMITS})
+    engine.market_data.url = url
+    engine.kline_cache = engine.kline_downloader.cache = KlineCache(kline_dir)
+    # Fetch the fake instruments but do not save them over the real ones.
+    engine.instruments.path = None
+    tick_to_signal, counters = _instrument(engine)
+
+    task = asyncio.create_task(engine.start())
+    deadline = time.monotonic() + 30
+    while not engine.market_data.connected or client._live_connections == 0:
+        if task.done() or time.monotonic() > deadline:
+            task.result()
+            raise RuntimeError("The engine did not connect to the fake exchange")
+        await asyncio.sleep(0.05)
+
+    strategy.warming_up = False
+    updates_before = counters["updates"]
+    coalesced_before = sum(queue.coalesced for queue in engine.market_data.queues.values())
+    start = time.perf_counter()
+    await asyncio.sleep(args.duration)
+    elapsed = time.perf_counter() - start
+    updates = counters["updates"] - updates_before
+    coalesced = sum(queue.coalesced for queue in engine.market_data.queues.values()) - coalesced_before
+
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    await engine.executor.stop(drain=False)
+    await engine.account.stop()
+    await engine.market_data.disconnect()
+    async with httpx.AsyncClient() as http:
+        exchange_stats = (await http.get(url + "/stats")).json()
+    await client.aclose()
+    return {"elapsed": elapsed, "updates": updates, "coalesced": coalesced, "pairs": len(pairs),
+            "tick_to_signal": tick_to_signal.summary(), "signal_to_ack": engine.execution_stats(),
+            "exchange": exchange_stats, "account": engine.account.stats()}
+
+
+def _line(name, summary):
+    if not summary["count"]:
+        return f"{name:<15} no samples"
+    return (f"{name:<15} p50 {summary['p50_ms']:7.2f} ms   p95 {summary['p95_ms']:7.2f} ms   "
+            f"p99 {summary['p99_ms']:7.2f} ms   (n={summary['count']})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="TradingEngine latency and throughput against a local exchange.")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to measure")
+    parser.add_argument("--pairs", default="BTCUSDT_1,ETHUSDT_1")
+    parser.add_argument("--speed", type=float, default=60.0, help="market data speed-up, 0 = as fast as possible")
+    parser.add_argument("--ticks-per-bar", type=int, default=200)
+    parser.add_argument("--signal-every", type=int, default=50, help="updates between strategy signals")
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="REST latency injected by the exchange")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    port = _free_port()
+    process = _start_exchange(args, port)
+    try:
+        with tempfile.TemporaryDirectory() as kline_dir:
+            result = asyncio.run(run(args, f"http://127.0.0.1:{port}", kline_dir))
+    finally:
+        process.terminate()
+        process.wait()
+
+    print(f"Fake exchange: {args.latency_ms:g} ms REST latency, {args.speed:g}x speed, "
+          f"{args.ticks_per_bar} updates per bar, {result['pairs']} pair(s)")
+    print(f"Processed {result['updates']:,} updates in {result['elapsed']:.1f} s: "
+          f"{result['updates'] / result['elapsed']:,.0f} msg/s "
+          f"(exchange sent {result['exchange']['candles_sent']:,} in total, {result['coalesced']:,} coalesced)")
+    print(_line("tick-to-signal", result["tick_to_signal"]))
+    print(_line("signal-to-ack", result["signal_to_ack"]))
+    print(f"Account mirror: {result['account']['events']} stream event(s), "
+          f"{result['account']['open_orders']} open order(s)")
+
+
+if __name__ == "__main__":
+    main()
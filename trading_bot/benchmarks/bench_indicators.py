@@ -0,0 +1,52 @@
+"""Per-tick latency of the DataFrame strategy path vs. the streaming indicators.
+
+Run with ``python -m trading_bot.benchmarks.bench_indicators``.
+"""
+import time
+import numpy as np
+import pandas as pd
+from trading_bot.strategies import strategy
+
+HISTORY_SIZES = (1_000, 10_000, 100_000)
+
+
+def _bars(n, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 30000 + np.cumsum(rng.normal(0, 25, n))
+    return pd.DataFrame({
+        'open': close, 'high': close + 10, 'low': close - 10, 'close': close,
+        'volume': rng.uniform(1, 5, n),
+    })
+
+
+def bench_dataframe(df, ticks):
+    start = time.perf_counter()
+    for i in range(ticks):
+        df.iat[-1, 3] = df.iat[-1, 3] + (1 if i % 2 else -1)
+        strategy.check_strategy(df)
+    return (time.perf_counter() - start) / ticks
+
+
+def bench_streaming(df, ticks):
+    strategy.indicators = {}
+    for bar in df.to_dict('records'):
+        strategy.on_bar(bar)
+    bar = dict(df.iloc[-1])
+    start = time.perf_counter()
+    for i in range(ticks):
+        bar['close'] += 1 if i % 2 else -1
+        strategy.on_bar(bar, new_bar=False)
+    return (time.perf_counter() - start) / ticks
+
+
+def main():
+    print(f"{'bars':>8} {'dataframe (us/tick)':>20} {'streaming (us/tick)':>20} {'speedup':>9}")
+    for n in HISTORY_SIZES:
+        df = _bars(n)
+        df_latency = bench_dataframe(df, ticks=200 if n < 100_000 else 50)
+        stream_latency = bench_streaming(df, ticks=100_000)
+        print(f"{n:>8} {df_latency * 1e6:>20.1f} {stream_latency * 1e6:>20.2f} {df_latency / stream_latency:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Candle warm-up for 50 symbols from the local kline cache.
+
+Run with ``python -m trading_bot.benchmarks.bench_kline_cache``.
+"""
+import tempfile
+import time
+import numpy as np
+from trading_bot.core.candle_store import CandleStore
+from trading_bot.core.kline_cache import KlineCache
+
+SYMBOLS = 50
+BARS = 5_000
+
+
+def _bars(n, seed):
+    rng = np.random.default_rng(seed)
+    close = 30000 + np.cumsum(rng.normal(0, 25, n))
+    return {'open_time': np.arange(n, dtype=np.float64) * 60_000, 'open': close, 'high': close + 10,
+            'low': close - 10, 'close': close, 'volume': rng.uniform(1, 5, n)}
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = KlineCache(directory)
+        symbols = [f"SYM{i}USDT" for i in range(SYMBOLS)]
+        for i, symbol in enumerate(symbols):
+            cache.write(symbol, '5', _bars(BARS, i))
+
+        store = CandleStore(BARS)
+        start = time.perf_counter()
+        for symbol in symbols:
+            store.get(symbol, '5').extend(cache.load(symbol, '5', limit=BARS))
+        elapsed = time.perf_counter() - start
+        print(f"Warmed up {SYMBOLS} symbols x {BARS} bars from disk in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
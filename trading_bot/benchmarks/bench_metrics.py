@@ -0,0 +1,33 @@
+"""Cost of recording one hot-path latency sample.
+
+Run with ``python -m trading_bot.benchmarks.bench_metrics``.
+"""
+import time
+import numpy as np
+from trading_bot.core.metrics import Histogram
+
+SAMPLES = 1_000_000
+
+
+def main():
+    samples = np.random.default_rng(0).lognormal(11, 1.5, SAMPLES).astype(np.int64).tolist()
+    histogram = Histogram()
+    start = time.perf_counter_ns()
+    for sample in samples:
+        histogram.record(sample)
+    record = (time.perf_counter_ns() - start) / SAMPLES
+
+    start = time.perf_counter_ns()
+    for _ in range(SAMPLES // 10):
+        histogram.record_since(time.perf_counter_ns())
+    timed = (time.perf_counter_ns() - start) / (SAMPLES // 10)
+
+    start = time.perf_counter()
+    histogram.summary()
+    summary = (time.perf_counter() - start) * 1000
+    print(f"record: {record:.0f} ns/sample, timestamp + record_since: {timed:.0f} ns/sample, "
+          f"summary: {summary:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Order book update throughput.
+
+Run with ``python -m trading_bot.benchmarks.bench_order_book``.
+"""
+import time
+import numpy as np
+from trading_bot.core.order_book import OrderBook
+
+UPDATES = 200_000
+LEVELS = 1000
+
+
+def main():
+    rng = np.random.default_rng(1)
+    book = OrderBook("BTCUSDT")
+    mid = 30000.0
+    book.apply_snapshot(bids=[(mid - 0.1 * (i + 1), 1.0) for i in range(LEVELS)],
+                        asks=[(mid + 0.1 * (i + 1), 1.0) for i in range(LEVELS)])
+    # Updates cluster near the top of the book, as they do in live data.
+    offsets = np.round(np.abs(rng.normal(0, 20, UPDATES)).astype(int) * 0.1 + 0.1, 1).tolist()
+    sizes = np.where(rng.random(UPDATES) < 0.2, 0.0, rng.uniform(0.1, 5, UPDATES)).tolist()
+    sides = (rng.random(UPDATES) < 0.5).tolist()
+
+    start = time.perf_counter()
+    for offset, size, is_bid in zip(offsets, sizes, sides):
+        if is_bid:
+            book.bids.set(mid - offset, size)
+        else:
+            book.asks.set(mid + offset, size)
+    elapsed = time.perf_counter() - start
+    print(f"level updates: {UPDATES / elapsed:>12,.0f} /s")
+
+    start = time.perf_counter()
+    for i in range(0, UPDATES, 10):
+        book.apply_update([(mid - offsets[i], sizes[i])], [(mid + offsets[i + 1], sizes[i + 1])],
+                          first_id=i - 9, last_id=i)
+    elapsed = time.perf_counter() - start
+    assert book.synced
+    print(f"diff messages: {UPDATES / 10 / elapsed:>12,.0f} /s (2 levels each)")
+
+    start = time.perf_counter()
+    for _ in range(100_000):
+        book.best_bid(), book.best_ask(), book.vwap_to_fill("BUY", 2.5)
+    elapsed = time.perf_counter() - start
+    print(f"top-of-book + vwap reads: {100_000 / elapsed:>12,.0f} /s")
+
+
+if __name__ == "__main__":
+    main()
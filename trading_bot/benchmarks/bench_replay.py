@@ -0,0 +1,63 @@
+"""Recording cost per frame, and replay throughput of TradingEngine from the binary log.
+
+Records synthetic candle frames for a few symbols, then replays them into an
+engine as fast as it keeps up. Pass a directory to replay a real recording
+(see RECORD_DIR) instead.
+
+Run with ``python -m trading_bot.benchmarks.bench_replay [DIRECTORY]``.
+"""
+import asyncio
+import sys
+import tempfile
+import time
+
+from trading_bot.core.recorder import Recorder, read_records
+from trading_bot.core.trading_engine import TradingEngine
+
+FRAMES = 100_000
+SYMBOLS = ("BTCUSDT", "ETHUSDT", "SOLUSDT", "XRPUSDT")
+
+
+def _frame(i):
+    symbol = SYMBOLS[i % len(SYMBOLS)]
+    close = 100 + (i % 97) / 10
+    return {"pair": f"{symbol}_1", "data": {"symbol": symbol, "interval": "1", "start_time": i // 40 * 60_000,
+                                            "open": 100, "high": 110, "low": 90, "close": close, "volume": 1}}
+
+
+def record(directory):
+    recorder = Recorder(directory, segment_bytes=4 << 20)
+    frames = [_frame(i) for i in range(FRAMES)]
+    start = time.perf_counter()
+    for i, frame in enumerate(frames):
+        recorder.record("candles", frame, received_ns=1_700_000_000_000_000_000 + i * 100_000)
+    recorder.close()
+    elapsed = time.perf_counter() - start
+    print(f"Recorded {FRAMES:,} frames into {recorder.segments} segment(s), "
+          f"{recorder.bytes / FRAMES:.0f} bytes and {elapsed / FRAMES * 1e6:.2f} us per frame")
+
+
+async def replay(directory):
+    start = time.perf_counter()
+    frames = sum(1 for _ in read_records(directory))
+    print(f"Read {frames:,} frames through mmap in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    engine = TradingEngine()
+    start = time.perf_counter()
+    replayer = await engine.replay(directory, speed=0)
+    elapsed = time.perf_counter() - start
+    print(f"Replayed {replayer.frames:,} frames through the engine in {elapsed:.2f} s: "
+          f"{replayer.frames / elapsed:,.0f} frames/s, {len(replayer.signals):,} signal(s)")
+
+
+def main():
+    if len(sys.argv) > 1:
+        asyncio.run(replay(sys.argv[1]))
+        return
+    with tempfile.TemporaryDirectory() as directory:
+        record(directory)
+        asyncio.run(replay(directory))
+
+
+if __name__ == "__main__":
+    main()
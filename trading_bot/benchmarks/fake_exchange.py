@@ -0,0 +1,656 @@
+"""Local stand-in for the CoinSwitch exchange, for offline latency and throughput runs.
+
+One aiohttp server on one port provides:
+
+* the REST paths used by CoinSwitchProApiClient and futures.ApiTradingClient.
+  Orders are acknowledged at once and filled ``fill_delay`` seconds later.
+  Orders placed on ``/order`` and on ``/futures/order`` are kept apart
+  (``orders`` and ``futures_orders``), so each family of endpoints only sees
+  its own;
+  prices must be multiples of 0.01 and quantities of 0.001, as instrument_info
+  says; signatures are not checked;
+* the private user-data websocket at ``/ws/<listenKey>``, which pushes
+  order, account and leverage updates;
+* the socket.io candle feed, from a synthetic price path or replayed from a
+  kline cache directory, at ``speed`` times real time (0 = as fast as possible);
+* socket.io order-book, ticker and trade feeds, updated every
+  ``book_interval`` seconds. An order-book subscriber first gets a full
+  snapshot, then diffs carrying ``U``/``u``/``pu`` update ids. The REST depth
+  endpoint serves the same book with its ``lastUpdateId``, so a client that
+  resyncs from it can carry on with the diffs.
+
+Only the websocket transport of Socket.IO is spoken, which is all
+MarketDataService uses.
+
+Each REST response is delayed by ``latency`` seconds plus up to ``jitter``.
+Candle updates carry the server's send time (``time.time_ns``) in ``sent_ns``.
+
+Run it on its own and point the bot at it through COINSWITCH_REST_URL,
+COINSWITCH_WS_URL and MARKET_DATA_URL::
+
+    python -m trading_bot.benchmarks.fake_exchange --port 8765 --latency-ms 5 --speed 60
+"""
+import argparse
+import asyncio
+import functools
+import itertools
+import json
+import logging
+import math
+import random
+import time
+import uuid
+from decimal import Decimal
+
+from aiohttp import WSMsgType, web
+
+from trading_bot.core.candle_store import COLUMNS
+from trading_bot.core.kline_cache import KlineCache, interval_ms
+from trading_bot.core.market_data import (EVENT_CANDLES, EVENT_ORDER_BOOK, EVENT_TICKER_INFO, EVENT_TRADES,
+                                          NAMESPACE, SOCKET_PATH, split_pair)
+
+API = "/trade/api/v2"
+FUTURES = API + "/futures"
+# Symbols listed by instrument_info when no symbol is asked for.
+INSTRUMENTS = ("BTCUSDT", "ETHUSDT", "SOLUSDT", "XRPUSDT")
+
+
+def synthetic_price(symbol, time_ms):
+    """A smooth, deterministic price path, so history and live ticks always agree."""
+    base = 1_000 * (1 + sum(map(ord, symbol)) % 50)
+    minutes = time_ms / 60_000
+    return base * (1 + 0.02 * math.sin(minutes / 720) + 0.005 * math.sin(minutes / 45 + 1)
+                   + 0.001 * math.sin(minutes / 3 + 2))
+
+
+def synthetic_bar(symbol, open_time, step, elapsed=None):
+    """The bar opening at ``open_time``, as formed ``elapsed`` ms into it (the whole bar by default)."""
+    elapsed = step if elapsed is None else elapsed
+    prices = [synthetic_price(symbol, open_time + elapsed * i / 8) for i in range(9)]
+    volume = (1 + (open_time // step) % 5) * elapsed / step
+    return {"open_time": open_time, "open": prices[0], "high": max(prices), "low": min(prices),
+            "close": prices[-1], "volume": volume}
+
+
+class MarketSource:
+    """Bars for the klines endpoint and the candle feed: synthetic, or replayed from a KlineCache."""
+
+    def __init__(self, replay_dir=None):
+        self.cache = KlineCache(replay_dir) if replay_dir else None
+
+    def klines(self, symbol, interval, start_time=None, end_time=None, limit=1000):
+        if self.cache is not None:
+            columns = self.cache.load(symbol, interval, start_time, end_time, limit)
+            return [dict(zip(COLUMNS, row)) for row in zip(*(columns[column].tolist() for column in COLUMNS))]
+        step = interval_ms(interval)
+        last_closed = (int(time.time() * 1000) // step - 1) * step
+        end_time = last_closed if end_time is None else min(int(end_time), last_closed)
+        start_time = end_time - (limit - 1) * step if start_time is None else -(-int(start_time) // step) * step
+        open_times = range(start_time, end_time + 1, step)[:limit]
+        return [synthetic_bar(symbol, open_time, step) for open_time in open_times]
+
+    def updates(self, symbol, interval, ticks_per_bar):
+        """Yields (simulated time in ms, bar) for every update of every bar, the forming ones first."""
+        step = interval_ms(interval)
+        if self.cache is not None:
+            for bar in self.klines(symbol, interval, limit=None):
+                for tick in range(1, ticks_per_bar + 1):
+                    yield bar["open_time"] + step * tick / ticks_per_bar, _partial(bar, tick / ticks_per_bar)
+            return
+        for open_time in itertools.count(int(time.time() * 1000) // step * step, step):
+            for tick in range(1, ticks_per_bar + 1):
+                elapsed = step * tick / ticks_per_bar
+                yield open_time + elapsed, synthetic_bar(symbol, open_time, step, elapsed)
+
+
+def _partial(bar, fraction):
+    # A replayed bar as formed part of the way through: close moves from open towards the final close.
+    if fraction >= 1:
+        return dict(bar)
+    close = bar["open"] + (bar["close"] - bar["open"]) * fraction
+    return {**bar, "high": max(bar["open"], close), "low": min(bar["open"], close), "close": close,
+            "volume": bar["volume"] * fraction}
+
+
+class FakeDepth:
+    """The order book of one symbol: ``levels`` price levels a side around the synthetic price.
+
+    Each ``step`` moves the ladder to the current price and resizes a few
+    levels, and returns what changed as one diff.
+    """
+
+    def __init__(self, symbol, rng, levels=20):
+        self.symbol = symbol
+        self.levels = levels
+        self._random = rng
+        self.update_id = int(time.time() * 1000)
+        price = synthetic_price(symbol, time.time() * 1000)
+        # A power of ten near a basis point of the price, so levels stay on one grid as the price moves.
+        self.tick = 10.0 ** math.floor(math.log10(price * 1e-4))
+        self.bids, self.asks = self._ladder({}, {})
+
+    def _ladder(self, bids, asks):
+        mid = round(synthetic_price(self.symbol, time.time() * 1000) / self.tick)
+        sides = []
+        for old, sign in ((bids, -1), (asks, 1)):
+            prices = [round((mid + sign * level) * self.tick, 10) for level in range(1, self.levels + 1)]
+            sides.append({price: old.get(price) or self._size(level) for level, price in enumerate(prices, 1)})
+        return sides
+
+    def _size(self, level):
+        return round(level * (0.5 + self._random.random()), 3)
+
+    def step(self):
+        """Moves the book on. Returns the diff in depthUpdate form."""
+        bids, asks = self._ladder(self.bids, self.asks)
+        for side in (bids, asks):
+            for level, price in enumerate(self._random.sample(sorted(side), 2), 1):
+                side[price] = self._size(level)
+        diff = {"symbol": self.symbol, "E": int(time.time() * 1000), "U": self.update_id + 1,
+                "u": self.update_id + 1, "pu": self.update_id}
+        for key, old, new in (("b", self.bids, bids), ("a", self.asks, asks)):
+            diff[key] = ([[str(price), "0"] for price in old if price not in new]
+                         + [[str(price), str(size)] for price, size in new.items() if old.get(price) != size])
+        self.bids, self.asks = bids, asks
+        self.update_id += 1
+        return diff
+
+    def snapshot(self, limit=None):
+        bids = sorted(self.bids.items(), reverse=True)[:limit]
+        asks = sorted(self.asks.items())[:limit]
+        return {"symbol": self.symbol, "timestamp": int(time.time() * 1000), "lastUpdateId": self.update_id,
+                "bids": [[str(price), str(size)] for price, size in bids],
+                "asks": [[str(price), str(size)] for price, size in asks]}
+
+
+class FakeExchange:
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, fill_delay=0.0, speed=1.0,
+                 ticks_per_bar=10, replay_dir=None, balance=10_000.0, seed=None, book_interval=0.1):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.fill_delay = fill_delay
+        self.speed = speed
+        self.ticks_per_bar = ticks_per_bar
+        self.book_interval = book_interval
+        self.market = MarketSource(replay_dir)
+        self.balance = balance
+        self.orders = {}
+        self.futures_orders = {}
+        self._client_order_ids = set()
+        self.positions = {}
+        self.leverage = {}
+        self.listen_keys = set()
+        self.requests = 0
+        self.candles_sent = 0
+        self.market_sent = 0
+        self.private_sent = 0
+        self._random = random.Random(seed)
+        self._order_ids = itertools.count(1)
+        self._private_sockets = set()
+        self._feeds = {}
+        self._rooms = {}
+        self._depths = {}
+        self._tasks = set()
+        self._runner = None
+
+        self.app = web.Application(middlewares=[self._inject_latency])
+        self.app.add_routes([
+            web.get(SOCKET_PATH + "/", self._market_socket),
+            web.get(API + "/ping", self._ping),
+            web.get(API + "/validate/keys", self._validate_keys),
+            web.post(API + "/user/listenKey", self._listen_key),
+            web.get(API + "/user/portfolio", self._portfolio),
+            web.post(API + "/order", functools.partial(self._create_order, self.orders)),
+            web.delete(API + "/order", functools.partial(self._cancel_order, self.orders)),
+            web.get(API + "/order", functools.partial(self._get_order, self.orders)),
+            web.get(API + "/orders", functools.partial(self._open_orders, self.orders)),
+            web.get(FUTURES + "/order_book", self._order_book),
+            web.get(FUTURES + "/klines", self._klines),
+            web.get(FUTURES + "/trades", self._trades),
+            web.get(FUTURES + "/ticker", self._ticker),
+            web.get(FUTURES + "/all-pairs/ticker", self._ticker),
+            web.get(FUTURES + "/instrument_info", self._instrument_info),
+            web.post(FUTURES + "/order", functools.partial(self._create_order, self.futures_orders)),
+            web.delete(FUTURES + "/order", functools.partial(self._cancel_order, self.futures_orders)),
+            web.get(FUTURES + "/order", functools.partial(self._get_order, self.futures_orders)),
+            web.post(FUTURES + "/orders/open", functools.partial(self._open_orders, self.futures_orders)),
+            web.post(FUTURES + "/orders/closed", self._closed_orders),
+            web.get(FUTURES + "/positions", self._positions),
+            web.get(FUTURES + "/transactions", self._transactions),
+            web.get(FUTURES + "/wallet_balance", self._wallet_balance),
+            web.get(FUTURES + "/leverage", self._get_leverage),
+            web.post(FUTURES + "/leverage", self._set_leverage),
+            web.post(FUTURES + "/add_margin", self._add_margin),
+            web.post(FUTURES + "/cancel_all", self._cancel_all),
+            web.get("/ws/{listen_key}", self._private_stream),
+            web.get("/stats", self._stats),
+        ])
+
+    @property
+    def rest_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def ws_url(self):
+        return f"ws://{self.host}:{self.port}"
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app, shutdown_timeout=1.0)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        logging.info(f"Fake exchange listening on {self.rest_url}")
+
+    async def stop(self):
+        for task in list(self._feeds.values()) + list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._feeds.values(), *self._tasks, return_exceptions=True)
+        self._feeds.clear()
+        for ws in list(self._private_sockets) + [ws for members in self._rooms.values() for ws in members]:
+            await ws.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def stats(self):
+        orders = [*self.orders.values(), *self.futures_orders.values()]
+        return {"requests": self.requests, "candles_sent": self.candles_sent, "market_sent": self.market_sent,
+                "private_sent": self.private_sent,
+                "orders": len(orders), "open_orders": sum(order["status"] == "OPEN" for order in orders)}
+
+    def _spawn(self, coroutine):
+        task = asyncio.ensure_future(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    @web.middleware
+    async def _inject_latency(self, request, handler):
+        if request.path.startswith(API):
+            self.requests += 1
+            delay = self.latency + self.jitter * self._random.random()
+            if delay > 0:
+                # The request has arrived: it is handled even if the client times out meanwhile.
+                await request.read()
+                await asyncio.sleep(delay)
+        return await handler(request)
+
+    # Market data.
+
+    async def _market_socket(self, request):
+        # Engine.IO v4 over a websocket: "0" opens, "2"/"3" are ping/pong and
+        # "4" carries Socket.IO packets ("40" connect, "41" disconnect, "42" event).
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.send_str("0" + json.dumps({"sid": uuid.uuid4().hex, "upgrades": [], "pingInterval": 25000,
+                                            "pingTimeout": 20000, "maxPayload": 1_000_000}))
+        pinger = asyncio.ensure_future(self._keep_alive(ws, 25))
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.TEXT or not message.data.startswith("4"):
+                    continue
+                packet, namespace, args = _socketio_packet(message.data[1:])
+                if packet == "0":
+                    await ws.send_str(f"40{namespace}," + json.dumps({"sid": uuid.uuid4().hex}))
+                elif packet == "2" and args and args[0] in _MARKET_EVENTS and len(args) > 1:
+                    await self._on_subscription(ws, args[0], args[1])
+        finally:
+            pinger.cancel()
+            for members in self._rooms.values():
+                members.discard(ws)
+        return ws
+
+    async def _keep_alive(self, ws, interval):
+        while not ws.closed:
+            await asyncio.sleep(interval)
+            await ws.send_str("2")
+
+    async def _on_subscription(self, ws, event, data):
+        if not isinstance(data, dict) or not data.get("pair"):
+            return
+        pair = str(data["pair"]).upper()
+        room = (event, pair)
+        members = self._rooms.setdefault(room, set())
+        if data.get("event") == "unsubscribe":
+            members.discard(ws)
+            return
+        snapshot = None
+        if event == EVENT_ORDER_BOOK and ws not in members:
+            # Diffs only make sense on top of the book they start from; joining the room
+            # before the first await means none is missed in between.
+            snapshot = _event_text(event, pair, self.depth(pair).snapshot())
+        members.add(ws)
+        if snapshot is not None:
+            await ws.send_str(snapshot)
+            self.market_sent += 1
+        if room not in self._feeds:
+            feed = self._feed(pair) if event == EVENT_CANDLES else self._updates(event, pair)
+            self._feeds[room] = asyncio.ensure_future(feed)
+
+    async def _broadcast(self, room, text):
+        sent = 0
+        for ws in list(self._rooms.get(room, ())):
+            if not ws.closed:
+                await ws.send_str(text)
+                sent += 1
+        return sent
+
+    def depth(self, symbol):
+        """The FakeDepth of a symbol, created on first use."""
+        depth = self._depths.get(symbol)
+        if depth is None:
+            depth = self._depths[symbol] = FakeDepth(symbol, self._random)
+        return depth
+
+    async def _updates(self, event, symbol):
+        # Order-book diffs, tickers or trades of a symbol, every book_interval seconds.
+        while True:
+            await asyncio.sleep(self.book_interval)
+            price = self._price(symbol)
+            if event == EVENT_ORDER_BOOK:
+                payload = self.depth(symbol).step()
+            elif event == EVENT_TICKER_INFO:
+                payload = {"symbol": symbol, "last_price": price, "mark_price": price, "index_price": price,
+                           "E": int(time.time() * 1000)}
+            else:
+                payload = {"symbol": symbol, "price": price, "quantity": round(self._random.uniform(0.001, 1), 3),
+                           "is_buyer_maker": self._random.random() < 0.5, "event_time": int(time.time() * 1000)}
+            self.market_sent += await self._broadcast((event, symbol), _event_text(event, symbol, payload))
+
+    async def _feed(self, pair):
+        symbol, interval = split_pair(pair)
+        interval = interval or "1"
+        started = time.monotonic()
+        first = None
+        for count, (sim_time, bar) in enumerate(self.market.updates(symbol, interval, self.ticks_per_bar)):
+            first = sim_time if first is None else first
+            if self.speed:
+                delay = started + (sim_time - first) / 1000 / self.speed - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            elif count % 100 == 0:
+                await asyncio.sleep(0)
+            payload = {"start_time": int(bar["open_time"]), "open": bar["open"], "high": bar["high"],
+                       "low": bar["low"], "close": bar["close"], "volume": bar["volume"], "symbol": symbol,
+                       "interval": interval, "sent_ns": time.time_ns()}
+            self.candles_sent += await self._broadcast((EVENT_CANDLES, pair), _event_text(EVENT_CANDLES, pair, payload))
+
+    def _price(self, symbol):
+        return synthetic_price(symbol.replace("-", "").replace("/", "").upper(), time.time() * 1000)
+
+    async def _klines(self, request):
+        query = request.query
+        symbol = query.get("symbol", "BTCUSDT").upper()
+        interval = query.get("interval", "1")
+        start_time = int(query["start_time"]) if "start_time" in query else None
+        end_time = int(query["end_time"]) if "end_time" in query else None
+        bars = self.market.klines(symbol, interval, start_time, end_time, int(query.get("limit", 1000)))
+        rows = [{"start_time": int(bar["open_time"]), "open": bar["open"], "high": bar["high"], "low": bar["low"],
+                 "close": bar["close"], "volume": bar["volume"], "symbol": symbol, "interval": interval}
+                for bar in bars]
+        return web.json_response({"data": rows})
+
+    async def _order_book(self, request):
+        symbol = request.query.get("symbol", "BTCUSDT").upper()
+        return web.json_response({"data": self.depth(symbol).snapshot(int(request.query.get("limit", 20)))})
+
+    async def _trades(self, request):
+        symbol = request.query.get("symbol", "BTCUSDT").upper()
+        now = int(time.time() * 1000)
+        return web.json_response({"data": [{"symbol": symbol, "price": self._price(symbol), "quantity": 1,
+                                            "is_buyer_maker": bool(i % 2), "event_time": now - i * 100}
+                                           for i in range(10)]})
+
+    async def _ticker(self, request):
+        symbol = request.query.get("symbol", "BTCUSDT").upper()
+        price = self._price(symbol)
+        return web.json_response({"data": {symbol: {"symbol": symbol, "last_price": price,
+                                                    "mark_price": price, "index_price": price}}})
+
+    @staticmethod
+    def _instrument(symbol):
+        return {"symbol": symbol, "base_asset": symbol[:-4], "quote_asset": symbol[-4:], "price_precision": 2,
+                "quantity_precision": 3, "min_quantity": 0.001, "min_notional": 1, "max_leverage": 100}
+
+    async def _instrument_info(self, request):
+        symbols = [request.query["symbol"].upper()] if "symbol" in request.query else INSTRUMENTS
+        return web.json_response({"data": {symbol: self._instrument(symbol) for symbol in symbols}})
+
+    # Account.
+
+    async def _ping(self, request):
+        return web.json_response({"message": "OK"})
+
+    async def _validate_keys(self, request):
+        return web.json_response({"message": "Valid Access"})
+
+    async def _listen_key(self, request):
+        listen_key = uuid.uuid4().hex
+        self.listen_keys.add(listen_key)
+        return web.json_response({"listenKey": listen_key})
+
+    def _balance_row(self):
+        return {"currency": "USDT", "wallet_balance": self.balance, "available_balance": self.balance}
+
+    def _position_rows(self):
+        return [{"symbol": symbol, "position_size": abs(position["quantity"]),
+                 "side": "BUY" if position["quantity"] > 0 else "SELL", "avg_entry_price": position["entry_price"],
+                 "leverage": self.leverage.get(symbol, 1)}
+                for symbol, position in self.positions.items() if position["quantity"]]
+
+    async def _portfolio(self, request):
+        return web.json_response({"data": [self._balance_row(), *self._position_rows()]})
+
+    async def _wallet_balance(self, request):
+        return web.json_response({"data": {"base_asset_balances": [self._balance_row()]}})
+
+    async def _positions(self, request):
+        return web.json_response({"data": self._position_rows()})
+
+    async def _transactions(self, request):
+        return web.json_response({"data": []})
+
+    async def _get_leverage(self, request):
+        symbol = request.query.get("symbol", "BTCUSDT").upper()
+        return web.json_response({"data": {"symbol": symbol, "leverage": self.leverage.get(symbol, 1)}})
+
+    async def _set_leverage(self, request):
+        payload = await _json(request)
+        symbol = str(payload.get("symbol", "BTCUSDT")).upper()
+        self.leverage[symbol] = int(payload.get("leverage", 1))
+        self._push({"e": "ACCOUNT_CONFIG_UPDATE", "E": int(time.time() * 1000),
+                    "ac": {"s": symbol, "l": self.leverage[symbol]}})
+        return web.json_response({"data": {"symbol": symbol, "leverage": self.leverage[symbol]}})
+
+    async def _add_margin(self, request):
+        return web.json_response({"data": {"message": "Margin added"}})
+
+    # Orders.
+
+    async def _create_order(self, orders, request):
+        payload = await _json(request)
+        if not payload.get("symbol") or not payload.get("side") or not payload.get("quantity"):
+            return web.json_response({"message": "symbol, side and quantity are required"}, status=400)
+        price = payload.get("price")
+        if not _on_grid(payload["quantity"], 3) or (price is not None and not _on_grid(price, 2)):
+            return web.json_response({"message": "Quantity or price exceeds the instrument's precision"}, status=400)
+        client_order_id = payload.get("client_order_id")
+        if client_order_id is not None:
+            if client_order_id in self._client_order_ids:
+                return web.json_response({"message": "Duplicate client_order_id"}, status=400)
+            self._client_order_ids.add(client_order_id)
+        order_id = str(next(self._order_ids))
+        order = {"order_id": order_id, "symbol": str(payload["symbol"]).upper(), "side": str(payload["side"]).upper(),
+                 "type": str(payload.get("type") or payload.get("order_type") or "LIMIT").upper(),
+                 "price": payload.get("price"), "quantity": float(payload["quantity"]), "executed_qty": 0.0,
+                 "status": "OPEN", "client_order_id": payload.get("client_order_id"),
+                 "created_time": int(time.time() * 1000)}
+        orders[order_id] = order
+        self._push(_order_event(order))
+        asyncio.get_running_loop().call_later(self.fill_delay, self._fill, order)
+        return web.json_response({"data": order})
+
+    def _fill(self, order):
+        if order["status"] != "OPEN":
+            return
+        price = float(order["price"]) if order["price"] is not None else self._price(order["symbol"])
+        order.update(status="FILLED", executed_qty=order["quantity"], avg_price=price)
+        position = self.positions.setdefault(order["symbol"], {"quantity": 0.0, "entry_price": 0.0})
+        signed = order["quantity"] if order["side"] == "BUY" else -order["quantity"]
+        quantity = position["quantity"] + signed
+        if quantity and position["quantity"] * signed >= 0:
+            position["entry_price"] = (position["entry_price"] * position["quantity"] + price * signed) / quantity
+        elif quantity * position["quantity"] < 0:
+            position["entry_price"] = price
+        position["quantity"] = quantity
+        self._push(_order_event(order))
+        self._push({"e": "ACCOUNT_UPDATE", "E": int(time.time() * 1000), "a": {
+            "B": [{"a": "USDT", "wb": self.balance, "cw": self.balance}],
+            "P": [{"s": order["symbol"], "pa": quantity, "ep": position["entry_price"]}]}})
+
+    def _cancel(self, order):
+        order["status"] = "CANCELLED"
+        self._push(_order_event(order))
+
+    async def _cancel_order(self, orders, request):
+        payload = await _json(request)
+        order = orders.get(str(payload.get("order_id")))
+        if order is None or order["status"] != "OPEN":
+            return web.json_response({"message": "Order not found or already closed"}, status=400)
+        self._cancel(order)
+        return web.json_response({"data": order})
+
+    async def _cancel_all(self, request):
+        payload = await _json(request)
+        symbol = str(payload.get("symbol", "")).upper()
+        cancelled = [order for order in self.futures_orders.values()
+                     if order["status"] == "OPEN" and (not symbol or order["symbol"] == symbol)]
+        for order in cancelled:
+            self._cancel(order)
+        return web.json_response({"data": {"cancelled": len(cancelled)}})
+
+    async def _get_order(self, orders, request):
+        order = orders.get(request.query.get("order_id", ""))
+        if order is None:
+            return web.json_response({"message": "Order not found"}, status=404)
+        return web.json_response({"data": order})
+
+    async def _open_orders(self, orders, request):
+        payload = await _json(request) if request.method == "POST" else request.query
+        symbol = str(payload.get("symbol", "")).upper()
+        # GET /orders?open=false lists the closed orders instead.
+        wanted = str(payload.get("open", "true")).lower() != "false"
+        return web.json_response({"data": {"orders": [order for order in orders.values()
+                                                      if (order["status"] == "OPEN") == wanted
+                                                      and (not symbol or order["symbol"] == symbol)]}})
+
+    async def _closed_orders(self, request):
+        return web.json_response({"data": {"orders": [order for order in self.futures_orders.values()
+                                                      if order["status"] != "OPEN"]}})
+
+    # Private stream.
+
+    async def _private_stream(self, request):
+        if request.match_info["listen_key"] not in self.listen_keys:
+            raise web.HTTPUnauthorized(text="Invalid listenKey")
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        self._private_sockets.add(ws)
+        try:
+            async for message in ws:
+                if message.type == WSMsgType.ERROR:
+                    break
+        finally:
+            self._private_sockets.discard(ws)
+        return ws
+
+    def _push(self, event):
+        text = json.dumps(event)
+        for ws in list(self._private_sockets):
+            self.private_sent += 1
+            self._spawn(ws.send_str(text))
+
+    async def _stats(self, request):
+        return web.json_response(self.stats())
+
+
+def _order_event(order):
+    return {"e": "ORDER_TRADE_UPDATE", "E": int(time.time() * 1000), "o": {
+        "i": order["order_id"], "c": order["client_order_id"], "s": order["symbol"], "S": order["side"],
+        "o": order["type"], "p": order["price"], "q": order["quantity"], "z": order["executed_qty"],
+        "X": order["status"]}}
+
+
+_MARKET_EVENTS = (EVENT_CANDLES, EVENT_ORDER_BOOK, EVENT_TICKER_INFO, EVENT_TRADES)
+
+
+def _event_text(event, pair, payload):
+    return f"42{NAMESPACE}," + json.dumps([event, {"pair": pair, "data": payload}])
+
+
+def _socketio_packet(text):
+    """'2/exchange_2,["EVENT", {...}]' -> ('2', '/exchange_2', ['EVENT', {...}])."""
+    packet, body = text[:1], text[1:]
+    namespace = "/"
+    if body.startswith("/"):
+        namespace, _, body = body.partition(",")
+    body = body.lstrip("0123456789")
+    try:
+        args = json.loads(body) if body else None
+    except ValueError:
+        args = None
+    return packet, namespace, args
+
+
+def _on_grid(value, decimals):
+    """Whether a number has no more decimals than the instrument allows, as a real exchange checks."""
+    try:
+        return Decimal(str(value)) == Decimal(str(value)).quantize(Decimal(1).scaleb(-decimals))
+    except ArithmeticError:
+        return False
+
+
+async def _json(request):
+    try:
+        payload = await request.json()
+    except ValueError:
+        return {}
+    return payload if isinstance(payload, dict) else {}
+
+
+async def serve(exchange):
+    await exchange.start()
+    print(f"Fake exchange on {exchange.rest_url} (ws {exchange.ws_url}), Ctrl+C to stop.", flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await exchange.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="fixed delay added to every REST response")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="random extra REST delay, up to this much")
+    parser.add_argument("--fill-delay-ms", type=float, default=0.0, help="time from order ack to fill")
+    parser.add_argument("--speed", type=float, default=1.0, help="market data speed-up, 0 = as fast as possible")
+    parser.add_argument("--ticks-per-bar", type=int, default=10)
+    parser.add_argument("--book-interval-ms", type=float, default=100.0,
+                        help="time between order-book, ticker and trade updates")
+    parser.add_argument("--replay-dir", help="kline cache directory to replay instead of synthetic prices")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    exchange = FakeExchange(args.host, args.port, args.latency_ms / 1000, args.jitter_ms / 1000,
+                            args.fill_delay_ms / 1000, args.speed, args.ticks_per_bar, args.replay_dir,
+                            book_interval=args.book_interval_ms / 1000)
+    try:
+        asyncio.run(serve(exchange))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+"""In-memory mirror of the account, kept current from the private stream.
+
+One REST snapshot (balances, positions with their leverage, open orders)
+seeds the mirror. From then on, private-stream events are applied to it, so
+balance, position and open-order queries need no network call. A background
+task compares the mirror with a fresh snapshot at a fixed interval. If they
+differ, the drift is logged and the mirror is replaced by the snapshot.
+Whenever a snapshot is loaded, ``on_resync`` is awaited, so state derived
+from the account can be rebuilt from it.
+"""
+import asyncio
+import logging
+import time
+
+_CLOSED_STATUSES = {"FILLED", "EXECUTED", "CANCELED", "CANCELLED", "EXPIRED", "REJECTED", "DISCARDED",
+                    "EXPIRED_IN_MATCH"}
+
+
+def _first(data, *keys):
+    for key in keys:
+        value = data.get(key)
+        if value is not None:
+            return value
+    return None
+
+
+def _float(value, default=0.0):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _rows(response):
+    """The list of records in a REST response, whether bare, under 'data', or one level deeper."""
+    data = response.get("data", response) if isinstance(response, dict) else response
+    if isinstance(data, dict):
+        lists = [value for value in data.values() if isinstance(value, list)]
+        data = [row for rows in lists for row in rows] if lists else [data]
+    return [row for row in data or () if isinstance(row, dict)]
+
+
+def parse_balance(row):
+    """(asset, {'wallet', 'available'}) from a balance record, or None."""
+    asset = _first(row, "currency", "asset", "a")
+    wallet = _first(row, "wallet_balance", "main_balance", "balance", "wb")
+    if asset is None or wallet is None:
+        return None
+    available = _first(row, "available_balance", "available", "cw")
+    return str(asset).upper(), {"wallet": _float(wallet),
+                                "available": _float(available if available is not None else wallet)}
+
+
+def parse_position(row):
+    """(symbol, position) from a position record, or None. Short positions have a negative quantity."""
+    symbol = _first(row, "symbol", "s")
+    quantity = _first(row, "position_size", "positionAmt", "quantity", "pa")
+    if symbol is None or quantity is None:
+        return None
+    quantity = _float(quantity)
+    if str(_first(row, "side", "position_side", "ps") or "").upper() in ("SELL", "SHORT") and quantity > 0:
+        quantity = -quantity
+    return str(symbol).upper(), {
+        "quantity": quantity,
+        "entry_price": _float(_first(row, "avg_entry_price", "entry_price", "entryPrice", "ep")),
+        "unrealized_pnl": _float(_first(row, "unrealised_pnl", "unrealized_pnl", "unRealizedProfit", "up")),
+        "leverage": _float(_first(row, "leverage", "l"), None),
+    }
+
+
+def parse_order(row):
+    """(order_id, order) from an order record or order event, or None."""
+    order_id = _first(row, "order_id", "i", "orderId")
+    if order_id is None:
+        return None
+    return str(order_id), {
+        "order_id": str(order_id),
+        "symbol": str(_first(row, "symbol", "s") or "").upper(),
+        "side": str(_first(row, "side", "S") or "").upper(),
+        "type": str(_first(row, "type", "order_type", "o") or "").upper(),
+        "price": _float(_first(row, "price", "p")),
+        "quantity": _float(_first(row, "quantity", "orig_qty", "q")),
+        "filled": _float(_first(row, "executed_qty", "filled_quantity", "z")),
+        "status": str(_first(row, "status", "X") or "").upper(),
+        "client_order_id": _first(row, "client_order_id", "c"),
+    }
+
+
+def parse_orders(response):
+    """[(order_id, order)] of the order records in a REST response, e.g. an order ack."""
+    return [order for order in map(parse_order, _rows(response)) if order]
+
+
+def parse_open_orders(response):
+    """{order_id: order} of the orders in a REST response that are still open."""
+    return {order_id: order for order_id, order in parse_orders(response) if order["status"] not in _CLOSED_STATUSES}
+
+
+class AccountState:
+    def __init__(self, api_client, reconcile_interval=60.0, tolerance=1e-8, on_resync=None):
+        self.api_client = api_client
+        self.reconcile_interval = reconcile_interval
+        # Coroutine function called with the time.time() the snapshot was requested at, after it is loaded.
+        self.on_resync = on_resync
+        self.tolerance = tolerance
+        self.balances = {}
+        self.positions = {}
+        self.orders = {}
+        self.leverage = {}
+        self.synced = False
+        self.snapshot_time = None
+        self.events = 0
+        self.resyncs = 0
+        self.drifts = 0
+        self._pending = None
+        self._reconcile_task = None
+        self._sync_lock = asyncio.Lock()
+        self._syncs_started = 0
+        self._synced_ok = False
+
+    # Queries, answered from memory.
+
+    def balance(self, asset=None):
+        if asset is None:
+            return {name: dict(values) for name, values in self.balances.items()}
+        values = self.balances.get(asset.upper())
+        return dict(values) if values else None
+
+    def position(self, symbol):
+        position = self.positions.get(symbol.upper())
+        return dict(position) if position else None
+
+    def open_orders(self, symbol=None):
+        return [dict(order) for order in self.orders.values() if symbol is None or order["symbol"] == symbol.upper()]
+
+    # Snapshot and reconciliation.
+
+    async def fetch_snapshot(self):
+        """Reads balances, positions and open orders from REST. Returns None if a call failed."""
+        portfolio, orders = await asyncio.gather(self.api_client.get_balance_async(fresh=True),
+                                                 self.api_client.get_open_orders_async())
+        if portfolio is None or orders is None:
+            return None
+        balances, positions, leverage = {}, {}, {}
+        for row in _rows(portfolio):
+            balance = parse_balance(row)
+            if balance:
+                balances[balance[0]] = balance[1]
+            position = parse_position(row)
+            if position and position[1]["quantity"]:
+                positions[position[0]] = position[1]
+            if position and position[1]["leverage"]:
+                leverage[position[0]] = position[1]["leverage"]
+        return {"balances": balances, "positions": positions, "orders": parse_open_orders(orders),
+                "leverage": leverage}
+
+    async def sync(self):
+        """Loads a REST snapshot, then replays the stream events that arrived meanwhile.
+
+        One sync runs at a time. Calls made while one is in flight wait for it
+        and then share a single new one, so each gets a snapshot requested
+        after it was called, and ``on_resync`` never runs twice at once.
+        """
+        started = self._syncs_started
+        async with self._sync_lock:
+            if self._syncs_started > started:
+                # Another waiter ran a sync that began after this call.
+                return self._synced_ok
+            self._syncs_started += 1
+            self._synced_ok = await self._sync()
+            return self._synced_ok
+
+    async def _sync(self):
+        self._pending = []
+        requested = time.time()
+        try:
+            snapshot = await self.fetch_snapshot()
+        except Exception:
+            logging.exception("Account snapshot failed")
+            snapshot = None
+        pending, self._pending = self._pending, None
+        if snapshot is None:
+            logging.error("Could not load the account snapshot.")
+            self.synced = False
+            return False
+        self._load(snapshot)
+        for handler, data in pending:
+            handler(data)
+        if self.on_resync is not None:
+            await self.on_resync(requested)
+        return True
+
+    def _load(self, snapshot):
+        self.balances = snapshot["balances"]
+        self.positions = snapshot["positions"]
+        self.orders = snapshot["orders"]
+        self.leverage.update(snapshot["leverage"])
+        self.snapshot_time = time.time()
+        self.synced = True
+
+    def drift(self, snapshot):
+        """Differences between the mirror and a REST snapshot, as readable strings."""
+        differences = []
+        for name, mine, theirs, key in (("balance", self.balances, snapshot["balances"], "wallet"),
+                                        ("position", self.positions, snapshot["positions"], "quantity")):
+            for item in sorted(set(mine) | set(theirs)):
+                ours = mine.get(item, {}).get(key, 0.0)
+                actual = theirs.get(item, {}).get(key, 0.0)
+                if abs(ours - actual) > self.tolerance * max(1.0, abs(actual)):
+                    differences.append(f"{name} {item}: mirror {ours}, exchange {actual}")
+        missing = set(snapshot["orders"]) - set(self.orders)
+        stale = set(self.orders) - set(snapshot["orders"])
+        differences += [f"order {order_id} missing from mirror" for order_id in sorted(missing)]
+        differences += [f"order {order_id} no longer open" for order_id in sorted(stale)]
+        return differences
+
+    async def reconcile(self):
+        """Checks the mirror against REST and resyncs it if they disagree.
+
+        Returns:
+            list: The differences found (empty if none, or if the snapshot failed).
+        """
+        if self._sync_lock.locked():
+            return []
+        async with self._sync_lock:
+            events_before = self.events
+            requested = time.time()
+            snapshot = await self.fetch_snapshot()
+            if snapshot is None:
+                return []
+            if self.events != events_before:
+                # Events landed while the snapshot was in flight; compare on the next round.
+                return []
+            differences = self.drift(snapshot) if self.synced else []
+            if differences or not self.synced:
+                if differences:
+                    self.drifts += 1
+                    logging.warning(f"Account mirror drifted from the exchange, resyncing: {'; '.join(differences)}")
+                self.resyncs += 1
+                self._load(snapshot)
+                if self.on_resync is not None:
+                    await self.on_resync(requested)
+            return differences
+
+    async def start(self):
+        """Takes the first snapshot and starts the periodic reconciliation."""
+        await self.sync()
+        if self._reconcile_task is None and self.reconcile_interval:
+            self._reconcile_task = asyncio.create_task(self._reconcile_loop())
+
+    async def _reconcile_loop(self):
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            try:
+                await self.reconcile()
+            except Exception:
+                logging.exception("Account reconciliation failed")
+
+    async def stop(self):
+        if self._reconcile_task is not None:
+            self._reconcile_task.cancel()
+            await asyncio.gather(self._reconcile_task, return_exceptions=True)
+            self._reconcile_task = None
+
+    # Stream events.
+
+    def apply(self, message):
+        """Applies one private-stream message.
+
+        Returns:
+            bool: True if the message was an account event.
+        """
+        data = message.get("data", message) if isinstance(message, dict) else None
+        handler = self._handler(data) if isinstance(data, dict) else None
+        if handler is None:
+            return False
+        self.events += 1
+        if self._pending is not None:
+            # A snapshot is in flight; apply this on top of it once it lands.
+            self._pending.append((handler, data))
+        else:
+            handler(data)
+        return True
+
+    def _handler(self, data):
+        event = _first(data, "e", "event", "type")
+        if event == "ACCOUNT_UPDATE" and isinstance(data.get("a"), dict):
+            return self._apply_account_update
+        if event in ("ORDER_TRADE_UPDATE", "executionReport") or "order_id" in data:
+            return self._apply_order_update
+        if event == "ACCOUNT_CONFIG_UPDATE":
+            return self._apply_config_update
+        return None
+
+    def _apply_account_update(self, data):
+        update = data["a"]
+        for row in update.get("B", ()):
+            balance = parse_balance(row)
+            if balance:
+                self.balances[balance[0]] = balance[1]
+        for row in update.get("P", ()):
+            position = parse_position(row)
+            if position is None:
+                continue
+            symbol, values = position
+            if values["quantity"]:
+                values["leverage"] = values["leverage"] or self.leverage.get(symbol)
+                self.positions[symbol] = values
+            else:
+                self.positions.pop(symbol, None)
+
+    def _apply_order_update(self, data):
+        order = parse_order(data.get("o", data) if isinstance(data.get("o"), dict) else data)
+        if order is None:
+            return
+        order_id, values = order
+        if values["status"] in _CLOSED_STATUSES:
+            self.orders.pop(order_id, None)
+        else:
+            self.orders[order_id] = {**self.orders.get(order_id, {}), **values}
+
+    def _apply_config_update(self, data):
+        config = data.get("ac")
+        if isinstance(config, dict) and config.get("s") is not None:
+            symbol = str(config["s"]).upper()
+            self.leverage[symbol] = _float(config.get("l"), None)
+            if symbol in self.positions:
+                self.positions[symbol]["leverage"] = self.leverage[symbol]
+
+    def stats(self):
+        return {"synced": self.synced, "events": self.events, "resyncs": self.resyncs, "drifts": self.drifts,
+                "balances": len(self.balances), "positions": len(self.positions), "open_orders": len(self.orders)}
@@ -1,65 +1,188 @@
-import hashlib
-import hmac
 import asyncio
 import json
 import time
+import httpx
 import requests
 import websockets
-from trading_bot.core.config import COINSWITCH_API_KEY, COINSWITCH_API_SECRET
+from websockets.exceptions import InvalidHandshake, WebSocketException
+from trading_bot.core.config import (COINSWITCH_API_KEY, COINSWITCH_API_SECRET, COINSWITCH_REST_URL,
+                                     COINSWITCH_WS_URL, HTTP_POOL_SIZE, INBOUND_OVERFLOW_POLICY,
+                                     INBOUND_QUEUE_SIZE, LISTEN_KEY_RENEW_INTERVAL, PORTFOLIO_CACHE_TTL,
+                                     PRIVATE_STREAM_STANDBY, RATE_LIMIT_ORDER_RESERVE, RATE_LIMIT_RETRIES,
+                                     RATE_LIMITS, RECONNECT_INITIAL_DELAY, RECONNECT_MAX_DELAY, REQUEST_TIMEOUT)
+from trading_bot.core.inbound_queue import ConflatingQueue, classify_message
+from trading_bot.core.metrics import metrics
+from trading_bot.core.read_cache import ReadCache, is_account_event
+from trading_bot.core.reconnect import Backoff, RecentMessages, StreamHealth
+from trading_bot.core.recorder import PRIVATE
+from trading_bot.core.rate_limit import RequestScheduler, endpoint_class, retry_after_seconds
+from trading_bot.core.signing import HmacSigner
+
+LISTEN_KEY_ENDPOINT = "/trade/api/v2/user/listenKey"
+PORTFOLIO_ENDPOINT = "/trade/api/v2/user/portfolio"
+ORDER_ENDPOINT = "/trade/api/v2/order"
+OPEN_ORDERS_ENDPOINT = "/trade/api/v2/orders"
+FUTURES_DEPTH_ENDPOINT = "/trade/api/v2/futures/order_book"
+FUTURES_KLINES_ENDPOINT = "/trade/api/v2/futures/klines"
+FUTURES_INSTRUMENT_INFO_ENDPOINT = "/trade/api/v2/futures/instrument_info"
+
+_RECEIVE = metrics.histogram("receive")
+_DECODE = metrics.histogram("decode")
 
 class CoinSwitchProApiClient:
-    def __init__(self):
+    def __init__(self, timeout=REQUEST_TIMEOUT, pool_size=HTTP_POOL_SIZE):
         self.api_key = COINSWITCH_API_KEY
         self.api_secret = COINSWITCH_API_SECRET
-        self.base_rest_url = "https://coinswitch.co"
-        self.base_ws_url = "wss://api-trading.coinswitch.co"
+        self.base_rest_url = COINSWITCH_REST_URL
+        self.base_ws_url = COINSWITCH_WS_URL
         self.listen_key = None
+        self.timeout = timeout
+        self.pool_size = pool_size
+        # Both transports keep connections alive, so only the first request
+        # on a connection pays for the TCP/TLS handshake.
+        self.session = requests.Session()
+        self._async_client = None
+        self._signer = None
+        self._signer_credentials = None
+        # Decouples socket reads from the message handler, see start_private_stream.
+        self.inbound = ConflatingQueue(INBOUND_QUEUE_SIZE, INBOUND_OVERFLOW_POLICY)
+        # Every REST call waits for its rate-limit budget; orders go first.
+        self.scheduler = RequestScheduler(RATE_LIMITS, RATE_LIMIT_ORDER_RESERVE)
+        self.max_retries = RATE_LIMIT_RETRIES
+        # Balance/position reads are shared and reused until they expire or the account changes.
+        self.read_cache = ReadCache({PORTFOLIO_ENDPOINT: PORTFOLIO_CACHE_TTL})
+        self.ws_connect = websockets.connect
+        self.listen_key_renew_interval = LISTEN_KEY_RENEW_INTERVAL
+        self.private_stream_standby = PRIVATE_STREAM_STANDBY
+        self.private_stream_health = StreamHealth()
+        self._live_connections = 0
+        self._recent_messages = None
+        self._backfills = set()
+        # Set to a Recorder to log every private-stream frame.
+        self.recorder = None
+
+    @property
+    def signer(self):
+        """The request signer, rebuilt only when the credentials change."""
+        credentials = (self.api_key, self.api_secret)
+        if self._signer is None or self._signer_credentials != credentials:
+            self._signer = HmacSigner(self.api_key, self.api_secret or "")
+            self._signer_credentials = credentials
+        return self._signer
 
     def _generate_signature(self, timestamp, payload_str=""):
         """Generates the HMAC-SHA256 signature for a signed REST request."""
-        message = f"{timestamp}{self.api_key}{payload_str}"
-        signature = hmac.new(
-            self.api_secret.encode('utf-8'),
-            message.encode('utf-8'),
-            hashlib.sha256
-        ).hexdigest()
-        return signature
-
-    def _make_request(self, method, endpoint, params=None, data=None):
+        return self.signer.sign(f"{timestamp}{self.api_key}{payload_str}")
+
+    def _prepare_request(self, method, endpoint, data=None):
+        """Builds the signed headers and the exact body bytes that were signed."""
+        payload_str = json.dumps(data, separators=(',', ':')) if data else ""
+        headers = self.signer.sign_request(method, endpoint, payload_str)
+        return headers, payload_str.encode('utf-8') if payload_str else None
+
+    def _make_request(self, method, endpoint, params=None, data=None, timeout=None):
         url = self.base_rest_url + endpoint
-        timestamp = str(int(time.time() * 1000))
+        lane = endpoint_class(method, endpoint)
 
-        headers = {
-            'x-api-key': self.api_key,
-            'x-api-timestamp': timestamp,
-            'Content-Type': 'application/json'
-        }
+        for attempt in range(self.max_retries + 1):
+            self.scheduler.acquire_sync(lane)
+            headers, body = self._prepare_request(method, endpoint, data)
+            try:
+                response = self.session.request(method, url, headers=headers, params=params, data=body,
+                                                timeout=timeout or self.timeout)
+                if response.status_code == 429 and self._rate_limited(lane, endpoint, response, attempt):
+                    continue
+                response.raise_for_status()
+                self.scheduler.succeeded(lane)
+                return response.json()
+            except requests.exceptions.RequestException as e:
+                print(f"Error making request to {endpoint}: {e}")
+                return None
 
-        payload_str = json.dumps(data, separators=(',', ':')) if data else ""
-        headers['x-api-signature'] = self._generate_signature(timestamp, payload_str)
+    def _rate_limited(self, lane, endpoint, response, attempt):
+        """Backs the endpoint class off after a 429. Returns True if the request should be retried."""
+        pause = self.scheduler.rate_limited_by_server(lane, retry_after_seconds(response.headers.get("Retry-After")))
+        print(f"Rate limited on {endpoint}, backing off for {pause:.1f}s")
+        return attempt < self.max_retries
 
-        try:
-            response = requests.request(method, url, headers=headers, params=params, json=data)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"Error making request to {endpoint}: {e}")
-            return None
+    @property
+    def async_client(self):
+        """The pooled HTTP client used by the async methods, created on first use."""
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                base_url=self.base_rest_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.pool_size,
+                                    max_keepalive_connections=self.pool_size),
+            )
+        return self._async_client
 
-    def get_listen_key(self):
-        """Fetches a new listenKey from the REST API."""
-        endpoint = "/trade/api/v2/user/listenKey"
-        response = self._make_request("POST", endpoint)
+    async def _make_request_async(self, method, endpoint, params=None, data=None, timeout=None, trace=None):
+        lane = endpoint_class(method, endpoint)
+
+        for attempt in range(self.max_retries + 1):
+            await self.scheduler.acquire(lane)
+            if trace is not None:
+                trace.granted = time.perf_counter_ns()
+            headers, body = self._prepare_request(method, endpoint, data)
+            if trace is not None:
+                trace.signed = time.perf_counter_ns()
+
+            try:
+                if trace is not None:
+                    trace.sent = time.perf_counter_ns()
+                response = await self.async_client.request(
+                    method, endpoint, headers=headers, params=params, content=body,
+                    timeout=timeout or httpx.USE_CLIENT_DEFAULT,
+                )
+                if response.status_code == 429 and self._rate_limited(lane, endpoint, response, attempt):
+                    continue
+                response.raise_for_status()
+                self.scheduler.succeeded(lane)
+                return response.json()
+            except (httpx.HTTPError, ValueError) as e:
+                print(f"Error making request to {endpoint}: {e}")
+                return None
+
+    async def warm_up(self, connections=None):
+        """Opens pooled connections ahead of the first order so it skips the handshake."""
+        connections = connections or self.pool_size
+        ping = lambda: self.async_client.get("/trade/api/v2/ping")
+        results = await asyncio.gather(*(ping() for _ in range(connections)), return_exceptions=True)
+        return sum(not isinstance(result, Exception) for result in results)
+
+    async def aclose(self):
+        """Closes the pooled connections of both transports."""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+        self.session.close()
+
+    def _store_listen_key(self, response):
         if response and 'listenKey' in response:
             self.listen_key = response['listenKey']
             print(f"Successfully obtained listenKey: {self.listen_key[:10]}...")
             return self.listen_key
         return None
 
+    def get_listen_key(self):
+        """Fetches a new listenKey from the REST API."""
+        return self._store_listen_key(self._make_request("POST", LISTEN_KEY_ENDPOINT))
+
+    async def get_listen_key_async(self):
+        return self._store_listen_key(await self._make_request_async("POST", LISTEN_KEY_ENDPOINT))
+
     def get_balance(self):
-        """Fetches the user's futures account balance."""
-        endpoint = "/trade/api/v2/user/portfolio"
-        return self._make_request("GET", endpoint)
+        """Fetches the user's futures account balance (cached for PORTFOLIO_CACHE_TTL seconds)."""
+        return self.read_cache.get_sync(PORTFOLIO_ENDPOINT, None,
+                                        lambda: self._make_request("GET", PORTFOLIO_ENDPOINT))
+
+    async def get_balance_async(self, fresh=False):
+        """Cached like get_balance; ``fresh=True`` always asks the exchange."""
+        if fresh:
+            return await self._make_request_async("GET", PORTFOLIO_ENDPOINT)
+        return await self.read_cache.get(PORTFOLIO_ENDPOINT, None,
+                                         lambda: self._make_request_async("GET", PORTFOLIO_ENDPOINT))
 
     def get_positions(self):
         """Fetches the user's open futures positions."""
@@ -68,50 +191,173 @@ class CoinSwitchProApiClient:
         # This might need to be adjusted based on actual API responses.
         return self.get_balance()
 
-    def create_order(self, symbol, side, quantity, price, order_type="LIMIT"):
-        """Creates a new order."""
-        endpoint = "/trade/api/v2/order"
-        data = {
+    async def get_positions_async(self):
+        return await self.get_balance_async()
+
+    def get_open_orders(self, params=None):
+        """Fetches the open orders, optionally filtered, e.g. params={"symbol": "BTC/INR"}."""
+        return self._make_request("GET", OPEN_ORDERS_ENDPOINT, params={"open": "true", **(params or {})})
+
+    async def get_open_orders_async(self, params=None, timeout=None):
+        return await self._make_request_async("GET", OPEN_ORDERS_ENDPOINT, params={"open": "true", **(params or {})},
+                                              timeout=timeout)
+
+    async def get_closed_orders_async(self, params=None, timeout=None):
+        """Fetches the filled, canceled and rejected orders, optionally filtered like get_open_orders."""
+        return await self._make_request_async("GET", OPEN_ORDERS_ENDPOINT, params={"open": "false", **(params or {})},
+                                              timeout=timeout)
+
+    @staticmethod
+    def _order_payload(symbol, side, quantity, price, order_type, client_order_id=None):
+        payload = {
             "symbol": symbol,
             "side": side,
             "quantity": quantity,
             "price": price,
             "type": order_type
         }
-        return self._make_request("POST", endpoint, data=data)
+        if client_order_id is not None:
+            payload["client_order_id"] = client_order_id
+        return payload
 
-    def cancel_order(self, order_id):
+    def create_order(self, symbol, side, quantity, price, order_type="LIMIT", timeout=None, client_order_id=None):
+        """Creates a new order."""
+        data = self._order_payload(symbol, side, quantity, price, order_type, client_order_id)
+        response = self._make_request("POST", ORDER_ENDPOINT, data=data, timeout=timeout)
+        self.read_cache.invalidate(PORTFOLIO_ENDPOINT)
+        return response
+
+    async def create_order_async(self, symbol, side, quantity, price, order_type="LIMIT", timeout=None, trace=None,
+                                 client_order_id=None):
+        data = self._order_payload(symbol, side, quantity, price, order_type, client_order_id)
+        response = await self._make_request_async("POST", ORDER_ENDPOINT, data=data, timeout=timeout, trace=trace)
+        self.read_cache.invalidate(PORTFOLIO_ENDPOINT)
+        return response
+
+    def cancel_order(self, order_id, timeout=None):
         """Cancels an existing order."""
-        endpoint = "/trade/api/v2/order"
-        data = {"order_id": order_id}
-        return self._make_request("DELETE", endpoint, data=data)
+        response = self._make_request("DELETE", ORDER_ENDPOINT, data={"order_id": order_id}, timeout=timeout)
+        self.read_cache.invalidate(PORTFOLIO_ENDPOINT)
+        return response
+
+    async def get_order_async(self, order_id, timeout=None):
+        """Fetches one order placed through create_order, by exchange order ID."""
+        return await self._make_request_async("GET", ORDER_ENDPOINT, params={"order_id": order_id}, timeout=timeout)
 
-    async def start_private_stream(self, message_handler):
-        """Connects to the private user data stream and handles messages."""
-        if not self.get_listen_key():
+    async def cancel_order_async(self, order_id, timeout=None):
+        response = await self._make_request_async("DELETE", ORDER_ENDPOINT, data={"order_id": order_id},
+                                                  timeout=timeout)
+        self.read_cache.invalidate(PORTFOLIO_ENDPOINT)
+        return response
+
+    def get_depth(self, params=None):
+        """Fetches an order book snapshot, e.g. params={"exchange": "EXCHANGE_2", "symbol": "BTCUSDT"}."""
+        return self._make_request("GET", FUTURES_DEPTH_ENDPOINT, params=params)
+
+    async def get_depth_async(self, params=None):
+        return await self._make_request_async("GET", FUTURES_DEPTH_ENDPOINT, params=params)
+
+    def get_klines(self, params=None):
+        """Fetches one page of candles, e.g. params={"exchange": "EXCHANGE_2", "symbol": "BTCUSDT",
+        "interval": "15", "start_time": ..., "end_time": ..., "limit": 1000}."""
+        return self._make_request("GET", FUTURES_KLINES_ENDPOINT, params=params)
+
+    async def get_klines_async(self, params=None):
+        return await self._make_request_async("GET", FUTURES_KLINES_ENDPOINT, params=params)
+
+    async def futures_instrument_info_async(self, symbol=None, exchange="EXCHANGE_2"):
+        """Fetches the precision rules and limits of one futures symbol, or of all of them."""
+        params = {"exchange": exchange, **({"symbol": symbol} if symbol else {})}
+        return await self._make_request_async("GET", FUTURES_INSTRUMENT_INFO_ENDPOINT, params=params)
+
+    async def _consume_inbound(self, message_handler):
+        while True:
+            data = await self.inbound.get()
+            try:
+                await message_handler(data)
+            except Exception as e:
+                print(f"Error handling message: {e}")
+
+    async def start_private_stream(self, message_handler, on_reconnect=None):
+        """Connects to the private user data stream and handles messages.
+
+        Reads go into the inbound queue and a separate task feeds the handler,
+        so a slow handler never stops the socket from being drained. The
+        listenKey is renewed in the background, so a reconnect never waits for
+        REST. After an outage, ``on_reconnect(since_ms)`` is scheduled to
+        backfill what was missed.
+        """
+        if not await self.get_listen_key_async():
             return
 
-        ws_url = f"{self.base_ws_url}/ws/{self.listen_key}"
+        consumer = asyncio.create_task(self._consume_inbound(message_handler))
+        renewer = asyncio.create_task(self._renew_listen_key())
+        try:
+            await self._read_private_stream(on_reconnect)
+        finally:
+            consumer.cancel()
+            renewer.cancel()
 
+    async def _renew_listen_key(self):
+        while True:
+            await asyncio.sleep(self.listen_key_renew_interval)
+            backoff = Backoff(1.0, 60.0)
+            while not await self.get_listen_key_async():
+                await asyncio.sleep(backoff.next())
+
+    async def _read_private_stream(self, on_reconnect=None):
+        # With a standby, two connections read the same stream and duplicates
+        # are dropped, so losing one of them loses no messages.
+        connections = 2 if self.private_stream_standby else 1
+        self._recent_messages = RecentMessages() if connections > 1 else None
+        await asyncio.gather(*(self._private_connection(on_reconnect) for _ in range(connections)))
+
+    async def _private_connection(self, on_reconnect):
+        backoff = Backoff(RECONNECT_INITIAL_DELAY, RECONNECT_MAX_DELAY)
         while True:
             try:
-                async with websockets.connect(ws_url) as websocket:
+                async with self.ws_connect(f"{self.base_ws_url}/ws/{self.listen_key}") as websocket:
                     print("Connected to private WebSocket stream.")
-                    while True:
-                        message = await websocket.recv()
-                        data = json.loads(message)
-                        await message_handler(data)
-
-            except websockets.exceptions.ConnectionClosed as e:
-                print(f"Private WebSocket connection closed: {e}. Reconnecting...")
-                # Implement exponential backoff here before retrying
-                await asyncio.sleep(5)
-                # Fetch a new listen key upon reconnection
-                if not self.get_listen_key():
-                    await asyncio.sleep(10) # Wait longer if auth fails
-                    continue
-                ws_url = f"{self.base_ws_url}/ws/{self.listen_key}"
+                    self._live_connections += 1
+                    try:
+                        async for message in websocket:
+                            backoff.reset()
+                            self._on_private_message(message, on_reconnect)
+                    finally:
+                        self._live_connections -= 1
+                        if not self._live_connections:
+                            self.private_stream_health.disconnected()
+                print("Private WebSocket connection closed. Reconnecting...")
+            except InvalidHandshake as e:
+                # Most likely an expired listenKey: get a new one before the next attempt.
+                print(f"Private WebSocket handshake failed: {e}. Renewing listenKey...")
+                self.private_stream_health.disconnected()
+                await self.get_listen_key_async()
+            except (OSError, asyncio.TimeoutError, WebSocketException) as e:
+                print(f"Private WebSocket connection lost: {e}. Reconnecting...")
+                self.private_stream_health.disconnected()
+            await asyncio.sleep(backoff.next())
 
-            except Exception as e:
-                print(f"An error occurred: {e}")
-                await asyncio.sleep(10)
+    def _on_private_message(self, message, on_reconnect=None):
+        start = time.perf_counter_ns()
+        if self._recent_messages is not None and self._recent_messages.seen(message):
+            return
+        decode_start = time.perf_counter_ns()
+        try:
+            data = json.loads(message)
+        except ValueError:
+            print(f"Ignoring malformed private stream message: {message!r}")
+            return
+        _DECODE.record_since(decode_start)
+        if self.recorder is not None:
+            self.recorder.record(PRIVATE, message)
+        since = self.private_stream_health.message()
+        if since is not None and on_reconnect is not None:
+            task = asyncio.create_task(on_reconnect(since))
+            self._backfills.add(task)
+            task.add_done_callback(self._backfills.discard)
+        if is_account_event(data):
+            # Cached balances/positions are stale from this point on.
+            self.read_cache.invalidate(PORTFOLIO_ENDPOINT)
+        self.inbound.put_nowait(data, *classify_message(data))
+        _RECEIVE.record_since(start)
@@ -0,0 +1,218 @@
+"""Historical backtesting for strategy modules.
+
+A strategy is replayed over historical klines through one of three paths:
+
+* ``generate_signals(data)`` (vectorized): gets a dict of numpy column arrays
+  and returns one target position per bar in one call.
+* ``on_bar(bar, new_bar, symbol, interval)`` (incremental): gets every bar
+  once, so streaming indicators keep their state and each bar costs O(1).
+* ``check_strategy(dataframe, symbol, interval)``: gets a DataFrame over the
+  last ``lookback`` bars only, which keeps per-bar cost bounded.
+
+Signals are target positions. A BUY dict means "be long ``quantity``", SELL
+means "be short ``quantity``", CLOSE means flat and None keeps the current
+position. A target set on a bar's close is filled at the next bar's open.
+"""
+import importlib.util
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from trading_bot.core.candle_store import COLUMNS, CandleBuffer
+
+
+@dataclass
+class BacktestResult:
+    equity: np.ndarray
+    positions: np.ndarray
+    trades: int
+    fees: float
+    initial_capital: float
+    liquidated_at: int = None
+    elapsed: float = 0.0
+    mode: str = ""
+
+    @property
+    def pnl(self):
+        return float(self.equity[-1] - self.initial_capital) if len(self.equity) else 0.0
+
+    @property
+    def max_drawdown(self):
+        if not len(self.equity):
+            return 0.0
+        peaks = np.maximum.accumulate(self.equity)
+        return float(np.max((peaks - self.equity) / peaks))
+
+    def summary(self):
+        return {
+            "mode": self.mode,
+            "bars": len(self.equity),
+            "trades": self.trades,
+            "pnl": self.pnl,
+            "return_pct": 100 * self.pnl / self.initial_capital,
+            "fees": self.fees,
+            "max_drawdown_pct": 100 * self.max_drawdown,
+            "liquidated_at": self.liquidated_at,
+            "elapsed_s": self.elapsed,
+        }
+
+
+def klines_to_arrays(klines):
+    """Converts klines (DataFrame, dict of arrays or list of kline dicts) to float64 column arrays."""
+    if isinstance(klines, list):
+        aliases = {"open_time": ("open_time", "start_time", "t"), "open": ("open", "o"), "high": ("high", "h"),
+                   "low": ("low", "l"), "close": ("close", "c"), "volume": ("volume", "v")}
+        columns = {}
+        for column, keys in aliases.items():
+            key = next((k for k in keys if klines and k in klines[0]), None)
+            columns[column] = [row[key] for row in klines] if key else [0.0] * len(klines)
+        klines = columns
+    data = {column: np.asarray(klines[column], dtype=np.float64) for column in COLUMNS if column in klines}
+    if "volume" not in data:
+        data["volume"] = np.zeros_like(data["close"])
+    if "open_time" not in data:
+        data["open_time"] = np.arange(len(data["close"]), dtype=np.float64)
+    elif np.any(np.diff(data["open_time"]) < 0):
+        order = np.argsort(data["open_time"], kind="stable")
+        data = {column: values[order] for column, values in data.items()}
+    return data
+
+
+def load_strategy(ref):
+    """Loads a fresh copy of a strategy module (by module name or file path).
+
+    A fresh copy keeps the backtest's streaming state apart from the live bot's.
+    """
+    if not isinstance(ref, str):
+        return ref
+    if ref.endswith(".py"):
+        spec = importlib.util.spec_from_file_location("backtest_strategy", ref)
+    else:
+        spec = importlib.util.find_spec(ref)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _target(signal, current):
+    if not signal:
+        return current
+    action = str(signal.get("action", "")).upper()
+    if action == "BUY":
+        return abs(float(signal.get("quantity", 0.0)))
+    if action == "SELL":
+        return -abs(float(signal.get("quantity", 0.0)))
+    if action == "CLOSE":
+        return 0.0
+    return current
+
+
+def _incremental_targets(strategy, data, lookback, symbol=None, interval=None):
+    n = len(data["close"])
+    targets = np.empty(n)
+    current = 0.0
+    columns = [(column, data[column]) for column in COLUMNS]
+    on_bar = getattr(strategy, "on_bar", None)
+    if callable(on_bar):
+        bar = {}
+        lists = [(column, values.tolist()) for column, values in columns]
+        for i in range(n):
+            for column, values in lists:
+                bar[column] = values[i]
+            current = _target(on_bar(bar, True, symbol=symbol, interval=interval), current)
+            targets[i] = current
+        return targets
+
+    buffer = CandleBuffer(lookback)
+    rows = np.column_stack([values for _, values in columns]).tolist()
+    for i, row in enumerate(rows):
+        buffer.append(*row)
+        current = _target(strategy.check_strategy(buffer.to_frame(), symbol=symbol, interval=interval), current)
+        targets[i] = current
+    return targets
+
+
+def _forward_fill(values, mask):
+    """Replaces entries where ``mask`` is False with the last entry where it was True (0 before any)."""
+    index = np.where(mask, np.arange(len(values)), 0)
+    np.maximum.accumulate(index, out=index)
+    filled = values[index]
+    if len(mask) and not mask[0]:
+        filled[index == 0] = 0.0
+    return filled
+
+
+def simulate(data, targets, fee_rate=0.0005, leverage=1.0, initial_capital=10_000.0,
+             maintenance_margin=0.005):
+    """Vectorized fill, fee, leverage and PnL simulation.
+
+    Args:
+        data (dict): Column arrays with at least 'open' and 'close'.
+        targets (np.ndarray): Target position after each bar's close (NaN = unchanged).
+        fee_rate (float): Fee per unit of traded notional.
+        leverage (float): Fills are capped at ``initial_capital * leverage`` of notional.
+        initial_capital (float): Starting equity in quote currency.
+        maintenance_margin (float): The account is liquidated once equity falls
+            under this fraction of the open notional.
+
+    Returns:
+        tuple: (equity, positions, trades, fees, liquidated_at)
+    """
+    opens, closes = data["open"], data["close"]
+    n = len(closes)
+    targets = np.asarray(targets, dtype=np.float64)
+    targets = _forward_fill(targets, ~np.isnan(targets))
+
+    # The position held during bar i is the target set at the close of bar i-1.
+    positions = np.zeros(n)
+    positions[1:] = targets[:-1]
+    fills = np.diff(positions, prepend=0.0) != 0
+    limit = initial_capital * leverage / opens
+    positions = _forward_fill(np.clip(positions, -limit, limit), fills)
+
+    traded = np.abs(np.diff(positions, prepend=0.0))
+    fees = traded * opens * fee_rate
+    prev_positions = np.concatenate(([0.0], positions[:-1]))
+    prev_closes = np.concatenate((opens[:1], closes[:-1]))
+    pnl = prev_positions * (opens - prev_closes) + positions * (closes - opens)
+    equity = initial_capital + np.cumsum(pnl - fees)
+
+    liquidated_at = None
+    breached = equity <= np.abs(positions) * closes * maintenance_margin
+    if breached.any():
+        liquidated_at = int(np.argmax(breached))
+        equity[liquidated_at:] = max(float(equity[liquidated_at]), 0.0)
+        positions[liquidated_at + 1:] = 0.0
+        traded[liquidated_at + 1:] = 0.0
+        fees[liquidated_at + 1:] = 0.0
+
+    return equity, positions, int(np.count_nonzero(traded)), float(fees.sum()), liquidated_at
+
+
+def run_backtest(strategy, klines, fee_rate=0.0005, leverage=1.0, initial_capital=10_000.0,
+                 maintenance_margin=0.005, lookback=500, mode=None, symbol=None, interval=None):
+    """Backtests a strategy module (or module name / file path) over historical klines.
+
+    Args:
+        mode (str): Force 'vectorized' or 'incremental'; by default the vectorized
+            path is used when the strategy has ``generate_signals``.
+        symbol (str): The symbol of the klines, passed on to ``on_bar``.
+        interval (str): Their interval, passed on to ``on_bar``.
+
+    Returns:
+        BacktestResult
+    """
+    started = time.perf_counter()
+    strategy = load_strategy(strategy)
+    data = klines_to_arrays(klines)
+    if mode is None:
+        mode = "vectorized" if callable(getattr(strategy, "generate_signals", None)) else "incremental"
+    if mode == "vectorized":
+        targets = np.asarray(strategy.generate_signals(data), dtype=np.float64)
+    else:
+        targets = _incremental_targets(strategy, data, lookback, symbol, interval)
+    equity, positions, trades, fees, liquidated_at = simulate(
+        data, targets, fee_rate, leverage, initial_capital, maintenance_margin)
+    return BacktestResult(equity, positions, trades, fees, initial_capital, liquidated_at,
+                          time.perf_counter() - started, mode)
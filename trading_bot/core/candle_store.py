@@ -0,0 +1,229 @@
+"""Fixed-capacity OHLCV storage between the market-data stream and the strategy."""
+import asyncio
+import sys
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ("open_time", "open", "high", "low", "close", "volume")
+
+_SHORT_KEYS = {"t": "open_time", "o": "open", "h": "high", "l": "low", "c": "close", "v": "volume"}
+_LONG_KEYS = {"start_time": "open_time", "open_time": "open_time", "open": "open", "high": "high",
+              "low": "low", "close": "close", "volume": "volume"}
+
+
+class CandleBuffer:
+    """Ring buffer of OHLCV bars backed by preallocated float64 arrays.
+
+    Every row is written twice, at ``i`` and ``i + capacity``, so the last ``n``
+    bars are always one contiguous slice. That makes ordered views zero-copy
+    and appends O(1) without ever reallocating.
+    """
+
+    def __init__(self, capacity=5000, shared=False):
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        self.capacity = capacity
+        self.shm = None
+        shape = (len(COLUMNS), 2 * capacity)
+        if shared:
+            # Backed by shared memory so strategy worker processes can read it without pickling.
+            self.shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * 8)
+            self._data = np.ndarray(shape, dtype=np.float64, buffer=self.shm.buf)
+            self._data.fill(0.0)
+        else:
+            self._data = np.zeros(shape, dtype=np.float64)
+        self._total = 0
+        self._owner = True
+
+    @classmethod
+    def attach(cls, name, capacity, total):
+        """Opens a read view of a shared buffer created in another process, as of ``total`` appends."""
+        buffer = cls.__new__(cls)
+        buffer.capacity = capacity
+        buffer.shm = _open_shared_memory(name)
+        buffer._data = np.ndarray((len(COLUMNS), 2 * capacity), dtype=np.float64, buffer=buffer.shm.buf)
+        buffer._total = total
+        buffer._owner = False
+        return buffer
+
+    @property
+    def total(self):
+        """Number of bars appended since creation, including those overwritten."""
+        return self._total
+
+    def close(self):
+        """Releases the shared memory, if any. The creating process also unlinks it."""
+        if self.shm is None:
+            return
+        self._data = None  # Views must be gone before the segment can be closed.
+        self.shm.close()
+        if self._owner:
+            self.shm.unlink()
+        self.shm = None
+
+    def __len__(self):
+        return min(self._total, self.capacity)
+
+    @property
+    def last_open_time(self):
+        if not self._total:
+            return None
+        return self._data[0, (self._total - 1) % self.capacity]
+
+    def _write(self, index, row):
+        self._data[:, index] = row
+        self._data[:, index + self.capacity] = row
+
+    def append(self, open_time, open, high, low, close, volume=0.0):
+        """Appends a new bar, overwriting the oldest one when the buffer is full."""
+        self._write(self._total % self.capacity, (open_time, open, high, low, close, volume))
+        self._total += 1
+
+    def update_last(self, open, high, low, close, volume=0.0):
+        """Updates the forming (most recent) bar in place."""
+        if not self._total:
+            raise IndexError("update_last on an empty CandleBuffer")
+        index = (self._total - 1) % self.capacity
+        self._write(index, (self._data[0, index], open, high, low, close, volume))
+
+    def upsert(self, bar):
+        """Stores a bar dict keyed by COLUMNS.
+
+        Returns:
+            bool or None: True if a new bar was appended, False if the forming bar
+            was updated, None if the bar is older than the latest one and was ignored.
+        """
+        last = self.last_open_time
+        open_time = bar["open_time"]
+        if last is not None and open_time < last:
+            return None
+        row = (bar["open"], bar["high"], bar["low"], bar["close"], bar.get("volume", 0.0))
+        if last is not None and open_time == last:
+            self.update_last(*row)
+            return False
+        self.append(open_time, *row)
+        return True
+
+    def extend(self, columns):
+        """Bulk-appends bars from column arrays keyed by COLUMNS (e.g. from the kline cache).
+
+        Only the last ``capacity`` bars are written; older ones would be overwritten anyway.
+        """
+        count = len(columns["open_time"])
+        rows = np.vstack([np.asarray(columns[column], dtype=np.float64)[-self.capacity:] if column in columns
+                          else np.zeros(min(count, self.capacity)) for column in COLUMNS])
+        index = (self._total + count - rows.shape[1] + np.arange(rows.shape[1])) % self.capacity
+        self._data[:, index] = rows
+        self._data[:, index + self.capacity] = rows
+        self._total += count
+
+    def view(self, n=None):
+        """Returns a zero-copy (columns, n) array of the last n bars, oldest first."""
+        size = len(self)
+        n = size if n is None else min(n, size)
+        start = (self._total - n) % self.capacity
+        return self._data[:, start:start + n]
+
+    def column(self, name, n=None):
+        """Returns a zero-copy view of one column for the last n bars."""
+        return self.view(n)[COLUMNS.index(name)]
+
+    def last(self):
+        """Returns the most recent bar as a dict."""
+        if not self._total:
+            return None
+        return dict(zip(COLUMNS, self._data[:, (self._total - 1) % self.capacity].tolist()))
+
+    def to_frame(self, n=None):
+        """Wraps the last n bars in a DataFrame that shares memory with the buffer."""
+        return pd.DataFrame(self.view(n).T, columns=list(COLUMNS), copy=False)
+
+
+def _open_shared_memory(name):
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    # Before 3.13 attaching registers the segment with the resource tracker,
+    # which would unlink it when this process exits. Only the owner may.
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+class CandleStore:
+    """One CandleBuffer per (symbol, interval), each with an asyncio.Lock for writers."""
+
+    def __init__(self, capacity=5000, shared=False):
+        self.capacity = capacity
+        self.shared = shared
+        self._buffers = {}
+        self._locks = {}
+
+    def get(self, symbol, interval):
+        key = (symbol, str(interval))
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = self._buffers[key] = CandleBuffer(self.capacity, self.shared)
+        return buffer
+
+    def lock(self, symbol, interval):
+        """The lock a buffer's writers hold, so nothing is written while another process reads it."""
+        key = (symbol, str(interval))
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        return lock
+
+    def close(self):
+        for buffer in self._buffers.values():
+            buffer.close()
+
+    def __contains__(self, key):
+        symbol, interval = key
+        return (symbol, str(interval)) in self._buffers
+
+    def keys(self):
+        return self._buffers.keys()
+
+
+def parse_bar(data):
+    """Extracts a bar dict keyed by COLUMNS from one candle's fields, or None."""
+    bar = {}
+    for key, value in data.items():
+        column = _LONG_KEYS.get(key) or _SHORT_KEYS.get(key)
+        if column and column not in bar:
+            bar[column] = value
+    if any(column not in bar for column in COLUMNS[:5]):
+        return None
+    try:
+        return {column: float(value) for column, value in bar.items()}
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_candle(message):
+    """Extracts (symbol, interval, bar) from a candlestick message, or None.
+
+    Accepts both the long (``open``, ``start_time``...) and the short
+    (``o``, ``t``...) field names, optionally wrapped in a ``data`` key.
+    The interval may come from an ``interval`` field or a ``BTCUSDT_5`` pair.
+    """
+    if not isinstance(message, dict):
+        return None
+    data = message.get("data", message)
+    if not isinstance(data, dict):
+        return None
+    bar = parse_bar(data)
+    if bar is None:
+        return None
+
+    symbol = data.get("symbol") or data.get("s") or data.get("pair") or message.get("pair")
+    if not symbol:
+        return None
+    symbol = str(symbol).upper()
+    interval = data.get("interval") or data.get("i")
+    if "_" in symbol:
+        symbol, _, pair_interval = symbol.partition("_")
+        interval = interval or pair_interval
+    return symbol, str(interval or ""), bar
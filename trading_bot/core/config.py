@@ -3,3 +3,131 @@ import os
 COINSWITCH_API_KEY = os.getenv("COINSWITCH_API_KEY")
 COINSWITCH_API_SECRET = os.getenv("COINSWITCH_API_SECRET")
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+# Telegram commands handled at once, and seconds a command waits for the exchange before replying.
+TELEGRAM_CONCURRENT_UPDATES = int(os.getenv("TELEGRAM_CONCURRENT_UPDATES", "32"))
+TELEGRAM_REPLY_TIMEOUT = float(os.getenv("TELEGRAM_REPLY_TIMEOUT", "1.5"))
+
+# Exchange endpoints. Point them at a local stand-in (trading_bot.benchmarks.fake_exchange)
+# to run the bot offline.
+COINSWITCH_REST_URL = os.getenv("COINSWITCH_REST_URL", "https://coinswitch.co")
+COINSWITCH_WS_URL = os.getenv("COINSWITCH_WS_URL", "wss://api-trading.coinswitch.co")
+MARKET_DATA_URL = os.getenv("MARKET_DATA_URL", "wss://ws.coinswitch.co")
+
+# Number of bars kept per symbol/interval in the in-memory candle store.
+CANDLE_BUFFER_CAPACITY = int(os.getenv("CANDLE_BUFFER_CAPACITY", "5000"))
+
+# REST transport: per-request timeout in seconds and keep-alive pool size.
+REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", "5"))
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+
+# Order execution: concurrent order workers and the size of the signal queue.
+EXECUTION_WORKERS = int(os.getenv("EXECUTION_WORKERS", "1"))
+EXECUTION_QUEUE_SIZE = int(os.getenv("EXECUTION_QUEUE_SIZE", "1000"))
+
+# Market data pairs to follow, e.g. "BTCUSDT,ETHUSDT,BTCUSDT_5" ("_5" = 5 minute candles).
+MARKET_DATA_PAIRS = [pair.strip() for pair in os.getenv("MARKET_DATA_PAIRS", "").split(",") if pair.strip()]
+
+# Inbound stream queue: bound and overflow policy ("latest", "drop_oldest" or "drop_newest").
+# Fills and order updates are never dropped, whatever the policy.
+INBOUND_QUEUE_SIZE = int(os.getenv("INBOUND_QUEUE_SIZE", "10000"))
+INBOUND_OVERFLOW_POLICY = os.getenv("INBOUND_OVERFLOW_POLICY", "latest")
+
+# Parallel strategies: module names and/or a directory of strategy files, evaluated
+# in STRATEGY_WORKERS processes (0 = one per CPU core). When both are empty the
+# single trading_bot/strategies/strategy.py module runs on the event loop.
+STRATEGY_MODULES = [name.strip() for name in os.getenv("STRATEGY_MODULES", "").split(",") if name.strip()]
+STRATEGY_DIR = os.getenv("STRATEGY_DIR", "")
+STRATEGY_WORKERS = int(os.getenv("STRATEGY_WORKERS", "0"))
+
+# Historical klines: local cache directory, bars per REST page and concurrent page downloads.
+KLINE_CACHE_DIR = os.getenv("KLINE_CACHE_DIR", "data/klines")
+KLINE_PAGE_LIMIT = int(os.getenv("KLINE_PAGE_LIMIT", "1000"))
+KLINE_DOWNLOAD_CONCURRENCY = int(os.getenv("KLINE_DOWNLOAD_CONCURRENCY", "5"))
+
+# REST rate limits in requests per second: one budget per endpoint class plus a global one.
+# Orders are always served first, and other requests leave RATE_LIMIT_ORDER_RESERVE
+# global tokens for them. A 429 is retried up to RATE_LIMIT_RETRIES times, after Retry-After.
+RATE_LIMIT_GLOBAL = float(os.getenv("RATE_LIMIT_GLOBAL", "20"))
+RATE_LIMIT_ORDER = float(os.getenv("RATE_LIMIT_ORDER", "10"))
+RATE_LIMIT_ACCOUNT = float(os.getenv("RATE_LIMIT_ACCOUNT", "5"))
+RATE_LIMIT_MARKET = float(os.getenv("RATE_LIMIT_MARKET", "10"))
+RATE_LIMIT_ORDER_RESERVE = float(os.getenv("RATE_LIMIT_ORDER_RESERVE", "2"))
+RATE_LIMIT_RETRIES = int(os.getenv("RATE_LIMIT_RETRIES", "3"))
+RATE_LIMITS = {"global": RATE_LIMIT_GLOBAL, "order": RATE_LIMIT_ORDER, "account": RATE_LIMIT_ACCOUNT,
+               "market": RATE_LIMIT_MARKET}
+
+# Seconds a balance/positions response is reused. Fills and account updates
+# from the private stream drop it earlier.
+PORTFOLIO_CACHE_TTL = float(os.getenv("PORTFOLIO_CACHE_TTL", "5"))
+
+# Seconds between checks of the in-memory account mirror against REST (0 = never).
+ACCOUNT_RECONCILE_INTERVAL = float(os.getenv("ACCOUNT_RECONCILE_INTERVAL", "60"))
+
+# Socket reconnects: jittered exponential backoff bounds in seconds, background
+# listenKey renewal interval, and a second (standby) private stream connection.
+RECONNECT_INITIAL_DELAY = float(os.getenv("RECONNECT_INITIAL_DELAY", "0.025"))
+RECONNECT_MAX_DELAY = float(os.getenv("RECONNECT_MAX_DELAY", "5"))
+LISTEN_KEY_RENEW_INTERVAL = float(os.getenv("LISTEN_KEY_RENEW_INTERVAL", "1800"))
+PRIVATE_STREAM_STANDBY = os.getenv("PRIVATE_STREAM_STANDBY", "false").lower() in ("1", "true", "yes")
+
+# Hot-path stats: file to dump them to every METRICS_INTERVAL seconds (empty = off;
+# a .prom file gets Prometheus text format) and the rolling window in seconds.
+METRICS_FILE = os.getenv("METRICS_FILE", "")
+METRICS_INTERVAL = float(os.getenv("METRICS_INTERVAL", "10"))
+METRICS_WINDOW = float(os.getenv("METRICS_WINDOW", "60"))
+
+# Orders: prefix of the client order IDs, times a create request that got no ack is
+# sent again, seconds to wait for the private stream to report it first, and the
+# first delay before an order REST could not account for is looked up again.
+CLIENT_ORDER_PREFIX = os.getenv("CLIENT_ORDER_PREFIX", "cb-")
+ORDER_RETRIES = int(os.getenv("ORDER_RETRIES", "2"))
+ORDER_ACK_GRACE = float(os.getenv("ORDER_ACK_GRACE", "0.5"))
+ORDER_LOOKUP_RETRY = float(os.getenv("ORDER_LOOKUP_RETRY", "1.0"))
+
+# Instrument metadata (tick/lot sizes, minimums): file it is saved to for fast restarts
+# (empty = not saved) and seconds between background refreshes (0 = never).
+INSTRUMENTS_FILE = os.getenv("INSTRUMENTS_FILE", "data/instruments.json")
+INSTRUMENTS_REFRESH_INTERVAL = float(os.getenv("INSTRUMENTS_REFRESH_INTERVAL", "3600"))
+
+# Pre-trade risk limits (0 = off). Notional values are in the quote asset; leverage is
+# gross notional over the RISK_EQUITY_ASSET wallet balance.
+RISK_MAX_ORDER_QUANTITY = float(os.getenv("RISK_MAX_ORDER_QUANTITY", "0"))
+RISK_MAX_ORDER_NOTIONAL = float(os.getenv("RISK_MAX_ORDER_NOTIONAL", "0"))
+RISK_MAX_POSITION_NOTIONAL = float(os.getenv("RISK_MAX_POSITION_NOTIONAL", "0"))
+RISK_MAX_GROSS_NOTIONAL = float(os.getenv("RISK_MAX_GROSS_NOTIONAL", "0"))
+RISK_MAX_LEVERAGE = float(os.getenv("RISK_MAX_LEVERAGE", "0"))
+RISK_MAX_OPEN_ORDERS = int(os.getenv("RISK_MAX_OPEN_ORDERS", "0"))
+RISK_MAX_OPEN_ORDERS_PER_SYMBOL = int(os.getenv("RISK_MAX_OPEN_ORDERS_PER_SYMBOL", "0"))
+RISK_MAX_ORDERS_PER_SECOND = float(os.getenv("RISK_MAX_ORDERS_PER_SECOND", "0"))
+RISK_EQUITY_ASSET = os.getenv("RISK_EQUITY_ASSET", "USDT")
+
+# Sharding: worker processes MARKET_DATA_PAIRS are split across by symbol (1 = everything
+# in one process), accounts the shards are dealt out over as comma-separated key:secret
+# pairs (empty = COINSWITCH_API_KEY), and the first delay in seconds before a dead shard
+# is restarted.
+SHARDS = int(os.getenv("SHARDS", "1"))
+SHARD_ACCOUNTS = [tuple(account.strip().split(":", 1)) for account in os.getenv("SHARD_ACCOUNTS", "").split(",")
+                  if ":" in account]
+SHARD_RESTART_DELAY = float(os.getenv("SHARD_RESTART_DELAY", "1"))
+
+# Seconds a shutdown may take, from dropping new signals to confirming that no orders are open.
+SHUTDOWN_DEADLINE = float(os.getenv("SHUTDOWN_DEADLINE", "10"))
+
+# Stream recording: directory for the binary log of every received frame (empty = off)
+# and the size at which a new segment file is started.
+RECORD_DIR = os.getenv("RECORD_DIR", "")
+RECORD_SEGMENT_MB = int(os.getenv("RECORD_SEGMENT_MB", "64"))
+
+# Logging: records are formatted and written on a background thread (LOG_ASYNC).
+# The file rotates at LOG_MAX_MB, or at LOG_ROTATE_WHEN (e.g. "midnight", "H") if set,
+# keeping LOG_BACKUPS old files. LOG_SAMPLE keeps a fraction and LOG_RATE_LIMIT at most
+# N per second of a logger's records, as comma-separated logger=value pairs. Warnings,
+# errors and trade records are never dropped.
+LOG_FILE = os.getenv("LOG_FILE", "trading_bot.log")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_ASYNC = os.getenv("LOG_ASYNC", "true").lower() in ("1", "true", "yes")
+LOG_MAX_MB = float(os.getenv("LOG_MAX_MB", "50"))
+LOG_ROTATE_WHEN = os.getenv("LOG_ROTATE_WHEN", "")
+LOG_BACKUPS = int(os.getenv("LOG_BACKUPS", "5"))
+LOG_SAMPLE = os.getenv("LOG_SAMPLE", "")
+LOG_RATE_LIMIT = os.getenv("LOG_RATE_LIMIT", "trading_bot.ticks=50")
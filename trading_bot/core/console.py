@@ -1,4 +1,5 @@
 import asyncio
+import inspect
 from trading_bot.core.trading_engine import TradingEngine
 
 class ConsoleInterface:
@@ -9,13 +10,18 @@ class ConsoleInterface:
         while True:
             command = await asyncio.to_thread(input, "Enter command: ")
             if command == "balance":
-                balance = self.trading_engine.api_client.get_balance()
+                balance = await self.trading_engine.get_balance()
                 print(f"Balance: {balance}")
             elif command == "positions":
-                positions = self.trading_engine.api_client.get_positions()
+                positions = await self.trading_engine.get_positions()
                 print(f"Positions: {positions}")
+            elif command == "stats":
+                report = self.trading_engine.stats_report()
+                # A ShardSupervisor has to ask its shards first.
+                print(await report if inspect.isawaitable(report) else report)
             elif command == "stop":
-                self.trading_engine.stop()
+                report = await self.trading_engine.stop()
+                print(report.summary())
                 break
             else:
                 print("Unknown command")
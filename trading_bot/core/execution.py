@@ -0,0 +1,180 @@
+"""Asynchronous order execution stage.
+
+Trade signals are queued by the engine and turned into ``create_order`` calls
+by dedicated worker tasks, so a REST round trip never holds up market data.
+Each order records when it was signalled, enqueued, signed, sent and acked.
+"""
+import asyncio
+import itertools
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from trading_bot.core.metrics import metrics
+
+_TRADES = logging.getLogger("trading_bot.trades")
+# (stage, start field, end field) of OrderTiming, recorded for every acked order.
+_ORDER_STAGES = [(metrics.histogram(name), start, end) for name, start, end in (
+    ("rate_limit", "enqueued", "granted"), ("sign", "granted", "signed"), ("send", "signed", "sent"),
+    ("ack", "sent", "acked"), ("signal_to_ack", "signal", "acked"))]
+
+
+@dataclass
+class OrderTiming:
+    """Monotonic timestamps in nanoseconds (``time.perf_counter_ns``)."""
+    signal: int = 0
+    enqueued: int = 0
+    granted: int = 0
+    signed: int = 0
+    sent: int = 0
+    acked: int = 0
+
+    def stages_ms(self):
+        """Returns the time spent in each stage, in milliseconds."""
+        def delta(start, end):
+            return (end - start) / 1e6 if start and end else None
+        return {
+            "queue": delta(self.signal, self.enqueued),
+            "wait": delta(self.enqueued, self.granted or self.signed),
+            "sign": delta(self.granted, self.signed),
+            "send": delta(self.signed, self.sent),
+            "round_trip": delta(self.sent, self.acked),
+            "total": delta(self.signal, self.acked),
+        }
+
+
+@dataclass
+class OrderRequest:
+    signal: dict
+    id: int = 0
+    timing: OrderTiming = field(default_factory=OrderTiming)
+    response: dict = None
+    error: str = None
+
+
+class LatencyStats:
+    """Keeps the most recent latency samples and reports percentiles."""
+
+    def __init__(self, max_samples=10_000):
+        self._samples = deque(maxlen=max_samples)
+
+    def add(self, milliseconds):
+        self._samples.append(milliseconds)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def percentiles(self, *quantiles):
+        if not self._samples:
+            return [None] * len(quantiles)
+        return np.percentile(np.fromiter(self._samples, dtype=float), quantiles).tolist()
+
+    def summary(self):
+        p50, p95, p99 = self.percentiles(50, 95, 99)
+        return {"count": len(self), "p50_ms": p50, "p95_ms": p95, "p99_ms": p99}
+
+
+def order_arguments(signal):
+    """Maps a strategy signal dict onto create_order keyword arguments."""
+    price = signal.get("price")
+    return {
+        "symbol": signal["symbol"],
+        "side": signal["action"],
+        "quantity": signal["quantity"],
+        "price": price,
+        "order_type": signal.get("order_type") or ("MARKET" if price is None else "LIMIT"),
+    }
+
+
+class OrderExecutor:
+    def __init__(self, api_client, workers=1, max_queue=1000):
+        self.api_client = api_client
+        self.workers = workers
+        self.queue = asyncio.Queue(max_queue)
+        self.latency = LatencyStats()
+        self.completed = deque(maxlen=1000)
+        self._ids = itertools.count(1)
+        self._tasks = []
+        self._queued = {}
+        self.in_flight = 0
+
+    def submit(self, trade_signal, signal_time=None):
+        """Queues a signal without waiting for the order. Returns the OrderRequest, or None if the queue is full."""
+        now = time.perf_counter_ns()
+        order = OrderRequest(trade_signal, next(self._ids))
+        order.timing.signal = signal_time or now
+        order.timing.enqueued = now
+        try:
+            self.queue.put_nowait(order)
+        except asyncio.QueueFull:
+            _TRADES.error(f"Order queue full, dropping signal: {trade_signal}")
+            return None
+        self._queued[order.id] = order
+        return order
+
+    def queued(self):
+        """Signals waiting in the queue for a worker, oldest first."""
+        return [order.signal for order in self._queued.values()]
+
+    async def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, drain=True):
+        """Stops the workers, optionally after the queued orders have been sent."""
+        if drain and self._tasks:
+            await self.queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def discard(self):
+        """Drops the queued orders no worker has picked up yet. Returns how many were dropped."""
+        dropped = 0
+        while True:
+            try:
+                order = self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return dropped
+            self._queued.pop(order.id, None)
+            self.queue.task_done()
+            dropped += 1
+
+    async def _worker(self):
+        while True:
+            order = await self.queue.get()
+            self._queued.pop(order.id, None)
+            self.in_flight += 1
+            try:
+                await self.execute(order)
+            finally:
+                self.in_flight -= 1
+                self.queue.task_done()
+
+    async def execute(self, order):
+        try:
+            order.response = await self.api_client.create_order_async(
+                **order_arguments(order.signal), trace=order.timing)
+        except Exception as e:
+            order.error = str(e)
+        order.timing.acked = time.perf_counter_ns()
+        self.completed.append(order)
+
+        total = order.timing.stages_ms()["total"]
+        if order.response is None:
+            order.error = order.error or "no response"
+            metrics.count("orders_failed")
+            _TRADES.error(f"Order {order.id} failed after {total:.1f} ms: {order.error}")
+            return order
+        self.latency.add(total)
+        metrics.count("orders_acked")
+        for histogram, start, end in _ORDER_STAGES:
+            start, end = getattr(order.timing, start), getattr(order.timing, end)
+            if start and end:
+                histogram.record(end - start)
+        _TRADES.info(f"Order {order.id} acked in {total:.1f} ms: {order.response}")
+        return order
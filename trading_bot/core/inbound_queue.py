@@ -0,0 +1,220 @@
+"""Bounded inbound queue with per-key conflation.
+
+Sits between a socket reader and a slower consumer so that reads never stall.
+Messages are put with an optional conflation key:
+
+* Keyed messages (tickers, book snapshots, forming candles) are market state.
+  With the "latest" policy a newer message replaces a pending one with the
+  same key, and keyed messages may be dropped when the queue is full.
+* Unkeyed messages (fills, order and account updates, trades) are never
+  dropped or merged. They are accepted even past the bound.
+"""
+import asyncio
+import time
+from collections import deque
+
+POLICIES = ("latest", "drop_oldest", "drop_newest")
+
+ORDER_EVENTS = {"ORDER_TRADE_UPDATE", "ACCOUNT_UPDATE", "executionReport", "outboundAccountPosition",
+                 "balanceUpdate", "listStatus", "MARGIN_CALL", "ACCOUNT_CONFIG_UPDATE", "TRADE_LITE"}
+
+
+class _Slot:
+    __slots__ = ("item", "key", "enqueued", "alive")
+
+    def __init__(self, item, key, enqueued):
+        self.item = item
+        self.key = key
+        self.enqueued = enqueued
+        self.alive = True
+
+
+class ConflatingQueue:
+    def __init__(self, maxsize=10_000, policy="latest"):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown overflow policy {policy!r}, expected one of {POLICIES}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self._queue = deque()
+        self._droppable = deque()
+        self._pending = {}
+        self._size = 0
+        self._not_empty = asyncio.Event()
+        self.enqueued = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.overflowed = 0
+        self.last_lag_ns = 0
+        self.max_lag_ns = 0
+
+    def qsize(self):
+        return self._size
+
+    def __len__(self):
+        return self._size
+
+    def empty(self):
+        return not self._size
+
+    def put_nowait(self, item, key=None, merge=None):
+        """Queues an item.
+
+        Args:
+            item: The message.
+            key: Conflation key, or None for messages that must never be dropped.
+            merge (callable): Optional ``merge(pending, new)`` used instead of
+                replacing a pending message with the same key.
+
+        Returns:
+            bool: False if the item was dropped.
+        """
+        if key is not None:
+            if self.policy == "latest":
+                slot = self._pending.get(key)
+                if slot is not None:
+                    slot.item = merge(slot.item, item) if merge else item
+                    self.coalesced += 1
+                    return True
+            if self._size >= self.maxsize:
+                if self.policy == "drop_newest" or not self._evict_oldest():
+                    self.dropped += 1
+                    return False
+                self.dropped += 1
+        elif self._size >= self.maxsize:
+            self.overflowed += 1
+
+        slot = _Slot(item, key, time.perf_counter_ns())
+        self._queue.append(slot)
+        if key is not None:
+            self._droppable.append(slot)
+            self._pending[key] = slot
+        self._size += 1
+        self.enqueued += 1
+        self._not_empty.set()
+        return True
+
+    def _evict_oldest(self):
+        while self._droppable:
+            slot = self._droppable.popleft()
+            if slot.alive:
+                self._discard(slot)
+                return True
+        return False
+
+    def _discard(self, slot):
+        slot.alive = False
+        self._size -= 1
+        if self._pending.get(slot.key) is slot:
+            del self._pending[slot.key]
+
+    def get_nowait(self):
+        while self._queue:
+            slot = self._queue.popleft()
+            if not slot.alive:
+                continue
+            self._discard(slot)
+            droppable = self._droppable
+            while droppable and not droppable[0].alive:
+                droppable.popleft()
+            lag = time.perf_counter_ns() - slot.enqueued
+            self.last_lag_ns = lag
+            if lag > self.max_lag_ns:
+                self.max_lag_ns = lag
+            return slot.item
+        raise asyncio.QueueEmpty
+
+    async def get(self):
+        while not self._size:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        return self.get_nowait()
+
+    def lag_ns(self):
+        """How long the oldest pending message has been waiting."""
+        for slot in self._queue:
+            if slot.alive:
+                return time.perf_counter_ns() - slot.enqueued
+        return 0
+
+    def stats(self):
+        return {
+            "size": self._size,
+            "enqueued": self.enqueued,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "overflowed": self.overflowed,
+            "lag_ms": self.lag_ns() / 1e6,
+            "last_lag_ms": self.last_lag_ns / 1e6,
+            "max_lag_ms": self.max_lag_ns / 1e6,
+        }
+
+
+def _merge_levels(older, newer):
+    levels = {str(price): size for price, size in older}
+    levels.update((str(price), size) for price, size in newer)
+    return [[price, size] for price, size in levels.items()]
+
+
+def merge_depth_diffs(pending, new):
+    """Combines two consecutive order-book diffs into one covering both.
+
+    Works on bare diffs and on diffs wrapped in a ``data`` key.
+    """
+    if isinstance(new.get("data"), dict) and isinstance(pending.get("data"), dict):
+        return {**new, "data": merge_depth_diffs(pending["data"], new["data"])}
+    merged = dict(new)
+    for key in ("bids", "b", "asks", "a"):
+        if key in pending and key in new:
+            merged[key] = _merge_levels(pending[key], new[key])
+    for key in ("U", "pu"):
+        if key in pending:
+            merged[key] = pending[key]
+    return merged
+
+
+def _field(data, *keys):
+    for key in keys:
+        value = data.get(key)
+        if value is not None:
+            return value
+    return None
+
+
+def conflation_key(kind, symbol, data):
+    """Returns the (key, merge) pair used to queue a market-data message.
+
+    Tickers and book snapshots conflate per symbol, book diffs are merged and
+    candles conflate per bar. Everything else gets a key of None and is never dropped.
+    """
+    data = data.get("data", data) if isinstance(data, dict) else None
+    if not isinstance(data, dict):
+        return None, None
+    if kind == "ticker":
+        return (symbol, kind), None
+    if kind == "order_book":
+        if "u" in data:
+            return (symbol, kind, "diff"), merge_depth_diffs
+        return (symbol, kind), None
+    if kind == "candles":
+        open_time = _field(data, "start_time", "open_time", "t")
+        if open_time is not None:
+            return (symbol, kind, _field(data, "interval", "i"), open_time), None
+    return None, None
+
+
+def classify_message(message):
+    """Conflation key for a raw stream message of unknown kind."""
+    data = message.get("data", message) if isinstance(message, dict) else None
+    if not isinstance(data, dict):
+        return None, None
+    if _field(data, "e", "event", "type") in ORDER_EVENTS or "order_id" in data:
+        return None, None
+    symbol = _field(data, "symbol", "s", "pair")
+    if symbol is None:
+        return None, None
+    symbol = str(symbol).upper()
+    if _field(data, "bids", "b") is not None and _field(data, "asks", "a") is not None:
+        return conflation_key("order_book", symbol, data)
+    if _field(data, "close", "c") is not None and _field(data, "start_time", "open_time", "t") is not None:
+        return conflation_key("candles", symbol, data)
+    return None, None
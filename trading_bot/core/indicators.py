@@ -0,0 +1,371 @@
+"""Streaming technical indicators.
+
+Every indicator keeps a small amount of running state and updates in constant
+time. ``update(value)`` appends a new bar, ``amend(value)`` replaces the most
+recent one (useful while a candle is still forming from ticks). The numbers
+match the equivalent pandas expressions noted on each class.
+"""
+import math
+from collections import deque
+
+NAN = float("nan")
+
+
+class _KahanSum:
+    """Running sum with Kahan compensation, so add/remove cycles do not drift."""
+    __slots__ = ("total", "_comp")
+
+    def __init__(self):
+        self.total = 0.0
+        self._comp = 0.0
+
+    def add(self, x):
+        y = x - self._comp
+        t = self.total + y
+        self._comp = (t - self.total) - y
+        self.total = t
+
+
+class _Indicator:
+    """Base class that lets an indicator be driven by OHLCV bars."""
+    __slots__ = ("source", "value")
+
+    def __init__(self, source="close"):
+        self.source = source
+        self.value = NAN
+
+    def update_bar(self, bar):
+        return self.update(bar[self.source])
+
+    def amend_bar(self, bar):
+        return self.amend(bar[self.source])
+
+    @property
+    def ready(self):
+        return not math.isnan(self.value)
+
+
+class SMA(_Indicator):
+    """Simple moving average, same as ``series.rolling(period).mean()``."""
+    __slots__ = ("period", "_buf", "_pos", "_count", "_sum")
+
+    def __init__(self, period, source="close"):
+        if period < 1:
+            raise ValueError("period must be >= 1")
+        super().__init__(source)
+        self.period = period
+        self._buf = [0.0] * period
+        self._pos = 0
+        self._count = 0
+        self._sum = _KahanSum()
+
+    def update(self, x):
+        x = float(x)
+        if self._count == self.period:
+            self._sum.add(-self._buf[self._pos])
+        else:
+            self._count += 1
+        self._buf[self._pos] = x
+        self._sum.add(x)
+        self._pos = (self._pos + 1) % self.period
+        self.value = self._sum.total / self.period if self._count == self.period else NAN
+        return self.value
+
+    def amend(self, x):
+        if not self._count:
+            return self.update(x)
+        x = float(x)
+        last = self._pos - 1
+        self._sum.add(-self._buf[last])
+        self._sum.add(x)
+        self._buf[last] = x
+        self.value = self._sum.total / self.period if self._count == self.period else NAN
+        return self.value
+
+
+class EMA(_Indicator):
+    """Exponential moving average, same as ``series.ewm(span=period, adjust=False).mean()``."""
+    __slots__ = ("period", "alpha", "_prev", "_count")
+
+    def __init__(self, period, source="close"):
+        if period < 1:
+            raise ValueError("period must be >= 1")
+        super().__init__(source)
+        self.period = period
+        self.alpha = 2.0 / (period + 1.0)
+        self._prev = NAN
+        self._count = 0
+
+    def _compute(self, x):
+        if math.isnan(self._prev):
+            return x
+        return self._prev + self.alpha * (x - self._prev)
+
+    def update(self, x):
+        if self._count:
+            self._prev = self.value
+        self._count += 1
+        self.value = self._compute(float(x))
+        return self.value
+
+    def amend(self, x):
+        if not self._count:
+            return self.update(x)
+        self.value = self._compute(float(x))
+        return self.value
+
+
+class RollingMin(_Indicator):
+    """Rolling minimum, same as ``series.rolling(period).min()``.
+
+    A monotonic deque holds the committed values of the window; the most recent
+    value is kept outside of it so that ``amend`` stays O(1).
+    """
+    __slots__ = ("period", "_sign", "_deque", "_latest", "_count")
+
+    def __init__(self, period, source="close"):
+        if period < 1:
+            raise ValueError("period must be >= 1")
+        super().__init__(source)
+        self.period = period
+        self._sign = 1.0
+        self._deque = deque()
+        self._latest = NAN
+        self._count = 0
+
+    def _compute(self):
+        if self._count < self.period:
+            return NAN
+        best = self._latest
+        if self._deque and self._deque[0][1] < best:
+            best = self._deque[0][1]
+        return best * self._sign
+
+    def update(self, x):
+        dq = self._deque
+        if self._count:
+            latest = self._latest
+            while dq and dq[-1][1] >= latest:
+                dq.pop()
+            dq.append((self._count - 1, latest))
+        self._count += 1
+        limit = self._count - 1 - self.period
+        while dq and dq[0][0] <= limit:
+            dq.popleft()
+        self._latest = float(x) * self._sign
+        self.value = self._compute()
+        return self.value
+
+    def amend(self, x):
+        if not self._count:
+            return self.update(x)
+        self._latest = float(x) * self._sign
+        self.value = self._compute()
+        return self.value
+
+
+class RollingMax(RollingMin):
+    """Rolling maximum, same as ``series.rolling(period).max()``."""
+    __slots__ = ()
+
+    def __init__(self, period, source="close"):
+        super().__init__(period, source)
+        self._sign = -1.0
+
+
+class RollingVariance(_Indicator):
+    """Rolling sample variance, same as ``series.rolling(period).var()`` (ddof=1).
+
+    Uses Welford's add/remove recurrences over a ring of the window values.
+    """
+    __slots__ = ("period", "_buf", "_pos", "_count", "_mean", "_m2")
+
+    def __init__(self, period, source="close"):
+        if period < 1:
+            raise ValueError("period must be >= 1")
+        super().__init__(source)
+        self.period = period
+        self._buf = [0.0] * period
+        self._pos = 0
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def _add(self, x):
+        self._count += 1
+        delta = x - self._mean
+        self._mean += delta / self._count
+        self._m2 += delta * (x - self._mean)
+
+    def _remove(self, x):
+        self._count -= 1
+        if not self._count:
+            self._mean = 0.0
+            self._m2 = 0.0
+            return
+        delta = x - self._mean
+        self._mean -= delta / self._count
+        self._m2 -= delta * (x - self._mean)
+
+    def _compute(self):
+        if self._count < self.period or self.period < 2:
+            return NAN
+        return max(self._m2, 0.0) / (self._count - 1)
+
+    def update(self, x):
+        x = float(x)
+        if self._count == self.period:
+            self._remove(self._buf[self._pos])
+        self._buf[self._pos] = x
+        self._add(x)
+        self._pos = (self._pos + 1) % self.period
+        self.value = self._compute()
+        return self.value
+
+    def amend(self, x):
+        if not self._count:
+            return self.update(x)
+        x = float(x)
+        last = self._pos - 1
+        self._remove(self._buf[last])
+        self._add(x)
+        self._buf[last] = x
+        self.value = self._compute()
+        return self.value
+
+    @property
+    def std(self):
+        return math.sqrt(self.value) if self.value == self.value else NAN
+
+
+class RSI(_Indicator):
+    """Relative strength index over simple averages of gains and losses.
+
+    Same as::
+
+        delta = close.diff()
+        gain = delta.clip(lower=0).rolling(period).mean()
+        loss = (-delta.clip(upper=0)).rolling(period).mean()
+        rsi = 100 - 100 / (1 + gain / loss)
+    """
+    __slots__ = ("period", "_gain", "_loss", "_prev", "_last", "_count")
+
+    def __init__(self, period=14, source="close"):
+        super().__init__(source)
+        self.period = period
+        self._gain = SMA(period)
+        self._loss = SMA(period)
+        self._prev = NAN
+        self._last = NAN
+        self._count = 0
+
+    def _compute(self):
+        gain, loss = self._gain.value, self._loss.value
+        if math.isnan(gain) or math.isnan(loss):
+            return NAN
+        if loss == 0.0:
+            return 100.0 if gain > 0.0 else NAN
+        return 100.0 - 100.0 / (1.0 + gain / loss)
+
+    def update(self, x):
+        x = float(x)
+        if self._count:
+            self._prev = self._last
+            delta = x - self._prev
+            self._gain.update(delta if delta > 0.0 else 0.0)
+            self._loss.update(-delta if delta < 0.0 else 0.0)
+        self._count += 1
+        self._last = x
+        self.value = self._compute()
+        return self.value
+
+    def amend(self, x):
+        if self._count < 2:
+            # No delta has been recorded yet, so there is nothing to revise.
+            if not self._count:
+                return self.update(x)
+            self._last = float(x)
+            return self.value
+        x = float(x)
+        delta = x - self._prev
+        self._gain.amend(delta if delta > 0.0 else 0.0)
+        self._loss.amend(-delta if delta < 0.0 else 0.0)
+        self._last = x
+        self.value = self._compute()
+        return self.value
+
+
+class ATR(_Indicator):
+    """Average true range over a simple average of the true range.
+
+    Same as ``true_range.rolling(period).mean()`` where the first bar's true
+    range is ``high - low``.
+    """
+    __slots__ = ("period", "_tr", "_prev_close", "_last_close", "_count")
+
+    def __init__(self, period=14):
+        super().__init__(None)
+        self.period = period
+        self._tr = SMA(period)
+        self._prev_close = NAN
+        self._last_close = NAN
+        self._count = 0
+
+    def _true_range(self, high, low):
+        tr = high - low
+        prev = self._prev_close
+        if not math.isnan(prev):
+            tr = max(tr, abs(high - prev), abs(low - prev))
+        return tr
+
+    def update(self, high, low, close):
+        if self._count:
+            self._prev_close = self._last_close
+        self._count += 1
+        self._last_close = float(close)
+        self.value = self._tr.update(self._true_range(float(high), float(low)))
+        return self.value
+
+    def amend(self, high, low, close):
+        if not self._count:
+            return self.update(high, low, close)
+        self._last_close = float(close)
+        self.value = self._tr.amend(self._true_range(float(high), float(low)))
+        return self.value
+
+    def update_bar(self, bar):
+        return self.update(bar["high"], bar["low"], bar["close"])
+
+    def amend_bar(self, bar):
+        return self.amend(bar["high"], bar["low"], bar["close"])
+
+
+class IndicatorSet:
+    """A named group of indicators that are fed the same OHLCV bars.
+
+    Example::
+
+        indicators = IndicatorSet(sma_short=SMA(10), sma_long=SMA(50), atr=ATR(14))
+        indicators.update({"open": 1, "high": 2, "low": 0.5, "close": 1.5, "volume": 10})
+        indicators["sma_short"]
+    """
+
+    def __init__(self, **indicators):
+        self.indicators = indicators
+        self._items = tuple(indicators.items())
+
+    def update(self, bar, new_bar=True):
+        """Feeds a bar to every indicator. ``new_bar=False`` revises the forming bar."""
+        if new_bar:
+            for _, indicator in self._items:
+                indicator.update_bar(bar)
+        else:
+            for _, indicator in self._items:
+                indicator.amend_bar(bar)
+
+    def __getitem__(self, name):
+        return self.indicators[name].value
+
+    @property
+    def values(self):
+        return {name: indicator.value for name, indicator in self._items}
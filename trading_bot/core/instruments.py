@@ -0,0 +1,324 @@
+"""Instrument metadata and precision rounding, loaded once and kept in memory.
+
+The futures instrument list (``/futures/instrument_info``) is fetched at
+start-up and saved to a JSON file, so a restart reads the file and is ready
+straight away; a background task refreshes both every
+INSTRUMENTS_REFRESH_INTERVAL seconds. An order never waits for metadata.
+
+Each instrument keeps its tick size, lot size, minimum quantity and minimum
+notional as integers in units of its price and quantity precision. Rounding
+a price or quantity turns it into units once, snaps it to the tick or lot
+with integer arithmetic, and turns it back with a single division. The
+result is the float closest to the exchange's decimal, with no binary noise
+(0.1 + 0.2 stays 0.3), so the exchange never rejects an order for precision.
+Quantities are rounded down; prices are rounded down for buys and up for
+sells, so an order is never more aggressive than the signal asked for.
+"""
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from dataclasses import dataclass
+from decimal import ROUND_CEILING, Decimal, InvalidOperation
+from pathlib import Path
+
+from trading_bot.core.config import INSTRUMENTS_FILE, INSTRUMENTS_REFRESH_INTERVAL
+from trading_bot.core.metrics import metrics
+
+
+def _floor(value):
+    # Tolerates float error, as in 0.29 * 100 = 28.999999999999996.
+    return math.floor(value + 1e-9 + abs(value) * 1e-12)
+
+
+def _ceil(value):
+    return math.ceil(value - 1e-9 - abs(value) * 1e-12)
+
+
+def _decimal(value):
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        number = Decimal(str(value))
+    except InvalidOperation:
+        return None
+    return number if number.is_finite() and number > 0 else None
+
+
+def _first(row, *keys):
+    for key in keys:
+        value = _decimal(row.get(key))
+        if value is not None:
+            return value
+    return None
+
+
+def _scale(precision, step):
+    """10 ** decimals, enough decimals for both the precision and the step size."""
+    decimals = int(precision) if precision is not None else 0
+    if step is not None:
+        decimals = max(decimals, -step.normalize().as_tuple().exponent)
+    return 10 ** max(decimals, 0)
+
+
+def _units(value, scale):
+    return int((value * scale).to_integral_value(ROUND_CEILING)) if value is not None else 0
+
+
+@dataclass(frozen=True)
+class Instrument:
+    """Precision rules of one symbol, as integers in price and quantity units.
+
+    A price of ``n`` price units is ``n / price_scale``; a quantity of ``n``
+    quantity units is ``n / quantity_scale``. ``min_notional`` is in price
+    units times quantity units. 0 means no limit.
+    """
+
+    symbol: str
+    price_scale: int
+    tick: int
+    quantity_scale: int
+    lot: int
+    min_quantity: int = 0
+    max_quantity: int = 0
+    min_notional: int = 0
+    max_leverage: float = 0.0
+
+    def price_units(self, price, side=None):
+        scaled = price * self.price_scale
+        if side == "BUY":
+            units = _floor(scaled)
+        elif side == "SELL":
+            units = _ceil(scaled)
+        else:
+            units = round(scaled)
+        excess = units % self.tick
+        if not excess:
+            return units
+        if side == "BUY" or (side is None and excess * 2 < self.tick):
+            return units - excess
+        return units - excess + self.tick
+
+    def quantity_units(self, quantity):
+        units = _floor(quantity * self.quantity_scale)
+        return units - units % self.lot
+
+    def round_price(self, price, side=None):
+        """The price on the tick grid: down for a buy, up for a sell, nearest otherwise."""
+        return self.price_units(price, side) / self.price_scale
+
+    def round_quantity(self, quantity):
+        """The quantity rounded down to a whole number of lots."""
+        return self.quantity_units(quantity) / self.quantity_scale
+
+    def check(self, quantity_units, price_units=None):
+        """Why an order of this size would be rejected, or None if it would not."""
+        if quantity_units <= 0 or quantity_units < self.min_quantity:
+            return f"min_quantity: {quantity_units / self.quantity_scale} < {self.min_quantity / self.quantity_scale}"
+        if self.max_quantity and quantity_units > self.max_quantity:
+            return f"max_quantity: {quantity_units / self.quantity_scale} > {self.max_quantity / self.quantity_scale}"
+        if price_units is not None and price_units <= 0:
+            return f"price: {price_units / self.price_scale} is not positive"
+        if self.min_notional and price_units and quantity_units * price_units < self.min_notional:
+            scale = self.price_scale * self.quantity_scale
+            return f"min_notional: {quantity_units * price_units / scale} < {self.min_notional / scale}"
+        return None
+
+
+def parse_instrument(symbol, row):
+    """An Instrument from an instrument_info record, or None if it lacks the precision fields."""
+    if not isinstance(row, dict):
+        return None
+    symbol = str(row.get("symbol") or symbol or "").upper()
+    price_precision, quantity_precision = row.get("price_precision"), row.get("quantity_precision")
+    tick = _first(row, "tick_size", "price_tick", "tickSize")
+    lot = _first(row, "lot_size", "step_size", "quantity_step", "stepSize")
+    if not symbol or (price_precision is None and tick is None) or (quantity_precision is None and lot is None):
+        return None
+    try:
+        price_scale, quantity_scale = _scale(price_precision, tick), _scale(quantity_precision, lot)
+    except (TypeError, ValueError):
+        return None
+    min_notional = _first(row, "min_notional", "min_order_value", "minNotional")
+    max_leverage = _first(row, "max_leverage", "maxLeverage")
+    return Instrument(symbol, price_scale, max(_units(tick, price_scale), 1), quantity_scale,
+                      max(_units(lot, quantity_scale), 1),
+                      min_quantity=_units(_first(row, "min_quantity", "min_qty", "min_base_quantity"), quantity_scale),
+                      max_quantity=_units(_first(row, "max_quantity", "max_qty", "max_base_quantity"), quantity_scale),
+                      min_notional=_units(min_notional, price_scale * quantity_scale),
+                      max_leverage=float(max_leverage or 0))
+
+
+def _records(response):
+    """(symbol, record) pairs of an instrument_info response keyed by symbol or given as a list."""
+    data = response.get("data", response) if isinstance(response, dict) else response
+    if isinstance(data, dict):
+        if "symbol" in data:
+            return [(data["symbol"], data)]
+        return [(symbol, row) for symbol, row in data.items() if isinstance(row, dict)]
+    return [(row.get("symbol"), row) for row in data or () if isinstance(row, dict)]
+
+
+class InstrumentRegistry:
+    """Instrument metadata by symbol, persisted to ``path`` and refreshed in the background.
+
+    Args:
+        path (str): JSON file the metadata is saved to and read back from
+            on start-up (empty = not persisted).
+        refresh_interval (float): Seconds between refreshes, and the age at
+            which a saved file is refreshed right after start-up (0 = never).
+    """
+
+    def __init__(self, api_client, path=INSTRUMENTS_FILE, refresh_interval=INSTRUMENTS_REFRESH_INTERVAL,
+                 exchange="EXCHANGE_2"):
+        self.api_client = api_client
+        self.path = Path(path) if path else None
+        self.refresh_interval = refresh_interval
+        self.exchange = exchange
+        self.instruments = {}
+        self.fetched = None
+        self._records = {}
+        self._refresh_task = None
+        self.refreshes = 0
+        self.rounded = 0
+        self.missing = 0
+        self.rejected = {}
+
+    def get(self, symbol):
+        return self.instruments.get(str(symbol).upper())
+
+    def __contains__(self, symbol):
+        return str(symbol).upper() in self.instruments
+
+    def __len__(self):
+        return len(self.instruments)
+
+    # Loading.
+
+    def update(self, response, fetched=None):
+        """Adds or replaces the instruments of an instrument_info response.
+
+        Returns:
+            int: The number of instruments it held.
+        """
+        instruments, records = {}, {}
+        for symbol, row in _records(response):
+            instrument = parse_instrument(symbol, row)
+            if instrument is not None:
+                instruments[instrument.symbol] = instrument
+                records[instrument.symbol] = row
+        # One assignment, so a lookup never sees a half-updated table.
+        self.instruments = {**self.instruments, **instruments}
+        self._records.update(records)
+        if instruments:
+            self.fetched = fetched if fetched is not None else time.time()
+        return len(instruments)
+
+    def load(self):
+        """Reads the saved metadata. Returns the number of instruments loaded."""
+        if self.path is None or not self.path.exists():
+            return 0
+        try:
+            saved = json.loads(self.path.read_text())
+            return self.update(saved["instruments"], saved.get("fetched"))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logging.warning(f"Could not read instrument metadata from {self.path}: {e}")
+            return 0
+
+    def save(self):
+        if self.path is None or not self._records:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.path.with_name(self.path.name + ".tmp")
+        temporary.write_text(json.dumps({"fetched": self.fetched, "instruments": self._records}))
+        os.replace(temporary, self.path)
+
+    async def refresh(self):
+        """Fetches the instrument list and saves it. Returns the number of instruments fetched."""
+        response = await self.api_client.futures_instrument_info_async(exchange=self.exchange)
+        count = self.update(response) if response is not None else 0
+        if not count:
+            logging.warning("Instrument metadata refresh returned no instruments.")
+            return 0
+        self.refreshes += 1
+        try:
+            await asyncio.to_thread(self.save)
+        except OSError as e:
+            logging.warning(f"Could not save instrument metadata to {self.path}: {e}")
+        return count
+
+    @property
+    def stale(self):
+        return self.fetched is None or bool(
+            self.refresh_interval and time.time() - self.fetched >= self.refresh_interval)
+
+    async def start(self):
+        """Loads the saved metadata, fetching it first only if there is none, and starts the refreshes."""
+        loaded = self.load()
+        if not loaded:
+            await self.refresh()
+        logging.info(f"{len(self.instruments)} instrument(s) loaded "
+                     f"{'from ' + str(self.path) if loaded else 'from the exchange'}.")
+        if self._refresh_task is None and self.refresh_interval:
+            self._refresh_task = asyncio.create_task(self._refresh_loop(immediately=loaded and self.stale))
+
+    async def _refresh_loop(self, immediately=False):
+        while True:
+            if not immediately:
+                await asyncio.sleep(self.refresh_interval)
+            immediately = False
+            try:
+                await self.refresh()
+            except Exception:
+                logging.exception("Instrument metadata refresh failed")
+
+    async def stop(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            await asyncio.gather(self._refresh_task, return_exceptions=True)
+            self._refresh_task = None
+
+    # Orders.
+
+    def normalize(self, signal):
+        """Rounds a signal's quantity and price to the symbol's lot and tick, and validates them.
+
+        A symbol without metadata is passed through unchanged.
+
+        Returns:
+            tuple: (signal, None), the signal rounded if it needed to be, or
+            (None, why it would be rejected), starting with the rule it broke.
+        """
+        instrument = self.instruments.get(str(signal.get("symbol", "")).upper())
+        if instrument is None:
+            self.missing += 1
+            metrics.count("instrument_missing")
+            return signal, None
+        try:
+            quantity = float(signal.get("quantity") or 0)
+            price = signal.get("price")
+            price_units = None if price is None else instrument.price_units(
+                float(price), str(signal.get("action", "")).upper())
+        except (TypeError, ValueError):
+            return self._reject("invalid", f"invalid: quantity {signal.get('quantity')!r}, "
+                                           f"price {signal.get('price')!r}")
+        quantity_units = instrument.quantity_units(quantity)
+        reason = instrument.check(quantity_units, price_units)
+        if reason is not None:
+            return self._reject(reason.split(":", 1)[0], reason)
+        rounded_quantity = quantity_units / instrument.quantity_scale
+        rounded_price = None if price_units is None else price_units / instrument.price_scale
+        if rounded_quantity == signal.get("quantity") and rounded_price == price:
+            return signal, None
+        self.rounded += 1
+        return {**signal, "quantity": rounded_quantity, "price": rounded_price}, None
+
+    def _reject(self, rule, reason):
+        self.rejected[rule] = self.rejected.get(rule, 0) + 1
+        return None, reason
+
+    def stats(self):
+        return {"instruments": len(self.instruments), "fetched": self.fetched, "refreshes": self.refreshes,
+                "rounded": self.rounded, "missing": self.missing, "rejected": dict(self.rejected)}
@@ -0,0 +1,211 @@
+"""Historical klines: a concurrent page downloader and a local columnar cache.
+
+Bars are stored per symbol and interval as one raw float64 file per column
+(``<directory>/<SYMBOL>/<interval>/<column>.f64``). The files are append-only,
+so a later run only fetches and appends the missing tail. Reading them is a
+memory map, so warming up many symbols costs a few page faults, not a download.
+"""
+import asyncio
+import logging
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+from trading_bot.core.candle_store import COLUMNS, parse_bar
+
+_UNITS = {"": 1, "m": 1, "h": 60, "d": 1440, "w": 10080}
+
+
+def interval_ms(interval):
+    """'15' or '15m' -> 900000 ms. '1h', '1d' and '1w' are accepted too."""
+    text = str(interval).strip().lower()
+    digits = text.rstrip("mhdw")
+    unit = text[len(digits):]
+    if not digits.isdigit() or unit not in _UNITS:
+        raise ValueError(f"Unsupported kline interval {interval!r}")
+    return int(digits) * _UNITS[unit] * 60_000
+
+
+def _empty():
+    return {column: np.empty(0, dtype=np.float64) for column in COLUMNS}
+
+
+def parse_klines(response):
+    """Turns a klines response (rows as dicts or [t, o, h, l, c, v] lists) into column arrays."""
+    rows = response.get("data", []) if isinstance(response, dict) else response
+    bars = []
+    for row in rows or ():
+        if isinstance(row, dict):
+            bar = parse_bar(row)
+        elif isinstance(row, (list, tuple)) and len(row) >= 5:
+            try:
+                bar = dict(zip(COLUMNS, map(float, row[:6])))
+            except (TypeError, ValueError):
+                bar = None
+        else:
+            bar = None
+        if bar is not None:
+            bars.append(bar)
+    if not bars:
+        return _empty()
+    return {column: np.array([bar.get(column, 0.0) for bar in bars], dtype=np.float64) for column in COLUMNS}
+
+
+class KlineCache:
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def _path(self, symbol, interval):
+        return self.directory / symbol.upper() / str(interval)
+
+    def _files(self, symbol, interval):
+        path = self._path(symbol, interval)
+        return {column: path / f"{column}.f64" for column in COLUMNS}
+
+    def count(self, symbol, interval):
+        """Number of complete bars cached. A bar is only complete once every column file holds it."""
+        sizes = [file.stat().st_size // 8 if file.exists() else 0 for file in self._files(symbol, interval).values()]
+        return min(sizes)
+
+    def _open_time_at(self, symbol, interval, index):
+        with open(self._files(symbol, interval)["open_time"], "rb") as file:
+            file.seek(index * 8)
+            return float(np.frombuffer(file.read(8), dtype=np.float64)[0])
+
+    def first_open_time(self, symbol, interval):
+        return self._open_time_at(symbol, interval, 0) if self.count(symbol, interval) else None
+
+    def last_open_time(self, symbol, interval):
+        count = self.count(symbol, interval)
+        return self._open_time_at(symbol, interval, count - 1) if count else None
+
+    def load(self, symbol, interval, start_time=None, end_time=None, limit=None):
+        """Memory-maps the cached bars of [start_time, end_time], the last ``limit`` of them at most.
+
+        Returns:
+            dict: Read-only float64 column arrays keyed by COLUMNS, oldest bar first.
+        """
+        count = self.count(symbol, interval)
+        if not count:
+            return _empty()
+        columns = {column: np.memmap(file, dtype=np.float64, mode="r", shape=(count,))
+                   for column, file in self._files(symbol, interval).items()}
+        times = columns["open_time"]
+        low = 0 if start_time is None else int(np.searchsorted(times, start_time, "left"))
+        high = count if end_time is None else int(np.searchsorted(times, end_time, "right"))
+        if limit:
+            low = max(low, high - limit)
+        return {column: values[low:high] for column, values in columns.items()}
+
+    def write(self, symbol, interval, bars):
+        """Adds bars (column arrays, in any order, possibly already cached).
+
+        Returns:
+            int: The number of bars that were not cached before.
+        """
+        times, index = np.unique(np.asarray(bars["open_time"], dtype=np.float64), return_index=True)
+        if not len(times):
+            return 0
+        bars = {column: np.asarray(bars[column], dtype=np.float64)[index] for column in COLUMNS}
+        files = self._files(symbol, interval)
+        self._path(symbol, interval).mkdir(parents=True, exist_ok=True)
+        count = self.count(symbol, interval)
+        for file in files.values():
+            # Drops a bar left half-written by an interrupted append.
+            if file.exists() and file.stat().st_size != count * 8:
+                os.truncate(file, count * 8)
+
+        last = self.last_open_time(symbol, interval)
+        if last is None or times[0] > last:
+            for column, file in files.items():
+                with open(file, "ab") as handle:
+                    handle.write(bars[column].tobytes())
+            return len(times)
+
+        cached = {column: np.array(values) for column, values in self.load(symbol, interval).items()}
+        new = ~np.isin(times, cached["open_time"])
+        if not new.any():
+            return 0
+        merged = {column: np.concatenate((cached[column], bars[column][new])) for column in COLUMNS}
+        order = np.argsort(merged["open_time"], kind="stable")
+        for column, file in files.items():
+            temp = file.with_suffix(".tmp")
+            temp.write_bytes(merged[column][order].tobytes())
+            os.replace(temp, file)
+        return int(new.sum())
+
+
+class KlineDownloader:
+    """Fills a KlineCache from the REST klines endpoint.
+
+    A time range is split into pages of ``page_limit`` bars. Pages are fetched
+    concurrently, at most ``concurrency`` at a time; the client's request
+    scheduler keeps them within the market-data rate limit.
+    """
+
+    def __init__(self, api_client, cache, exchange="EXCHANGE_2", page_limit=1000, concurrency=5):
+        self.api_client = api_client
+        self.cache = cache
+        self.exchange = exchange
+        self.page_limit = page_limit
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.pages = 0
+
+    async def _fetch_page(self, symbol, interval, start_time, end_time):
+        params = {"symbol": symbol, "interval": str(interval), "exchange": self.exchange,
+                  "start_time": int(start_time), "end_time": int(end_time), "limit": self.page_limit}
+        async with self._semaphore:
+            response = await self.api_client.get_klines_async(params)
+        self.pages += 1
+        if response is None:
+            raise ConnectionError(f"Kline page {symbol} {interval} {start_time}-{end_time} failed")
+        return parse_klines(response)
+
+    def _pages(self, start_time, end_time, step):
+        size = self.page_limit * step
+        return [(start, min(start + size - 1, end_time)) for start in range(int(start_time), int(end_time) + 1, size)]
+
+    async def download(self, symbol, interval, start_time, end_time=None):
+        """Makes sure the cache holds the closed bars of [start_time, end_time].
+
+        Only the ranges missing from the cache are requested. They always run
+        up to the cached bars, even when the requested range does not reach
+        them, so the cache holds every bar from its first to its last and
+        only its two ends can be missing. The forming bar is never cached,
+        because it still changes.
+
+        Returns:
+            int: The number of bars added to the cache.
+        """
+        symbol = symbol.upper()
+        step = interval_ms(interval)
+        last_closed = (int(time.time() * 1000) // step - 1) * step
+        end_time = min(last_closed if end_time is None else int(end_time), last_closed)
+        if end_time < start_time:
+            return 0
+
+        first = self.cache.first_open_time(symbol, interval)
+        last = self.cache.last_open_time(symbol, interval)
+        if first is None:
+            missing = [(start_time, end_time)]
+        else:
+            # A gap between the cache and the range is filled too; dropping it would leave a hole
+            # the first/last check above never sees again.
+            missing = []
+            if start_time < first:
+                missing.append((start_time, first - 1))
+            if end_time >= last + step:
+                missing.append((last + step, end_time))
+        pages = [page for start, end in missing for page in self._pages(start, end, step)]
+        if not pages:
+            return 0
+
+        results = await asyncio.gather(*(self._fetch_page(symbol, interval, start, end) for start, end in pages))
+        bars = {column: np.concatenate([result[column] for result in results]) for column in COLUMNS}
+        times = bars["open_time"]
+        keep = (times >= pages[0][0]) & (times <= pages[-1][1])
+        added = self.cache.write(symbol, interval, {column: values[keep] for column, values in bars.items()})
+        logging.info(f"Cached {added} new {symbol} {interval} bar(s) from {len(pages)} page(s).")
+        return added
@@ -1,11 +1,220 @@
+"""Logging setup: a background writer thread, file rotation and sampling of high-volume loggers.
+
+In asynchronous mode the root logger only has a queue handler. Records are
+queued unformatted, and a QueueListener thread formats them and writes them
+to the console and the rotating log file, so logging on the event loop costs
+a filter check and a queue put. Arguments are formatted later on that thread:
+don't log objects that are mutated right after the call.
+
+Market data ticks log to ``trading_bot.ticks`` and can be sampled or rate
+limited before anything is queued. Records at WARNING and above, and those of
+``trading_bot.trades``, always pass.
+"""
+import atexit
 import logging
+import logging.handlers
+import queue
+import threading
+import time
+
+from trading_bot.core.config import (LOG_ASYNC, LOG_BACKUPS, LOG_FILE, LOG_LEVEL, LOG_MAX_MB, LOG_RATE_LIMIT,
+                                     LOG_ROTATE_WHEN, LOG_SAMPLE)
+from trading_bot.core.metrics import metrics
+from trading_bot.core.rate_limit import TokenBucket
+
+TICKS = "trading_bot.ticks"
+TRADES = "trading_bot.trades"
+FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+_TRACEBACKS = logging.Formatter()
+_installed = []
+_listener = None
+
+
+def parse_rules(text):
+    """Parses "logger=value,logger=value" into {logger: float}."""
+    rules = {}
+    for item in text.split(","):
+        name, _, value = item.rpartition("=")
+        if name.strip() and value.strip():
+            rules[name.strip()] = float(value)
+    return rules
+
+
+def _closest(name, rules):
+    # The most specific rule for a logger: its own, or its nearest parent's.
+    best = None
+    for key in rules:
+        if (name == key or name.startswith(key + ".")) and (best is None or len(key) > len(best)):
+            best = key
+    return best
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction, and/or at most N per second, of the records of chosen loggers.
+
+    Args:
+        sample (dict): Logger name to the fraction of its records kept, e.g. 0.01
+            keeps every hundredth.
+        rate_limit (dict): Logger name to the records kept per second.
+        always (tuple): Loggers that are never sampled.
+
+    A rule covers the logger and its children. Dropped records are counted per
+    rule in ``dropped`` and in the ``log_dropped`` stats counter.
+    """
+
+    def __init__(self, sample=None, rate_limit=None, always=(TRADES,)):
+        super().__init__()
+        self.every = {name: max(1, round(1 / fraction)) if fraction > 0 else 0
+                      for name, fraction in (sample or {}).items()}
+        self.buckets = {name: TokenBucket(rate) for name, rate in (rate_limit or {}).items() if rate > 0}
+        self.always = tuple(always)
+        self.dropped = {}
+        self._seen = {}
+        self._rules = {}
+        self._lock = threading.Lock()
+
+    def _rule(self, name):
+        rule = self._rules.get(name)
+        if rule is None:
+            if _closest(name, self.always) is not None:
+                rule = (None, None)
+            else:
+                rule = (_closest(name, self.every), _closest(name, self.buckets))
+            self._rules[name] = rule
+        return rule
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        sampled, limited = self._rule(record.name)
+        if sampled is None and limited is None:
+            return True
+        with self._lock:
+            if sampled is not None:
+                seen = self._seen[sampled] = self._seen.get(sampled, 0) + 1
+                every = self.every[sampled]
+                if not every or seen % every:
+                    return self._drop(sampled)
+            if limited is not None:
+                bucket = self.buckets[limited]
+                if bucket.delay(time.monotonic()):
+                    return self._drop(limited)
+                bucket.tokens -= 1
+        return True
+
+    def _drop(self, rule):
+        self.dropped[rule] = self.dropped.get(rule, 0) + 1
+        metrics.count("log_dropped")
+        return False
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # The stock handler formats the message here, on the caller's thread.
+        # Only tracebacks, which reference live frames, are rendered now.
+        if record.exc_info:
+            record.exc_text = _TRACEBACKS.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class _FanOutHandler(logging.Handler):
+    """Passes each record to several handlers, so the sampling filter runs once per record, as with the queue."""
+
+    def __init__(self, handlers):
+        super().__init__()
+        self.handlers = list(handlers)
+
+    def emit(self, record):
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def flush(self):
+        for handler in self.handlers:
+            handler.flush()
+
+    def close(self):
+        for handler in self.handlers:
+            handler.close()
+        super().close()
+
+
+def _file_handler(path, max_mb, rotate_when, backups):
+    if rotate_when:
+        return logging.handlers.TimedRotatingFileHandler(path, when=rotate_when, backupCount=backups, delay=True)
+    # max_mb 0 never rotates.
+    return logging.handlers.RotatingFileHandler(path, maxBytes=int(max_mb * (1 << 20)), backupCount=backups,
+                                                delay=True)
+
+
+def setup_logging(log_file=LOG_FILE, level=LOG_LEVEL, asynchronous=LOG_ASYNC, max_mb=LOG_MAX_MB,
+                  rotate_when=LOG_ROTATE_WHEN, backups=LOG_BACKUPS, sample=LOG_SAMPLE, rate_limit=LOG_RATE_LIMIT,
+                  console=True):
+    """Configures the root logger; calling it again replaces the previous setup.
+
+    Args:
+        log_file (str): Log file path, rotated at ``max_mb`` megabytes, or at the
+            ``rotate_when`` interval of TimedRotatingFileHandler if given. Empty for none.
+        asynchronous (bool): Format and write records on a background thread.
+        sample, rate_limit (str or dict): Sampling rules, see SamplingFilter.
+
+    Returns:
+        The QueueListener writing the records, or None when synchronous.
+    """
+    global _listener
+    stop_logging()
+    formatter = logging.Formatter(FORMAT)
+    handlers = [logging.StreamHandler()] if console else []
+    if log_file:
+        handlers.append(_file_handler(log_file, max_mb, rotate_when, backups))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    sampling = SamplingFilter(parse_rules(sample) if isinstance(sample, str) else sample,
+                              parse_rules(rate_limit) if isinstance(rate_limit, str) else rate_limit)
+
+    if asynchronous:
+        _listener = logging.handlers.QueueListener(queue.SimpleQueue(), *handlers, respect_handler_level=True)
+        _listener.start()
+        _installed[:] = [_QueueHandler(_listener.queue)]
+    else:
+        _installed[:] = [_FanOutHandler(handlers)]
+    root = logging.getLogger()
+    root.setLevel(level)
+    for handler in _installed:
+        handler.addFilter(sampling)
+        root.addHandler(handler)
+    return _listener
+
+
+def flush_logging():
+    """Blocks until every queued record is written and the handlers are flushed."""
+    if _listener is not None:
+        # Stopping the listener writes out the queue; it starts again on the same queue.
+        _listener.stop()
+        _listener.start()
+        handlers = _listener.handlers
+    else:
+        handlers = _installed
+    for handler in handlers:
+        handler.flush()
+
+
+def stop_logging():
+    """Writes out the queued records and closes the handlers installed by setup_logging."""
+    global _listener
+    root = logging.getLogger()
+    for handler in _installed:
+        root.removeHandler(handler)
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+    for handler in _installed:
+        handler.close()
+    _installed.clear()
+
 
-def setup_logging():
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[
-            logging.FileHandler("trading_bot.log"),
-            logging.StreamHandler()
-        ]
-    )
+atexit.register(stop_logging)
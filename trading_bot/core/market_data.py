@@ -0,0 +1,199 @@
+"""Asyncio market-data service for the CoinSwitch futures socket.
+
+One shared socket.io connection carries every subscription. Symbols and
+events can be added or removed at runtime, and incoming updates are turned
+into MarketEvent objects on one queue per symbol.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+
+import socketio
+
+from trading_bot.core.config import MARKET_DATA_URL, RECONNECT_INITIAL_DELAY, RECONNECT_MAX_DELAY
+from trading_bot.core.inbound_queue import ConflatingQueue, conflation_key
+from trading_bot.core.metrics import metrics
+from trading_bot.core.reconnect import StreamHealth
+
+BASE_URL = MARKET_DATA_URL
+NAMESPACE = "/exchange_2"
+SOCKET_PATH = "/pro/realtime-rates-socket/futures/exchange_2"
+
+EVENT_ORDER_BOOK = "FETCH_ORDER_BOOK_CS_PRO"
+EVENT_TICKER_INFO = "FETCH_TICKER_INFO_CS_PRO"
+EVENT_TRADES = "FETCH_TRADES_CS_PRO"
+EVENT_CANDLES = "FETCH_CANDLESTICK_CS_PRO"
+
+_RECEIVE = metrics.histogram("receive")
+
+EVENT_KINDS = {
+    EVENT_ORDER_BOOK: "order_book",
+    EVENT_TICKER_INFO: "ticker",
+    EVENT_TRADES: "trades",
+    EVENT_CANDLES: "candles",
+}
+
+
+@dataclass
+class MarketEvent:
+    kind: str
+    symbol: str
+    interval: str
+    data: dict
+    received_at: int
+
+
+def default_events(pair):
+    """Candles for 'BTCUSDT_5'-style pairs, order book, ticker and trades otherwise."""
+    if split_pair(pair)[1]:
+        return (EVENT_CANDLES,)
+    return (EVENT_ORDER_BOOK, EVENT_TICKER_INFO, EVENT_TRADES)
+
+
+def split_pair(pair):
+    """'BTCUSDT_5' -> ('BTCUSDT', '5'); 'BTCUSDT' -> ('BTCUSDT', '')."""
+    symbol, _, interval = str(pair).upper().partition("_")
+    return symbol, interval
+
+
+class MarketDataService:
+    def __init__(self, url=BASE_URL, namespace=NAMESPACE, socketio_path=SOCKET_PATH,
+                 queue_size=10_000, overflow_policy="latest", client=None, on_reconnect=None):
+        self.url = url
+        self.namespace = namespace
+        self.socketio_path = socketio_path
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
+        # Reconnects start within tens of milliseconds, with jitter, instead of socket.io's 1 s default.
+        self.sio = client or socketio.AsyncClient(reconnection=True, reconnection_delay=RECONNECT_INITIAL_DELAY,
+                                                  reconnection_delay_max=RECONNECT_MAX_DELAY,
+                                                  randomization_factor=0.5)
+        self.subscriptions = set()
+        self.queues = {}
+        # Called as on_reconnect(since_ms) after an outage, to backfill what was missed.
+        self.on_reconnect = on_reconnect
+        self.health = StreamHealth()
+        self._backfills = set()
+        # Set to a Recorder to log every payload as received.
+        self.recorder = None
+        for event in EVENT_KINDS:
+            self.sio.on(event, self._make_handler(event), namespace=self.namespace)
+        self.sio.on("connect", self._on_connect, namespace=self.namespace)
+        self.sio.on("disconnect", self._on_disconnect, namespace=self.namespace)
+
+    @property
+    def connected(self):
+        return bool(getattr(self.sio, "connected", False))
+
+    async def connect(self):
+        await self.sio.connect(self.url, namespaces=[self.namespace], transports=["websocket"],
+                               socketio_path=self.socketio_path, wait_timeout=10)
+
+    async def disconnect(self):
+        await self.sio.disconnect()
+
+    async def _on_connect(self):
+        # Also runs after an automatic reconnect, so the server learns every
+        # subscription again.
+        logging.info(f"Market data connected, subscribing to {len(self.subscriptions)} stream(s).")
+        for event, pair in sorted(self.subscriptions):
+            await self._emit(event, "subscribe", pair)
+
+    async def _on_disconnect(self, *args):
+        logging.warning("Market data disconnected, reconnecting...")
+        self.health.disconnected()
+
+    async def _emit(self, event, action, pair):
+        await self.sio.emit(event, {"event": action, "pair": pair}, namespace=self.namespace)
+
+    async def subscribe(self, pair, *events):
+        """Subscribes one pair (e.g. 'BTCUSDT' or 'BTCUSDT_5' for candles) to the given events."""
+        pair = pair.upper()
+        self.queue(split_pair(pair)[0])
+        for event in events:
+            if (event, pair) in self.subscriptions:
+                continue
+            self.subscriptions.add((event, pair))
+            if self.connected:
+                await self._emit(event, "subscribe", pair)
+
+    async def unsubscribe(self, pair, *events):
+        pair = pair.upper()
+        for event in events or list(EVENT_KINDS):
+            if (event, pair) not in self.subscriptions:
+                continue
+            self.subscriptions.discard((event, pair))
+            if self.connected:
+                await self._emit(event, "unsubscribe", pair)
+
+    def queue(self, symbol):
+        """The queue of MarketEvents for a symbol, created on first use."""
+        symbol = symbol.upper()
+        queue = self.queues.get(symbol)
+        if queue is None:
+            queue = self.queues[symbol] = ConflatingQueue(self.queue_size, self.overflow_policy)
+        return queue
+
+    @property
+    def dropped(self):
+        return sum(queue.dropped for queue in self.queues.values())
+
+    def stats(self):
+        """Queue counters per symbol: dropped, coalesced and lag."""
+        return {symbol: queue.stats() for symbol, queue in self.queues.items()}
+
+    def _make_handler(self, event):
+        kind = EVENT_KINDS[event]
+
+        async def handler(data):
+            start = time.perf_counter_ns()
+            self.dispatch(kind, data)
+            _RECEIVE.record_since(start)
+        return handler
+
+    def _pair_of(self, kind, data):
+        inner = data.get("data", data) if isinstance(data, dict) else {}
+        for source in (data, inner):
+            if isinstance(source, dict):
+                for key in ("pair", "symbol", "s"):
+                    if source.get(key):
+                        return source[key]
+        # Fall back to the only pair subscribed to this kind of event, if there is one.
+        pairs = [pair for event, pair in self.subscriptions if EVENT_KINDS[event] == kind]
+        return pairs[0] if len(pairs) == 1 else None
+
+    def dispatch(self, kind, data):
+        """Turns one raw socket payload into a MarketEvent on its symbol's queue."""
+        received_at = time.time_ns()
+        if self.recorder is not None:
+            self.recorder.record(kind, data, received_at)
+        since = self.health.message()
+        if since is not None and self.on_reconnect is not None:
+            task = asyncio.create_task(self.on_reconnect(since))
+            self._backfills.add(task)
+            task.add_done_callback(self._backfills.discard)
+        pair = self._pair_of(kind, data)
+        if pair is None:
+            logging.debug(f"Dropping {kind} update without a symbol: {data}")
+            return None
+        symbol, interval = split_pair(pair)
+        if kind == "candles" and not interval:
+            intervals = [split_pair(p)[1] for event, p in self.subscriptions
+                         if event == EVENT_CANDLES and split_pair(p)[0] == symbol]
+            if len(intervals) == 1:
+                interval = intervals[0]
+        event = MarketEvent(kind, symbol, interval, data, received_at)
+        key, merge = conflation_key(kind, f"{symbol}_{interval}" if interval else symbol, data)
+        if merge is not None:
+            merge = _merge_events(merge)
+        if not self.queue(symbol).put_nowait(event, key, merge):
+            return None
+        return event
+
+
+def _merge_events(merge_data):
+    def merge(pending, new):
+        new.data = merge_data(pending.data, new.data)
+        return new
+    return merge
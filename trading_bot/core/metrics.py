@@ -0,0 +1,179 @@
+"""Low-overhead latency histograms and counters for the hot path.
+
+Each pipeline stage keeps an HDR-style histogram of nanosecond samples:
+log-linear buckets with 32 sub-buckets per power of two, so a reported value
+is within about 3% of the recorded one. Recording a sample is a few integer
+operations on a preallocated list, a fraction of a microsecond, so it can
+stay on in production. Percentiles are only computed when read.
+
+Histograms are rolling: ``rotate()`` starts a new window and keeps the last
+one, so reports cover between one and two windows of samples.
+"""
+import os
+import time
+
+import numpy as np
+
+_SUB_BITS = 6
+_HALF = 1 << (_SUB_BITS - 1)
+_LINEAR = 1 << _SUB_BITS
+_BUCKETS = (64 - _SUB_BITS + 2) * _HALF
+
+
+def bucket_index(value):
+    """Bucket of a non-negative integer sample."""
+    if value < _LINEAR:
+        return value
+    shift = value.bit_length() - _SUB_BITS
+    return shift * _HALF + (value >> shift)
+
+
+def bucket_value(index):
+    """Midpoint of a bucket's range, the value reported for its samples."""
+    if index < _LINEAR:
+        return float(index)
+    shift = index // _HALF - 1
+    return ((index % _HALF + _HALF) << shift) + ((1 << shift) - 1) / 2
+
+
+_MIDPOINTS = np.array([bucket_value(index) for index in range(_BUCKETS)])
+
+
+class Histogram:
+    __slots__ = ("counts", "previous", "count", "total", "max", "lifetime")
+
+    def __init__(self):
+        self.counts = [0] * _BUCKETS
+        self.previous = None
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self.lifetime = 0
+
+    def record(self, ns):
+        """Adds one sample in nanoseconds."""
+        if ns < _LINEAR:
+            index = ns if ns > 0 else 0
+        else:
+            shift = ns.bit_length() - _SUB_BITS
+            index = shift * _HALF + (ns >> shift)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += ns
+        if ns > self.max:
+            self.max = ns
+
+    def record_since(self, start_ns):
+        """Adds the time elapsed since a ``time.perf_counter_ns()`` reading."""
+        self.record(time.perf_counter_ns() - start_ns)
+
+    def rotate(self):
+        """Starts a new window; the current one becomes the previous one."""
+        self.lifetime += self.count
+        self.previous = (self.counts, self.count, self.total, self.max)
+        self.counts = [0] * _BUCKETS
+        self.count = self.total = self.max = 0
+
+    def _window(self):
+        counts = np.array(self.counts, dtype=np.int64)
+        count, total, largest = self.count, self.total, self.max
+        if self.previous is not None:
+            counts += np.array(self.previous[0], dtype=np.int64)
+            count += self.previous[1]
+            total += self.previous[2]
+            largest = max(largest, self.previous[3])
+        return counts, count, total, largest
+
+    def percentiles(self, *quantiles):
+        """Values at the given percentiles (0-100) in nanoseconds, or None without samples."""
+        counts, count, _, largest = self._window()
+        if not count:
+            return [None] * len(quantiles)
+        cumulative = np.cumsum(counts)
+        ranks = np.maximum(np.ceil(np.array(quantiles) / 100 * count), 1)
+        values = _MIDPOINTS[np.searchsorted(cumulative, ranks)]
+        return np.minimum(values, largest).tolist()
+
+    def summary(self):
+        """Count, mean, p50/p90/p99/p99.9 and max of the window, in microseconds."""
+        _, count, total, largest = self._window()
+        p50, p90, p99, p999 = self.percentiles(50, 90, 99, 99.9)
+        if not count:
+            return {"count": 0, "lifetime": self.lifetime + self.count}
+        return {"count": count, "lifetime": self.lifetime + self.count, "mean_us": total / count / 1e3,
+                "p50_us": p50 / 1e3, "p90_us": p90 / 1e3, "p99_us": p99 / 1e3, "p999_us": p999 / 1e3,
+                "max_us": largest / 1e3, "sum_ns": total}
+
+
+class Metrics:
+    """Named stage histograms and event counters."""
+
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self.rotated = time.monotonic()
+
+    def histogram(self, name):
+        """The histogram of a stage, created on first use. Hold on to it on hot paths."""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        return histogram
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def rotate(self):
+        for histogram in self.histograms.values():
+            histogram.rotate()
+        self.rotated = time.monotonic()
+
+    def reset(self):
+        # Histograms are zeroed in place: hot paths hold references to them.
+        for histogram in self.histograms.values():
+            histogram.__init__()
+        self.counters.clear()
+
+    def snapshot(self):
+        return {"stages": {name: histogram.summary() for name, histogram in sorted(self.histograms.items())},
+                "counters": dict(sorted(self.counters.items()))}
+
+    def format_text(self):
+        snapshot = self.snapshot()
+        lines = [f"{'stage':<12}{'count':>9}{'p50':>10}{'p90':>10}{'p99':>10}{'p99.9':>10}{'max':>10}  (us)"]
+        for name, stage in snapshot["stages"].items():
+            if not stage["count"]:
+                lines.append(f"{name:<12}{0:>9}")
+                continue
+            lines.append(f"{name:<12}{stage['count']:>9}" + "".join(
+                f"{stage[key]:>10.1f}" for key in ("p50_us", "p90_us", "p99_us", "p999_us", "max_us")))
+        lines += [f"{name}: {value}" for name, value in snapshot["counters"].items()]
+        return "\n".join(lines)
+
+    def format_prometheus(self, prefix="trading_bot"):
+        lines = [f"# HELP {prefix}_stage_seconds Hot-path stage latency over the last one to two windows.",
+                 f"# TYPE {prefix}_stage_seconds summary"]
+        for name, histogram in sorted(self.histograms.items()):
+            _, count, total, _ = histogram._window()
+            values = histogram.percentiles(50, 90, 99, 99.9)
+            for quantile, value in zip(("0.5", "0.9", "0.99", "0.999"), values):
+                if value is not None:
+                    lines.append(f'{prefix}_stage_seconds{{stage="{name}",quantile="{quantile}"}} {value / 1e9:.9f}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {total / 1e9:.9f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {count}')
+        lines += [f"# HELP {prefix}_events_total Hot-path event counters.", f"# TYPE {prefix}_events_total counter"]
+        lines += [f'{prefix}_events_total{{name="{name}"}} {value}' for name, value in sorted(self.counters.items())]
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path):
+        """Writes the stats to a file, in Prometheus text format if it ends in .prom, as a table otherwise."""
+        text = self.format_prometheus() if str(path).endswith(".prom") else self.format_text() + "\n"
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as file:
+            file.write(text)
+        # Readers (e.g. a node_exporter textfile collector) never see a half-written file.
+        os.replace(temporary, path)
+
+
+# The process-wide registry the hot path records into.
+metrics = Metrics()
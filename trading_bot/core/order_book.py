@@ -0,0 +1,285 @@
+"""In-memory L2 order books kept current from the order-book stream.
+
+Each book is seeded from a ``get_depth`` snapshot. Socket updates are then applied
+to sorted price-level arrays, so strategies and risk checks can read prices
+without a REST call. Messages that carry update ids (``U``/``u``, optionally
+``pu``) are treated as diffs. A missing id marks the book out of sync and
+triggers a resync. Messages without ids are treated as full depth snapshots;
+the ``lastUpdateId`` one carries is where the next diff has to continue.
+"""
+import asyncio
+import logging
+from bisect import bisect_left
+
+
+class _BookSide:
+    """Price levels of one side, stored so that the best level is always last.
+
+    Bids are keyed by price and asks by negated price, both ascending. Most
+    updates land near the top of the book, so inserts and deletes only move
+    a few elements.
+    """
+    __slots__ = ("_sign", "keys", "sizes")
+
+    def __init__(self, is_bid):
+        self._sign = 1.0 if is_bid else -1.0
+        self.keys = []
+        self.sizes = []
+
+    def __len__(self):
+        return len(self.keys)
+
+    def clear(self):
+        self.keys.clear()
+        self.sizes.clear()
+
+    def set(self, price, size):
+        """Sets the size at a price level; a size of zero removes the level."""
+        keys = self.keys
+        key = self._sign * price
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            if size:
+                self.sizes[i] = size
+            else:
+                del keys[i]
+                del self.sizes[i]
+        elif size:
+            keys.insert(i, key)
+            self.sizes.insert(i, size)
+
+    def load(self, levels):
+        pairs = sorted((self._sign * float(price), float(size)) for price, size in levels if float(size))
+        self.keys = [key for key, _ in pairs]
+        self.sizes = [size for _, size in pairs]
+
+    def best(self):
+        if not self.keys:
+            return None
+        return self._sign * self.keys[-1]
+
+    def size_at(self, price):
+        key = self._sign * price
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            return self.sizes[i]
+        return 0.0
+
+    def levels(self, n=None):
+        """Returns up to n (price, size) levels, best first."""
+        count = len(self.keys) if n is None else min(n, len(self.keys))
+        sign = self._sign
+        return [(sign * self.keys[-1 - i], self.sizes[-1 - i]) for i in range(count)]
+
+    def cumulative_volume(self, n):
+        count = min(n, len(self.sizes))
+        return sum(self.sizes[len(self.sizes) - count:])
+
+    def vwap(self, quantity):
+        if quantity <= 0:
+            raise ValueError(f"quantity must be positive, got {quantity}")
+        remaining = quantity
+        cost = 0.0
+        sign = self._sign
+        for i in range(len(self.keys) - 1, -1, -1):
+            take = min(remaining, self.sizes[i])
+            cost += take * sign * self.keys[i]
+            remaining -= take
+            if remaining <= 0:
+                return cost / quantity
+        return None
+
+
+class OrderBook:
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.bids = _BookSide(is_bid=True)
+        self.asks = _BookSide(is_bid=False)
+        self.last_update_id = None
+        self.synced = False
+        self.updates = 0
+
+    def apply_snapshot(self, bids, asks, update_id=None):
+        self.bids.load(bids)
+        self.asks.load(asks)
+        self.last_update_id = update_id
+        self.synced = True
+        self.updates += 1
+
+    def apply_update(self, bids, asks, first_id=None, last_id=None, prev_id=None):
+        """Applies a depth diff.
+
+        Returns:
+            bool: False if the update revealed a gap and the book needs a resync.
+        """
+        if last_id is not None and self.last_update_id is not None:
+            if last_id <= self.last_update_id:
+                return True  # Already covered by the snapshot.
+            expected = self.last_update_id
+            if (prev_id is not None and prev_id != expected) or \
+                    (prev_id is None and first_id is not None and first_id > expected + 1):
+                self.synced = False
+                return False
+        for price, size in bids:
+            self.bids.set(float(price), float(size))
+        for price, size in asks:
+            self.asks.set(float(price), float(size))
+        if last_id is not None:
+            self.last_update_id = last_id
+        self.updates += 1
+        if self.crossed:
+            self.synced = False
+            return False
+        return True
+
+    @property
+    def crossed(self):
+        bid, ask = self.bids.best(), self.asks.best()
+        return bid is not None and ask is not None and bid >= ask
+
+    def best_bid(self):
+        return self.bids.best()
+
+    def best_ask(self):
+        return self.asks.best()
+
+    def spread(self):
+        bid, ask = self.bids.best(), self.asks.best()
+        if bid is None or ask is None:
+            return None
+        return ask - bid
+
+    def mid(self):
+        bid, ask = self.bids.best(), self.asks.best()
+        if bid is None or ask is None:
+            return None
+        return (bid + ask) / 2
+
+    def depth_at(self, side, price):
+        """Size resting at a price on the 'BUY' (bid) or 'SELL' (ask) side."""
+        return self._side(side).size_at(price)
+
+    def cumulative_volume(self, side, levels):
+        """Total size of the best ``levels`` levels of the 'BUY' or 'SELL' side."""
+        return self._side(side).cumulative_volume(levels)
+
+    def vwap_to_fill(self, side, quantity):
+        """Average price a market order of ``quantity`` would pay, or None if the book is too thin.
+
+        A 'BUY' order consumes the asks and a 'SELL' order consumes the bids.
+        Raises ValueError if ``quantity`` is not positive.
+        """
+        book_side = self.asks if side.upper() == "BUY" else self.bids
+        return book_side.vwap(quantity)
+
+    def _side(self, side):
+        return self.bids if side.upper() in ("BUY", "BID") else self.asks
+
+
+def _first(data, *keys):
+    for key in keys:
+        if key in data:
+            return data[key]
+    return None
+
+
+def _int_or_none(value):
+    return None if value is None else int(value)
+
+
+class OrderBookManager:
+    """Keeps one OrderBook per symbol and resyncs books that fall out of sync."""
+
+    def __init__(self, api_client=None, exchange="EXCHANGE_2", max_buffered=1000):
+        self.api_client = api_client
+        self.exchange = exchange
+        self.max_buffered = max_buffered
+        self.books = {}
+        self.resyncs = 0
+        self._pending = {}
+        self._resync_tasks = {}
+
+    def get(self, symbol):
+        return self.books.get(symbol.upper())
+
+    def _book(self, symbol):
+        symbol = symbol.upper()
+        book = self.books.get(symbol)
+        if book is None:
+            book = self.books[symbol] = OrderBook(symbol)
+        return book
+
+    async def seed(self, symbol):
+        """Loads a REST depth snapshot for a symbol and replays updates buffered meanwhile."""
+        response = await self.api_client.get_depth_async({"exchange": self.exchange, "symbol": symbol.upper()})
+        data = response.get("data", response) if isinstance(response, dict) else None
+        if not data:
+            logging.error(f"Could not fetch order book snapshot for {symbol}")
+            return False
+        book = self._book(symbol)
+        book.apply_snapshot(data.get("bids", []), data.get("asks", []),
+                            _int_or_none(_first(data, "lastUpdateId", "last_update_id", "u")))
+        pending = self._pending.pop(book.symbol, [])
+        for i, update in enumerate(pending):
+            if not book.apply_update(*update):
+                # Still a gap after the snapshot; keep the rest for the next resync.
+                self._pending[book.symbol] = pending[i:]
+                break
+        return book.synced
+
+    def handle_message(self, message):
+        """Applies an order-book message.
+
+        Returns:
+            bool: True if the message was an order-book message, False otherwise.
+        """
+        data = message.get("data", message) if isinstance(message, dict) else None
+        if not isinstance(data, dict):
+            return False
+        bids = _first(data, "bids", "b")
+        asks = _first(data, "asks", "a")
+        symbol = _first(data, "symbol", "s", "pair")
+        if bids is None or asks is None or not symbol:
+            return False
+
+        book = self._book(str(symbol))
+        update = (bids, asks, _int_or_none(_first(data, "U")), _int_or_none(_first(data, "u")),
+                  _int_or_none(_first(data, "pu")))
+        if update[3] is None:
+            book.apply_snapshot(bids, asks, _int_or_none(_first(data, "lastUpdateId", "last_update_id")))
+            return True
+        if not book.synced:
+            self._buffer(book, update)
+            return True
+        if not self._apply(book, update):
+            self._buffer(book, update)
+        return True
+
+    def _apply(self, book, update):
+        bids, asks, first_id, last_id, prev_id = update
+        if book.apply_update(bids, asks, first_id, last_id, prev_id):
+            return True
+        logging.warning(f"Order book gap detected for {book.symbol}, resyncing.")
+        self._schedule_resync(book.symbol)
+        return False
+
+    def _buffer(self, book, update):
+        pending = self._pending.setdefault(book.symbol, [])
+        if len(pending) < self.max_buffered:
+            pending.append(update)
+        self._schedule_resync(book.symbol)
+
+    def _schedule_resync(self, symbol):
+        if self.api_client is None:
+            return
+        task = self._resync_tasks.get(symbol)
+        if task is not None and not task.done():
+            return
+        try:
+            self._resync_tasks[symbol] = asyncio.get_running_loop().create_task(self._resync(symbol))
+        except RuntimeError:
+            pass  # No loop running; the book stays unsynced until seed() is called.
+
+    async def _resync(self, symbol):
+        self.resyncs += 1
+        await self.seed(symbol)
@@ -0,0 +1,353 @@
+"""Local order book of the bot's own orders, keyed by client order ID.
+
+Every order gets a client order ID that is unique across concurrent
+requests and restarts: a random per-process prefix and a counter. Orders are
+indexed by client ID, exchange order ID and symbol, and move through
+
+    PENDING -> ACKED -> PARTIALLY_FILLED -> FILLED
+                 \\------------------------> CANCELED / REJECTED
+
+on the REST ack and on private-stream order events. States only move
+forward, so a late or repeated event never rolls an order back, and status
+checks are answered from memory.
+
+A create request that fails or times out may still have reached the
+exchange. Before it is sent again, the manager waits briefly for the stream
+to report the client ID, then looks for it among the open and the closed
+orders, so an order that filled at once is not placed twice. Only if REST
+lists it in neither is the request retried, with the same client ID, so an
+exchange that enforces unique client IDs turns away a duplicate as well.
+
+An order whose fate REST cannot tell, because the lookup itself failed, is
+never resent or closed on a guess: it is marked UNKNOWN, which counts as
+open, and looked up again with backoff until the exchange answers or the
+stream reports it.
+"""
+import asyncio
+import itertools
+import logging
+import secrets
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+
+from trading_bot.core.account_state import parse_order, parse_orders
+from trading_bot.core.config import CLIENT_ORDER_PREFIX, ORDER_ACK_GRACE, ORDER_LOOKUP_RETRY, ORDER_RETRIES
+from trading_bot.core.metrics import metrics
+from trading_bot.core.reconnect import Backoff
+
+PENDING = "PENDING"
+UNKNOWN = "UNKNOWN"
+ACKED = "ACKED"
+PARTIALLY_FILLED = "PARTIALLY_FILLED"
+FILLED = "FILLED"
+CANCELED = "CANCELED"
+REJECTED = "REJECTED"
+TERMINAL = frozenset({FILLED, CANCELED, REJECTED})
+_RANKS = {PENDING: 0, UNKNOWN: 0, ACKED: 1, PARTIALLY_FILLED: 2, FILLED: 3, CANCELED: 3, REJECTED: 3}
+_STATES = {"NEW": ACKED, "OPEN": ACKED, "ACCEPTED": ACKED, "PARTIALLY_FILLED": PARTIALLY_FILLED,
+           "PARTIALLY_EXECUTED": PARTIALLY_FILLED, "FILLED": FILLED, "EXECUTED": FILLED, "CANCELED": CANCELED,
+           "CANCELLED": CANCELED, "EXPIRED": CANCELED, "EXPIRED_IN_MATCH": CANCELED, "REJECTED": REJECTED,
+           "DISCARDED": REJECTED}
+_ORDER_EVENTS = ("ORDER_TRADE_UPDATE", "executionReport")
+_TRADES = logging.getLogger("trading_bot.trades")
+
+
+def order_state(status, filled=0.0):
+    """The state an exchange order status maps to, or None if it is not known."""
+    state = _STATES.get(str(status).upper())
+    if state == ACKED and filled:
+        return PARTIALLY_FILLED
+    return state
+
+
+class ClientOrderIds:
+    """Client order IDs of the form ``<prefix><8 random hex digits>-<counter>``."""
+
+    def __init__(self, prefix=CLIENT_ORDER_PREFIX):
+        self.prefix = f"{prefix}{secrets.token_hex(4)}-"
+        self._counter = itertools.count(1)
+
+    def next(self):
+        return f"{self.prefix}{next(self._counter)}"
+
+
+@dataclass
+class ManagedOrder:
+    client_order_id: str
+    symbol: str
+    side: str
+    quantity: float
+    price: float = None
+    order_type: str = "LIMIT"
+    state: str = PENDING
+    order_id: str = None
+    filled: float = 0.0
+    attempts: int = 0
+    created: float = field(default_factory=time.time)
+    updated: float = None
+
+    @property
+    def done(self):
+        return self.state in TERMINAL
+
+
+class OrderManager:
+    """Places orders under client IDs and tracks them from the REST ack and the private stream.
+
+    ``create_order_async`` takes the same arguments as the API client's, so
+    the OrderExecutor can send orders through it unchanged.
+
+    Args:
+        retries (int): Times a failed create request is sent again.
+        ack_grace (float): Seconds to wait for the stream to report a failed
+            request's order before asking REST.
+        max_closed (int): Filled, canceled and rejected orders kept for lookups.
+        lookup_retry (float): First delay in seconds before an UNKNOWN order is
+            looked up again; it doubles up to 30 s.
+    """
+
+    def __init__(self, api_client, retries=ORDER_RETRIES, ack_grace=ORDER_ACK_GRACE, max_closed=10_000,
+                 prefix=CLIENT_ORDER_PREFIX, lookup_retry=ORDER_LOOKUP_RETRY):
+        self.api_client = api_client
+        self.retries = retries
+        self.ack_grace = ack_grace
+        self.lookup_retry = lookup_retry
+        self.ids = ClientOrderIds(prefix)
+        self.orders = {}
+        self.by_order_id = {}
+        self.by_symbol = {}
+        self._closed = deque()
+        self.max_closed = max_closed
+        self._waiters = {}
+        self._resolving = {}
+        # Called with (order, quantity filled since the last update) on every state change.
+        self.listeners = []
+
+    # Placing orders.
+
+    async def create_order_async(self, symbol, side, quantity, price, order_type="LIMIT", timeout=None, trace=None):
+        """Places and tracks an order.
+
+        Returns:
+            dict or None: The exchange's ack, or None if the order was not
+            placed or REST could not tell whether it was.
+        """
+        order = self.track(ManagedOrder(self.ids.next(), str(symbol).upper(), str(side).upper(), quantity, price,
+                                        order_type))
+        for attempt in range(self.retries + 1):
+            order.attempts += 1
+            response = await self.api_client.create_order_async(symbol, side, quantity, price, order_type,
+                                                                timeout=timeout, trace=trace,
+                                                                client_order_id=order.client_order_id)
+            if response is not None:
+                acks = parse_orders(response)
+                order_id, values = acks[0] if acks else (None, {"status": "", "filled": 0.0})
+                self._update(order, order_id, {**values, "status": values["status"] or "NEW"})
+                return response
+            reached = await self._reached_exchange(order)
+            if reached:
+                metrics.count("order_retries_avoided")
+                return {"data": asdict(order)}
+            if reached is None:
+                # Sending it again could place it twice.
+                self._unknown(order)
+                return None
+            if attempt < self.retries:
+                metrics.count("order_retries")
+                _TRADES.warning(f"Order {order.client_order_id} got no ack, sending it again")
+        # REST listed it neither open nor closed after the last attempt.
+        self._update(order, None, {"status": REJECTED, "filled": 0.0})
+        return None
+
+    async def _reached_exchange(self, order):
+        """True if the order reached the exchange, False if REST has no such order, None if REST could not tell."""
+        # The stream usually reports an order that did reach the exchange within moments.
+        if order.state == PENDING and self.ack_grace:
+            event = self._waiters[order.client_order_id] = asyncio.Event()
+            try:
+                await asyncio.wait_for(event.wait(), self.ack_grace)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                self._waiters.pop(order.client_order_id, None)
+        if order.state != PENDING:
+            return True
+        found = await self._lookup(order)
+        if found:
+            self._update(order, *found)
+            return True
+        return found
+
+    async def _lookup(self, order):
+        # (order_id, values) from REST, False if it lists no such order, or None if a request failed.
+        if order.order_id is not None:
+            response = await self.api_client.get_order_async(order.order_id)
+            records = parse_orders(response) if response else ()
+            return records[0] if records else None
+        params = {"symbol": order.symbol}
+        responses = await asyncio.gather(self.api_client.get_open_orders_async(params),
+                                         self.api_client.get_closed_orders_async(params), return_exceptions=True)
+        if any(response is None or isinstance(response, Exception) for response in responses):
+            return None
+        for response in responses:
+            for order_id, values in parse_orders(response):
+                if values["client_order_id"] == order.client_order_id:
+                    return order_id, values
+        return False
+
+    def _unknown(self, order):
+        if order.state != UNKNOWN:
+            order.state = UNKNOWN
+            order.updated = time.time()
+            metrics.count("orders_unknown")
+            _TRADES.warning(f"Order {order.client_order_id} could not be looked up, keeping it open until REST answers")
+        if order.client_order_id not in self._resolving:
+            self._resolving[order.client_order_id] = asyncio.create_task(self._resolve(order))
+
+    async def _resolve(self, order):
+        backoff = Backoff(self.lookup_retry, max(self.lookup_retry, 30.0))
+        try:
+            while order.state == UNKNOWN:
+                await asyncio.sleep(backoff.next())
+                if order.state != UNKNOWN:
+                    break
+                found = await self._lookup(order)
+                if found:
+                    self._update(order, *found)
+                elif found is False:
+                    self._update(order, None, {"status": REJECTED, "filled": order.filled})
+        finally:
+            self._resolving.pop(order.client_order_id, None)
+
+    async def stop(self):
+        """Stops looking up UNKNOWN orders."""
+        tasks = list(self._resolving.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # Tracking.
+
+    def track(self, order):
+        self.orders[order.client_order_id] = order
+        self.by_symbol.setdefault(order.symbol, {})[order.client_order_id] = order
+        if order.order_id is not None:
+            self.by_order_id[order.order_id] = order
+        return order
+
+    def apply(self, message):
+        """Applies a private-stream order event to the order it is about.
+
+        Returns:
+            bool: True if the event was about a tracked order.
+        """
+        data = message.get("data", message) if isinstance(message, dict) else None
+        if not isinstance(data, dict) or (data.get("e") not in _ORDER_EVENTS and "order_id" not in data):
+            return False
+        parsed = parse_order(data["o"] if isinstance(data.get("o"), dict) else data)
+        if parsed is None:
+            return False
+        order_id, values = parsed
+        order = self.orders.get(values["client_order_id"]) or self.by_order_id.get(order_id)
+        if order is None:
+            return False
+        self._update(order, order_id, values)
+        return True
+
+    def _update(self, order, order_id, values):
+        if order_id is not None and order.order_id is None:
+            order.order_id = str(order_id)
+            self.by_order_id[order.order_id] = order
+        state = order_state(values["status"], values["filled"])
+        if state is None or order.done:
+            return
+        if _RANKS[state] < _RANKS[order.state] or (state == order.state and values["filled"] <= order.filled):
+            return
+        filled = max(values["filled"] - order.filled, 0.0)
+        order.state = state
+        order.filled += filled
+        order.updated = time.time()
+        for listener in self.listeners:
+            listener(order, filled)
+        waiter = self._waiters.get(order.client_order_id)
+        if waiter is not None:
+            waiter.set()
+        if order.done:
+            self._closed.append(order.client_order_id)
+            while len(self._closed) > self.max_closed:
+                self._forget(self._closed.popleft())
+
+    async def reconcile(self, listed, before):
+        """Brings the tracked orders in line with REST after the private stream was down.
+
+        Listed orders catch up on fills the stream missed. An open order that
+        REST no longer lists is looked up and marked with its final state, or
+        UNKNOWN, and looked up again later, if that lookup fails.
+
+        Args:
+            listed (dict): {order_id: order} of the open orders REST lists.
+            before (float): ``time.time()`` when the list was requested; orders
+                placed after it are left alone.
+
+        Returns:
+            list: The orders that were marked done.
+        """
+        for order_id, values in listed.items():
+            order = self.by_order_id.get(order_id)
+            if order is not None:
+                self._update(order, order_id, values)
+        missing = [order for order in self.orders.values() if not order.done and order.order_id is not None
+                   and order.order_id not in listed and order.created < before]
+        responses = await asyncio.gather(*(self.api_client.get_order_async(order.order_id) for order in missing),
+                                         return_exceptions=True)
+        closed = []
+        for order, response in zip(missing, responses):
+            records = parse_orders(response) if response and not isinstance(response, Exception) else ()
+            if not records:
+                # It may have filled as well as been canceled; only the exchange can say.
+                self._unknown(order)
+                continue
+            values = records[0][1]
+            self._update(order, order.order_id, values)
+            if order.done:
+                closed.append(order)
+        metrics.count("orders_reconciled", len(closed))
+        return closed
+
+    def _forget(self, client_order_id):
+        order = self.orders.pop(client_order_id, None)
+        if order is None:
+            return
+        self.by_symbol.get(order.symbol, {}).pop(client_order_id, None)
+        if order.order_id is not None:
+            self.by_order_id.pop(order.order_id, None)
+
+    # Queries, answered from memory.
+
+    def get(self, client_order_id=None, order_id=None):
+        """A tracked order by client ID or exchange order ID, or None."""
+        if client_order_id is not None:
+            return self.orders.get(client_order_id)
+        return self.by_order_id.get(str(order_id))
+
+    def open_orders(self, symbol=None):
+        orders = self.by_symbol.get(symbol.upper(), {}).values() if symbol else self.orders.values()
+        return [order for order in orders if not order.done]
+
+    async def status(self, order_id):
+        """State of an order by exchange ID: from memory, or from REST for an order this process did not place."""
+        order = self.by_order_id.get(str(order_id))
+        if order is not None:
+            return order.state
+        metrics.count("order_status_rest")
+        response = await self.api_client.get_order_async(order_id)
+        for _, values in parse_orders(response) if response else ():
+            return order_state(values["status"], values["filled"])
+        return None
+
+    def stats(self):
+        states = {}
+        for order in self.orders.values():
+            states[order.state] = states.get(order.state, 0) + 1
+        return {"tracked": len(self.orders), "states": states}
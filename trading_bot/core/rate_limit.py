@@ -0,0 +1,269 @@
+"""Client-side rate limiting for the REST API.
+
+Every request belongs to an endpoint class (orders, account reads, market
+data). Each class has its own token bucket, and every request also draws
+from one global bucket. Waiting requests are served in priority order:
+orders first, then account reads, then market data. Lower-priority classes
+also leave ``reserve`` global tokens untouched, so a burst of balance or
+kline calls can never use up the budget a stop-loss order needs.
+
+Processes that trade the same account share its budget through SharedBuckets:
+the bucket state lives in shared memory, behind one cross-process lock.
+"""
+import asyncio
+import itertools
+import multiprocessing
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+ORDER = "order"
+ACCOUNT = "account"
+MARKET = "market"
+PRIORITIES = {ORDER: 0, ACCOUNT: 1, MARKET: 2}
+
+_ORDER_PATHS = ("/order", "/cancel_all", "/add_margin", "/leverage")
+_MARKET_PATHS = ("/order_book", "/trades", "/klines", "/instrument_info", "/ticker", "/ping")
+
+
+def endpoint_class(method, endpoint):
+    """Maps a request to ORDER, ACCOUNT or MARKET."""
+    path = endpoint.split("?", 1)[0].rstrip("/")
+    if method.upper() != "GET" and path.endswith(_ORDER_PATHS):
+        return ORDER
+    if path.endswith(_MARKET_PATHS):
+        return MARKET
+    return ACCOUNT
+
+
+def retry_after_seconds(value, default=None):
+    """Parses a Retry-After header given in seconds or as an HTTP date."""
+    if value is None:
+        return default
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now, needed=1.0):
+        """Seconds until ``needed`` tokens are available (0 if they are now)."""
+        self.refill(now)
+        wait = max(0.0, self.blocked_until - now)
+        if self.tokens < needed:
+            wait = max(wait, (needed - self.tokens) / self.rate)
+        return wait
+
+
+class SharedTokenBucket(TokenBucket):
+    """A TokenBucket whose tokens and timestamps live in a shared array, at ``offset``."""
+
+    def __init__(self, rate, state, offset, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self._state = state
+        self._offset = offset
+
+    @property
+    def tokens(self):
+        return self._state[self._offset]
+
+    @tokens.setter
+    def tokens(self, value):
+        self._state[self._offset] = value
+
+    @property
+    def updated(self):
+        return self._state[self._offset + 1]
+
+    @updated.setter
+    def updated(self, value):
+        self._state[self._offset + 1] = value
+
+    @property
+    def blocked_until(self):
+        return self._state[self._offset + 2]
+
+    @blocked_until.setter
+    def blocked_until(self, value):
+        self._state[self._offset + 2] = value
+
+
+class SharedBuckets:
+    """Rate-limit buckets in shared memory, so several processes draw from one budget.
+
+    Create it before starting the processes, pass it to each of them, and give
+    it to their RequestSchedulers. ``time.monotonic`` is the same clock in
+    every process, so refills agree.
+    """
+
+    def __init__(self, limits, context=None):
+        self.limits = dict(limits)
+        self.names = sorted(self.limits)
+        # tokens, updated, blocked_until per bucket; the array's lock guards all of them.
+        self.array = (context or multiprocessing).Array("d", 3 * len(self.names))
+        now = time.monotonic()
+        for index, name in enumerate(self.names):
+            self.array[3 * index] = float(self.limits[name])
+            self.array[3 * index + 1] = now
+
+    @property
+    def lock(self):
+        return self.array.get_lock()
+
+    def bucket(self, name):
+        return SharedTokenBucket(self.limits[name], self.array.get_obj(), 3 * self.names.index(name))
+
+
+class RequestScheduler:
+    """Grants REST requests against per-class and global token buckets.
+
+    Args:
+        limits (dict): Requests per second for each class, plus a "global" key.
+        reserve (float): Global tokens only ORDER requests may use.
+        max_backoff (float): Cap in seconds for backoff after a 429 without Retry-After.
+        shared (SharedBuckets): Budget shared with other processes; ``limits``
+            is then taken from it.
+    """
+
+    def __init__(self, limits, reserve=2, max_backoff=30.0, shared=None):
+        if shared is None:
+            limits = dict(limits)
+            self.global_bucket = TokenBucket(limits.pop("global"))
+            self.buckets = {name: TokenBucket(rate) for name, rate in limits.items()}
+        else:
+            self.global_bucket = shared.bucket("global")
+            self.buckets = {name: shared.bucket(name) for name in shared.names if name != "global"}
+        # Lower lanes need 1 + reserve global tokens, which must fit in the bucket.
+        self.reserve = min(reserve, self.global_bucket.capacity - 1)
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock() if shared is None else shared.lock
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._timer = None
+        self._backoff = {name: 0 for name in self.buckets}
+        self.granted = {name: 0 for name in self.buckets}
+        self.waited = {name: 0 for name in self.buckets}
+        self.rate_limited = {name: 0 for name in self.buckets}
+
+    def _needed(self, name):
+        # Global tokens a request needs: lower lanes must leave the reserve for orders.
+        return 1.0 if PRIORITIES.get(name, 1) == 0 else 1.0 + self.reserve
+
+    def _delay(self, name, now):
+        """Seconds until a request of this class could go, from both buckets."""
+        return max(self.buckets[name].delay(now), self.global_bucket.delay(now, self._needed(name)))
+
+    def _take(self, name):
+        self.buckets[name].tokens -= 1
+        self.global_bucket.tokens -= 1
+        self.granted[name] += 1
+
+    async def acquire(self, name):
+        """Waits until a request of class ``name`` may be sent."""
+        with self._lock:
+            if not self._waiters and self._delay(name, time.monotonic()) == 0:
+                self._take(name)
+                return
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.append((PRIORITIES.get(name, 1), next(self._sequence), name, future))
+            self._waiters.sort(key=lambda waiter: waiter[:2])
+            self.waited[name] += 1
+        self._dispatch()
+        await future
+
+    def acquire_sync(self, name):
+        """Blocking acquire for the synchronous client. Order requests still jump the queue."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                delay = self._delay(name, now)
+                if delay == 0 and not any(waiter[0] <= PRIORITIES.get(name, 1) for waiter in self._waiters):
+                    self._take(name)
+                    return
+                delay = delay or 0.01
+            time.sleep(delay)
+
+    def _dispatch(self):
+        """Grants as many waiting requests as the buckets allow, highest priority first."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            now = time.monotonic()
+            next_delay = None
+            remaining = []
+            blocked_priority = None
+            for waiter in self._waiters:
+                priority, _, name, future = waiter
+                if future.done():
+                    continue
+                if blocked_priority is not None and priority > blocked_priority:
+                    remaining.append(waiter)
+                    continue
+                delay = self._delay(name, now)
+                if delay == 0:
+                    self._take(name)
+                    future.set_result(None)
+                    continue
+                remaining.append(waiter)
+                next_delay = delay if next_delay is None else min(next_delay, delay)
+                if self.global_bucket.delay(now, self._needed(name)) > 0:
+                    # Lower lanes must not overtake this one on the shared budget.
+                    blocked_priority = priority
+            self._waiters = remaining
+            if remaining:
+                loop = remaining[0][3].get_loop()
+                self._timer = loop.call_later(next_delay, self._dispatch)
+
+    def rate_limited_by_server(self, name, retry_after=None):
+        """Pauses a class after a 429, for Retry-After seconds or an exponential backoff.
+
+        Returns:
+            float: The pause in seconds.
+        """
+        with self._lock:
+            self.rate_limited[name] += 1
+            self._backoff[name] += 1
+            pause = retry_after if retry_after is not None else min(self.max_backoff, 2 ** (self._backoff[name] - 1))
+            bucket = self.buckets[name]
+            bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + pause)
+            bucket.tokens = min(bucket.tokens, 0.0)
+        return pause
+
+    def succeeded(self, name):
+        self._backoff[name] = 0
+
+    def stats(self):
+        """Per-class budget usage: share of the bucket in use, grants, waits and 429s."""
+        now = time.monotonic()
+        with self._lock:
+            result = {}
+            for name, bucket in [("global", self.global_bucket)] + sorted(self.buckets.items()):
+                bucket.refill(now)
+                result[name] = {
+                    "rate": bucket.rate,
+                    "used_pct": 100 * (1 - max(bucket.tokens, 0.0) / bucket.capacity),
+                    "paused_s": max(0.0, bucket.blocked_until - now),
+                }
+                if name in self.granted:
+                    result[name].update(granted=self.granted[name], waited=self.waited[name],
+                                        rate_limited=self.rate_limited[name])
+            result["queued"] = len(self._waiters)
+        return result
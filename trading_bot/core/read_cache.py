@@ -0,0 +1,124 @@
+"""Read-through cache for REST reads such as balance and positions.
+
+Each endpoint has its own TTL. Identical requests that arrive while one is
+in flight share its result instead of sending another signed request
+(single flight). Private-stream events that change the account (fills,
+order updates, margin changes) invalidate the affected endpoints.
+"""
+import asyncio
+import threading
+import time
+
+from trading_bot.core.inbound_queue import ORDER_EVENTS
+
+
+def is_account_event(message):
+    """True for private-stream messages that change balances, margin or positions."""
+    data = message.get("data", message) if isinstance(message, dict) else None
+    if not isinstance(data, dict):
+        return False
+    event = data.get("e") or data.get("event") or data.get("type")
+    return event in ORDER_EVENTS or "order_id" in data
+
+
+def _freeze(params):
+    if not params:
+        return ()
+    return tuple(sorted((str(key), str(value)) for key, value in params.items()))
+
+
+class ReadCache:
+    def __init__(self, ttls):
+        """
+        Args:
+            ttls (dict): Seconds to keep responses per endpoint. Other endpoints are not cached.
+        """
+        self.ttls = dict(ttls)
+        self._entries = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.invalidations = 0
+
+    def cacheable(self, method, endpoint):
+        return method == "GET" and self.ttls.get(endpoint, 0) > 0
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            return True, entry[1]
+        return False, None
+
+    def _store(self, key, value):
+        # Failed reads (None) are not cached, so the next call tries again.
+        if value is not None:
+            self._entries[key] = (time.monotonic() + self.ttls[key[0]], value)
+
+    async def get(self, endpoint, params, fetch):
+        """Returns a fresh cached response, joins an identical in-flight request, or calls ``fetch()``."""
+        key = (endpoint, _freeze(params))
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                return value
+            task = self._in_flight.get(key)
+            if task is not None:
+                self.shared += 1
+            else:
+                self.misses += 1
+                task = self._in_flight[key] = asyncio.ensure_future(fetch())
+                task.add_done_callback(lambda done: self._finish(key, done))
+        # Shielded, so one caller being cancelled does not fail the others.
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        with self._lock:
+            if self._in_flight.get(key) is task:
+                del self._in_flight[key]
+                if not task.cancelled() and task.exception() is None:
+                    self._store(key, task.result())
+
+    def get_sync(self, endpoint, params, fetch):
+        """Blocking variant for the synchronous client: TTL caching without single flight."""
+        key = (endpoint, _freeze(params))
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                return value
+            self.misses += 1
+            generation = self._generation
+        value = fetch()
+        with self._lock:
+            if generation == self._generation:
+                self._store(key, value)
+        return value
+
+    def invalidate(self, *endpoints):
+        """Drops cached responses of the given endpoints (all when none are given).
+
+        Requests already in flight may predate the change, so later callers do not join them.
+        """
+        with self._lock:
+            for key in list(self._entries):
+                if not endpoints or key[0] in endpoints:
+                    del self._entries[key]
+            for key in list(self._in_flight):
+                if not endpoints or key[0] in endpoints:
+                    del self._in_flight[key]
+            self._generation += 1
+            self.invalidations += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses + self.shared
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared": self.shared,
+            "invalidations": self.invalidations,
+            "hit_rate": (self.hits + self.shared) / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
@@ -0,0 +1,85 @@
+"""Reconnect helpers shared by the socket clients."""
+import random
+import time
+from collections import deque
+
+from trading_bot.core.execution import LatencyStats
+
+
+class Backoff:
+    """Exponential backoff with full jitter.
+
+    The n-th delay is drawn uniformly from [0, min(maximum, initial * 2**n)],
+    so the first retry happens within tens of milliseconds, and many clients
+    dropped at once do not reconnect in lockstep.
+    """
+
+    def __init__(self, initial=0.025, maximum=5.0, rng=None):
+        self.initial = initial
+        self.maximum = maximum
+        self.attempts = 0
+        self._random = rng or random.random
+
+    def next(self):
+        ceiling = min(self.maximum, self.initial * 2 ** self.attempts)
+        self.attempts += 1
+        return ceiling * self._random()
+
+    def reset(self):
+        self.attempts = 0
+
+
+class StreamHealth:
+    """Tracks outages of a stream: from losing the last connection to the first good message after it."""
+
+    def __init__(self):
+        self.reconnects = 0
+        self.reconnect_times = LatencyStats()
+        self._down_since = None
+        self._down_since_ms = None
+
+    @property
+    def connected(self):
+        return self._down_since is None
+
+    def disconnected(self):
+        if self._down_since is None:
+            self._down_since = time.perf_counter()
+            self._down_since_ms = int(time.time() * 1000)
+
+    def message(self):
+        """Records a good message.
+
+        Returns:
+            int or None: The epoch ms the outage started, if this message ends one.
+        """
+        if self._down_since is None:
+            return None
+        self.reconnect_times.add((time.perf_counter() - self._down_since) * 1000)
+        self.reconnects += 1
+        since = self._down_since_ms
+        self._down_since = self._down_since_ms = None
+        return since
+
+    def stats(self):
+        return {"connected": self.connected, "reconnects": self.reconnects, **self.reconnect_times.summary()}
+
+
+class RecentMessages:
+    """Remembers the last ``size`` raw messages, to drop duplicates delivered by a standby connection."""
+
+    def __init__(self, size=2048):
+        self._order = deque()
+        self._seen = set()
+        self.size = size
+        self.duplicates = 0
+
+    def seen(self, message):
+        if message in self._seen:
+            self.duplicates += 1
+            return True
+        self._seen.add(message)
+        self._order.append(message)
+        if len(self._order) > self.size:
+            self._seen.discard(self._order.popleft())
+        return False
@@ -0,0 +1,212 @@
+"""Recorder and replayer for the stream frames the engine receives.
+
+Every private-stream frame and market-data payload is appended, with its
+receive time, to a segmented binary log. Each segment is named after its
+first receive time in nanoseconds:
+
+* ``<first ns>.seg`` holds the records back to back. Each one is an int64
+  receive time in ns, a uint8 source, a uint32 length, then the payload
+  (the frame as UTF-8 JSON).
+* ``<first ns>.idx`` is the time index: (receive ns, byte offset) int64
+  pairs, about one every ``index_interval`` seconds.
+
+A new segment starts once the current one reaches ``segment_bytes``.
+Reading memory-maps the segments and seeks with the time index, so
+replaying a window of a long recording starts right at it.
+"""
+import asyncio
+import bisect
+import json
+import mmap
+import struct
+import time
+from pathlib import Path
+
+import numpy as np
+
+PRIVATE = "private"
+# Source codes, stored in one byte per record; the others are MarketEvent kinds.
+SOURCES = (PRIVATE, "order_book", "ticker", "trades", "candles")
+_SOURCE_CODES = {source: code for code, source in enumerate(SOURCES)}
+_HEADER = struct.Struct("<qBI")
+_INDEX = struct.Struct("<qq")
+_INDEX_DTYPE = np.dtype([("received_ns", "<i8"), ("offset", "<i8")])
+
+
+class Recorder:
+    def __init__(self, directory, segment_bytes=64 << 20, index_interval=1.0, flush_interval=1.0):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.index_interval_ns = int(index_interval * 1e9)
+        self.flush_interval = flush_interval
+        self.records = 0
+        self.bytes = 0
+        self.segments = 0
+        self._segment = None
+        self._index = None
+        self._size = 0
+        self._next_index_ns = 0
+        self._last_flush = time.monotonic()
+
+    def record(self, source, payload, received_ns=None):
+        """Appends one frame. ``payload`` is the raw text, bytes, or a decoded JSON value."""
+        received_ns = received_ns or time.time_ns()
+        if isinstance(payload, str):
+            payload = payload.encode()
+        elif not isinstance(payload, (bytes, bytearray)):
+            payload = json.dumps(payload, separators=(",", ":")).encode()
+        if self._segment is None or self._size >= self.segment_bytes:
+            self._open(received_ns)
+        if received_ns >= self._next_index_ns:
+            self._index.write(_INDEX.pack(received_ns, self._size))
+            self._next_index_ns = received_ns + self.index_interval_ns
+        self._segment.write(_HEADER.pack(received_ns, _SOURCE_CODES[source], len(payload)))
+        self._segment.write(payload)
+        size = _HEADER.size + len(payload)
+        self._size += size
+        self.bytes += size
+        self.records += 1
+        now = time.monotonic()
+        if now - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def _open(self, received_ns):
+        self.close()
+        name = f"{received_ns:020d}"
+        self._segment = open(self.directory / f"{name}.seg", "ab", buffering=1 << 20)
+        self._index = open(self.directory / f"{name}.idx", "ab")
+        self._size = self._segment.tell()
+        self._next_index_ns = 0
+        self.segments += 1
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if self._segment is not None:
+            self._segment.flush()
+            self._index.flush()
+
+    def close(self):
+        if self._segment is not None:
+            self.flush()
+            self._segment.close()
+            self._index.close()
+            self._segment = self._index = None
+
+    def stats(self):
+        return {"records": self.records, "bytes": self.bytes, "segments": self.segments}
+
+
+def segments(directory):
+    """The segment files of a recording, oldest first."""
+    return sorted(Path(directory).glob("*.seg"))
+
+
+def _start_offset(path, start_ns):
+    # The last indexed record at or before start_ns; records before it are skipped.
+    index_path = path.with_suffix(".idx")
+    if start_ns is None or not index_path.exists():
+        return 0
+    index = np.fromfile(index_path, dtype=_INDEX_DTYPE)
+    position = np.searchsorted(index["received_ns"], start_ns, side="right") - 1
+    return int(index["offset"][position]) if position >= 0 else 0
+
+
+def read_records(directory, start_ns=None, end_ns=None):
+    """Yields (received_ns, source, payload bytes) in recording order.
+
+    A record cut short by a crash ends its segment.
+    """
+    paths = segments(directory)
+    first = 0
+    if start_ns is not None:
+        first = max(bisect.bisect_right([int(path.stem) for path in paths], start_ns) - 1, 0)
+    for path in paths[first:]:
+        if end_ns is not None and int(path.stem) > end_ns:
+            return
+        with open(path, "rb") as file:
+            size = file.seek(0, 2)
+            if not size:
+                continue
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                offset = _start_offset(path, start_ns)
+                while offset + _HEADER.size <= size:
+                    received_ns, code, length = _HEADER.unpack_from(data, offset)
+                    start = offset + _HEADER.size
+                    offset = start + length
+                    if offset > size:
+                        break
+                    if start_ns is not None and received_ns < start_ns:
+                        continue
+                    if end_ns is not None and received_ns > end_ns:
+                        return
+                    yield received_ns, SOURCES[code], data[start:offset]
+
+
+class Replayer:
+    """Streams a recording back into a TradingEngine, through the same queues as live frames.
+
+    Args:
+        speed (float): 1 replays in real time, 10 ten times faster. 0 replays as
+            fast as the engine keeps up: each frame is handled before the next
+            one is fed, so none are coalesced.
+        send_orders (bool): Pass the strategy's signals to the executor. By
+            default they are only collected in ``signals``.
+    """
+
+    def __init__(self, engine, directory, speed=1.0, send_orders=False):
+        self.engine = engine
+        self.directory = directory
+        self.speed = speed
+        self.send_orders = send_orders
+        self.frames = 0
+        self.signals = []
+
+    async def run(self, start_ns=None, end_ns=None):
+        """Replays the frames received in [start_ns, end_ns]. Returns the number of frames fed."""
+        engine = self.engine
+        client = engine.api_client
+        consumer = asyncio.create_task(client._consume_inbound(engine._handle_websocket_message))
+        execute_trade = engine.execute_trade
+        if not self.send_orders:
+            engine.execute_trade = self.signals.append
+        queues = {id(client.inbound): client.inbound}
+        origin = None
+        try:
+            for received_ns, source, payload in read_records(self.directory, start_ns, end_ns):
+                if origin is None:
+                    origin = (time.perf_counter_ns(), received_ns)
+                elif self.speed:
+                    delay = origin[0] + (received_ns - origin[1]) / self.speed - time.perf_counter_ns()
+                    if delay > 0:
+                        await asyncio.sleep(delay / 1e9)
+                if source == PRIVATE:
+                    client._on_private_message(bytes(payload).decode())
+                    queue = client.inbound
+                else:
+                    event = engine.market_data.dispatch(source, json.loads(payload))
+                    if event is None:
+                        continue
+                    engine.consume(event.symbol)
+                    queue = engine.market_data.queue(event.symbol)
+                    queues[id(queue)] = queue
+                self.frames += 1
+                if not self.speed:
+                    await _drained(queue)
+                elif self.frames % 100 == 0:
+                    # Lets the consumers run even when the replay is behind schedule.
+                    await asyncio.sleep(0)
+            for queue in queues.values():
+                await _drained(queue)
+        finally:
+            consumer.cancel()
+            await asyncio.gather(consumer, return_exceptions=True)
+            engine.execute_trade = execute_trade
+        return self.frames
+
+
+async def _drained(queue):
+    # One pass of the loop lets the consumer take the item and run its handler.
+    while queue.qsize():
+        await asyncio.sleep(0)
+    await asyncio.sleep(0)
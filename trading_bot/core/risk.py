@@ -0,0 +1,244 @@
+"""Pre-trade risk checks, answered from counters kept in memory.
+
+Every signal is checked against the limits below before it is queued for
+execution. Each check is a handful of dict lookups and comparisons, with no
+loop over symbols and no REST call. The state behind the checks is updated
+incrementally:
+
+* an accepted signal reserves its quantity and an open-order slot straight
+  away, so a burst of signals cannot slip past a limit before any is acked;
+* order-state changes from the OrderManager move filled quantity from the
+  open orders into the position, and release what is left once the order
+  is done;
+* ACCOUNT_UPDATE events set positions and the equity to the exchange's
+  values; marks come from the market data;
+* after each account resync, positions and the equity are reloaded and the
+  open-order counters are recounted from the orders still open, so nothing
+  missed while the private stream was down lingers.
+
+Exposure of a symbol is its worst case if every open order fills: the larger
+of (position + open buys) and (position - open sells), at the mark price.
+Gross exposure is the sum over symbols, kept as a running total. A fill
+may be counted twice until the next ACCOUNT_UPDATE, so exposure errs high.
+
+Limits set to 0 are off.
+"""
+import time
+from dataclasses import dataclass
+
+from trading_bot.core.account_state import parse_balance, parse_position
+from trading_bot.core.config import (RISK_EQUITY_ASSET, RISK_MAX_GROSS_NOTIONAL, RISK_MAX_LEVERAGE,
+                                     RISK_MAX_OPEN_ORDERS, RISK_MAX_OPEN_ORDERS_PER_SYMBOL, RISK_MAX_ORDER_NOTIONAL,
+                                     RISK_MAX_ORDER_QUANTITY, RISK_MAX_ORDERS_PER_SECOND, RISK_MAX_POSITION_NOTIONAL)
+from trading_bot.core.rate_limit import TokenBucket
+
+
+@dataclass
+class RiskLimits:
+    max_order_quantity: float = RISK_MAX_ORDER_QUANTITY
+    max_order_notional: float = RISK_MAX_ORDER_NOTIONAL
+    max_position_notional: float = RISK_MAX_POSITION_NOTIONAL
+    max_gross_notional: float = RISK_MAX_GROSS_NOTIONAL
+    max_leverage: float = RISK_MAX_LEVERAGE
+    max_open_orders: int = RISK_MAX_OPEN_ORDERS
+    max_open_orders_per_symbol: int = RISK_MAX_OPEN_ORDERS_PER_SYMBOL
+    max_orders_per_second: float = RISK_MAX_ORDERS_PER_SECOND
+
+    @property
+    def needs_price(self):
+        return bool(self.max_order_notional or self.max_position_notional or self.max_gross_notional
+                    or self.max_leverage)
+
+
+class RiskEngine:
+    def __init__(self, limits=None, equity_asset=RISK_EQUITY_ASSET):
+        self.limits = limits or RiskLimits()
+        self.equity_asset = equity_asset.upper()
+        self.equity = None
+        self.positions = {}
+        self.open_buys = {}
+        self.open_sells = {}
+        self.open_orders = {}
+        self.total_open_orders = 0
+        self.marks = {}
+        self.exposure = {}
+        self.gross = 0.0
+        self.rejected = {}
+        self.accepted = 0
+        rate = self.limits.max_orders_per_second
+        self._bucket = TokenBucket(rate) if rate else None
+
+    # Checks.
+
+    def check(self, signal):
+        """Checks a signal against the limits and reserves it if it passes.
+
+        Returns:
+            str: None if the signal was accepted, otherwise why not, starting
+            with the name of the limit it broke.
+        """
+        limits = self.limits
+        symbol = str(signal.get("symbol", "")).upper()
+        buy = str(signal.get("action", "")).upper() == "BUY"
+        try:
+            quantity = float(signal.get("quantity") or 0)
+        except (TypeError, ValueError):
+            quantity = 0.0
+        if quantity <= 0 or not symbol:
+            return self._reject("invalid", f"invalid: quantity {signal.get('quantity')!r}, symbol {symbol!r}")
+        if limits.max_order_quantity and quantity > limits.max_order_quantity:
+            return self._reject("max_order_quantity", f"max_order_quantity: {quantity} > {limits.max_order_quantity}")
+        open_here = self.open_orders.get(symbol, 0)
+        if limits.max_open_orders and self.total_open_orders >= limits.max_open_orders:
+            return self._reject("max_open_orders", f"max_open_orders: {self.total_open_orders} open")
+        if limits.max_open_orders_per_symbol and open_here >= limits.max_open_orders_per_symbol:
+            return self._reject("max_open_orders_per_symbol",
+                                f"max_open_orders_per_symbol: {open_here} open on {symbol}")
+
+        price = signal.get("price") or self.marks.get(symbol)
+        if limits.needs_price:
+            if not price:
+                return self._reject("no_price", f"no_price: no price or mark for {symbol}")
+            price = float(price)
+            notional = quantity * price
+            if limits.max_order_notional and notional > limits.max_order_notional:
+                return self._reject("max_order_notional",
+                                    f"max_order_notional: {notional:.2f} > {limits.max_order_notional}")
+            position = self.positions.get(symbol, 0.0)
+            long = position + self.open_buys.get(symbol, 0.0) + (quantity if buy else 0.0)
+            short = position - self.open_sells.get(symbol, 0.0) - (0.0 if buy else quantity)
+            exposure = max(abs(long), abs(short)) * price
+            if limits.max_position_notional and exposure > limits.max_position_notional:
+                return self._reject("max_position_notional",
+                                    f"max_position_notional: {symbol} {exposure:.2f} > {limits.max_position_notional}")
+            gross = self.gross - self.exposure.get(symbol, 0.0) + exposure
+            if limits.max_gross_notional and gross > limits.max_gross_notional:
+                return self._reject("max_gross_notional",
+                                    f"max_gross_notional: {gross:.2f} > {limits.max_gross_notional}")
+            if limits.max_leverage:
+                if not self.equity or self.equity <= 0:
+                    return self._reject("max_leverage", "max_leverage: equity unknown")
+                if gross / self.equity > limits.max_leverage:
+                    return self._reject("max_leverage",
+                                        f"max_leverage: {gross / self.equity:.2f}x > {limits.max_leverage}x")
+
+        # The rate is checked last, so rejected signals do not use up the budget.
+        if self._bucket is not None:
+            if self._bucket.delay(time.monotonic()):
+                return self._reject("max_orders_per_second",
+                                    f"max_orders_per_second: more than {limits.max_orders_per_second}/s")
+            self._bucket.tokens -= 1
+
+        book = self.open_buys if buy else self.open_sells
+        book[symbol] = book.get(symbol, 0.0) + quantity
+        self.open_orders[symbol] = open_here + 1
+        self.total_open_orders += 1
+        if price:
+            self.marks.setdefault(symbol, float(price))
+        self._reprice(symbol)
+        self.accepted += 1
+        return None
+
+    def _reject(self, limit, reason):
+        self.rejected[limit] = self.rejected.get(limit, 0) + 1
+        return reason
+
+    def release(self, signal):
+        """Returns the reservation of an accepted signal that was never sent."""
+        symbol = str(signal["symbol"]).upper()
+        self._close_order(symbol, str(signal["action"]).upper() == "BUY", float(signal["quantity"]))
+
+    # State updates.
+
+    def on_order(self, order, filled):
+        """OrderManager listener: ``filled`` is the quantity the order filled since its last update."""
+        buy = order.side == "BUY"
+        if filled:
+            book = self.open_buys if buy else self.open_sells
+            book[order.symbol] = max(book.get(order.symbol, 0.0) - filled, 0.0)
+            self.positions[order.symbol] = self.positions.get(order.symbol, 0.0) + (filled if buy else -filled)
+            self._reprice(order.symbol)
+        if order.done:
+            self._close_order(order.symbol, buy, max(order.quantity - order.filled, 0.0))
+
+    def _close_order(self, symbol, buy, remaining):
+        book = self.open_buys if buy else self.open_sells
+        book[symbol] = max(book.get(symbol, 0.0) - remaining, 0.0)
+        if self.open_orders.get(symbol, 0) > 0:
+            self.open_orders[symbol] -= 1
+            self.total_open_orders -= 1
+        self._reprice(symbol)
+
+    def apply(self, message):
+        """Takes positions and the equity from an ACCOUNT_UPDATE private-stream event."""
+        data = message.get("data", message) if isinstance(message, dict) else None
+        if not isinstance(data, dict) or data.get("e") != "ACCOUNT_UPDATE" or not isinstance(data.get("a"), dict):
+            return False
+        for row in data["a"].get("B", ()):
+            balance = parse_balance(row)
+            if balance and balance[0] == self.equity_asset:
+                self.equity = balance[1]["wallet"]
+        for row in data["a"].get("P", ()):
+            position = parse_position(row)
+            if position:
+                self.set_position(position[0], position[1]["quantity"], position[1]["entry_price"])
+        return True
+
+    def load(self, account):
+        """Takes positions and the equity from a synced AccountState, replacing the ones held."""
+        balance = account.balance(self.equity_asset)
+        if balance:
+            self.equity = balance["wallet"]
+        for symbol in set(self.positions) - set(account.positions):
+            self.set_position(symbol, 0.0)
+        for symbol, position in account.positions.items():
+            self.set_position(symbol, position["quantity"], position["entry_price"])
+
+    def rebuild(self, orders, queued=()):
+        """Recounts the open orders and the quantity they reserve.
+
+        Args:
+            orders (list): The OrderManager's orders that are not done.
+            queued (list): Accepted signals that were not sent yet.
+        """
+        open_orders = [(order.symbol, order.side == "BUY", max(order.quantity - order.filled, 0.0))
+                       for order in orders]
+        open_orders += [(str(signal["symbol"]).upper(), str(signal["action"]).upper() == "BUY",
+                         float(signal["quantity"])) for signal in queued]
+        symbols = set(self.open_orders) | set(self.open_buys) | set(self.open_sells)
+        self.open_buys, self.open_sells, self.open_orders = {}, {}, {}
+        for symbol, buy, remaining in open_orders:
+            book = self.open_buys if buy else self.open_sells
+            book[symbol] = book.get(symbol, 0.0) + remaining
+            self.open_orders[symbol] = self.open_orders.get(symbol, 0) + 1
+        self.total_open_orders = len(open_orders)
+        for symbol in symbols | set(self.open_orders):
+            self._reprice(symbol)
+
+    def set_position(self, symbol, quantity, entry_price=None):
+        symbol = symbol.upper()
+        self.positions[symbol] = quantity
+        if entry_price:
+            self.marks.setdefault(symbol, entry_price)
+        self._reprice(symbol)
+
+    def mark(self, symbol, price):
+        """Updates the price exposure is valued at."""
+        self.marks[symbol] = price
+        if symbol in self.exposure or symbol in self.positions:
+            self._reprice(symbol)
+
+    def _reprice(self, symbol):
+        price = self.marks.get(symbol)
+        if not price:
+            return
+        position = self.positions.get(symbol, 0.0)
+        exposure = max(abs(position + self.open_buys.get(symbol, 0.0)),
+                       abs(position - self.open_sells.get(symbol, 0.0))) * price
+        self.gross += exposure - self.exposure.get(symbol, 0.0)
+        self.exposure[symbol] = exposure
+
+    def stats(self):
+        return {"accepted": self.accepted, "rejected": dict(self.rejected), "open_orders": self.total_open_orders,
+                "gross_notional": self.gross, "equity": self.equity,
+                "leverage": self.gross / self.equity if self.equity else None}
@@ -0,0 +1,330 @@
+"""Runs the engine as several processes, each trading a shard of the symbols.
+
+MARKET_DATA_PAIRS are split across SHARDS worker processes by symbol, so all
+intervals of a symbol land on the same shard, and symbols are dealt out in
+name order so every shard gets an even share. Each shard is a full
+TradingEngine on its own event loop and core, with its own connections,
+streams, order tracking and risk state. With SHARD_ACCOUNTS, the shards are
+spread over several accounts too.
+
+Shards trading the same account draw from one rate-limit budget
+(rate_limit.SharedBuckets), so together they stay within the exchange's
+limits.
+
+The supervisor process runs the console and the Telegram bot. To them it
+looks like a TradingEngine: each command goes to every shard over a pipe and
+the answers are merged. A shard that dies is started again after a backoff
+while the others keep trading; a shard whose supervisor dies shuts itself
+down.
+"""
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from trading_bot.core import trading_engine
+from trading_bot.core.config import (LOG_FILE, MARKET_DATA_PAIRS, METRICS_FILE, RATE_LIMIT_ORDER_RESERVE,
+                                     RATE_LIMITS, RECORD_DIR, SHARD_ACCOUNTS, SHARD_RESTART_DELAY, SHARDS,
+                                     SHUTDOWN_DEADLINE)
+from trading_bot.core.logging_config import setup_logging
+from trading_bot.core.market_data import split_pair
+from trading_bot.core.metrics import metrics
+from trading_bot.core.rate_limit import RequestScheduler, SharedBuckets
+from trading_bot.core.reconnect import Backoff
+
+# Seconds a shard has to answer a console or Telegram query.
+QUERY_TIMEOUT = 5.0
+# A shard that ran this long before dying restarts after the shortest delay again.
+_STABLE_AFTER = 60.0
+
+
+@dataclass
+class ShardSpec:
+    index: int
+    pairs: list
+    account: int = 0
+    api_key: str = field(default=None, repr=False)
+    api_secret: str = field(default=None, repr=False)
+
+    @property
+    def symbols(self):
+        return sorted({split_pair(pair)[0] for pair in self.pairs})
+
+    @property
+    def name(self):
+        return f"shard {self.index} ({', '.join(self.symbols) or 'no pairs'})"
+
+
+def plan_shards(pairs, shards, accounts=()):
+    """Splits pairs into ``shards`` ShardSpecs by symbol, and deals the shards out over ``accounts``.
+
+    Args:
+        accounts (list): (api_key, api_secret) pairs; empty = the configured account.
+    """
+    by_symbol = {}
+    for pair in pairs:
+        by_symbol.setdefault(split_pair(pair)[0], []).append(pair)
+    shards = max(1, min(shards, len(by_symbol) or 1))
+    specs = [ShardSpec(index, []) for index in range(shards)]
+    for position, symbol in enumerate(sorted(by_symbol)):
+        specs[position % shards].pairs.extend(by_symbol[symbol])
+    for spec in specs:
+        if accounts:
+            spec.account = spec.index % len(accounts)
+            spec.api_key, spec.api_secret = accounts[spec.account]
+    return specs
+
+
+def _shard_path(path, index):
+    """trading_bot.log -> trading_bot.shard1.log"""
+    path = Path(path)
+    return str(path.with_name(f"{path.stem}.shard{index}{path.suffix}"))
+
+
+# Worker side.
+
+def run_shard(spec, conn, budget):
+    """Process entry point: runs one engine shard until it is told to stop or the supervisor goes away."""
+    # Ctrl+C reaches the whole process group; only the supervisor acts on it, and a
+    # shard then stops cleanly when its pipe closes.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    setup_logging(_shard_path(LOG_FILE, spec.index))
+    # Module settings are per process, so each shard gets its own pairs and output files.
+    trading_engine.MARKET_DATA_PAIRS = spec.pairs
+    if METRICS_FILE:
+        trading_engine.METRICS_FILE = _shard_path(METRICS_FILE, spec.index)
+    if RECORD_DIR:
+        trading_engine.RECORD_DIR = os.path.join(RECORD_DIR, f"shard{spec.index}")
+    asyncio.run(_serve(spec, conn, budget))
+
+
+async def _serve(spec, conn, budget):
+    engine = trading_engine.TradingEngine()
+    if spec.api_key:
+        engine.api_client.api_key, engine.api_client.api_secret = spec.api_key, spec.api_secret
+    if budget is not None:
+        engine.api_client.scheduler = RequestScheduler(RATE_LIMITS, RATE_LIMIT_ORDER_RESERVE, shared=budget)
+    logging.info(f"Starting {spec.name}, pid {os.getpid()}.")
+    engine_task = asyncio.create_task(engine.start())
+    replies = set()
+    while not engine.stopped.is_set():
+        if engine_task.done() and not engine.stopping:
+            # A crash ends the process, and the supervisor starts the shard again.
+            engine_task.result()
+        try:
+            if not await asyncio.to_thread(conn.poll, 0.2):
+                continue
+            request_id, command, args = conn.recv()
+        except (EOFError, OSError):
+            logging.warning(f"Supervisor went away, stopping {spec.name}.")
+            await engine.stop()
+            break
+        reply = asyncio.create_task(_reply(engine, conn, request_id, command, args))
+        replies.add(reply)
+        reply.add_done_callback(replies.discard)
+    await asyncio.gather(*replies, return_exceptions=True)
+    await asyncio.gather(engine_task, return_exceptions=True)
+
+
+async def _reply(engine, conn, request_id, command, args):
+    try:
+        if command == "balance":
+            result = await engine.get_balance()
+        elif command == "positions":
+            result = await engine.get_positions()
+        elif command == "stats":
+            result = engine.stats_report()
+        elif command == "stop":
+            result = await engine.stop(*args)
+        else:
+            raise ValueError(f"Unknown shard command {command!r}")
+    except Exception as e:
+        logging.exception(f"Shard command {command} failed")
+        result = e
+    try:
+        conn.send((request_id, result))
+    except (OSError, ValueError):
+        pass
+
+
+# Supervisor side.
+
+async def _readable(handle, timeout=None):
+    """Waits until a pipe or process sentinel is readable, without tying up a thread.
+
+    The loop keeps one reader per file descriptor, so only one coroutine may
+    wait on a handle at a time.
+
+    Returns:
+        bool: False if ``timeout`` seconds passed first.
+    """
+    loop = asyncio.get_running_loop()
+    ready = loop.create_future()
+    loop.add_reader(handle, lambda: ready.done() or ready.set_result(True))
+    try:
+        return await asyncio.wait_for(ready, timeout)
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        loop.remove_reader(handle)
+
+
+@dataclass
+class ShardedShutdownReport:
+    """The ShutdownReport of each shard, or None for a shard that did not answer."""
+
+    reports: dict = field(default_factory=dict)
+
+    def summary(self):
+        return "\n".join(f"{name}: {report.summary() if report else 'no report, the shard was not running'}"
+                         for name, report in self.reports.items())
+
+
+class ShardSupervisor:
+    """Starts the shards, restarts the ones that die, and fans console and Telegram commands out to them.
+
+    It has the TradingEngine methods the console and the Telegram bot use,
+    so either can drive it; only stats_report is a coroutine here.
+
+    Args:
+        pairs (list): Market data pairs to split, as in MARKET_DATA_PAIRS.
+        shards (int): Worker processes, at most one per symbol.
+        accounts (list): (api_key, api_secret) pairs the shards are dealt out over.
+        restart_delay (float): First delay in seconds before a dead shard is
+            started again; it doubles, with jitter, while the shard keeps dying.
+    """
+
+    def __init__(self, pairs=MARKET_DATA_PAIRS, shards=SHARDS, accounts=SHARD_ACCOUNTS,
+                 restart_delay=SHARD_RESTART_DELAY):
+        self.context = multiprocessing.get_context("spawn")
+        self.specs = plan_shards(pairs, shards, accounts)
+        self.budgets = {}
+        for spec in self.specs:
+            if spec.account not in self.budgets:
+                self.budgets[spec.account] = SharedBuckets(RATE_LIMITS, self.context)
+        self.restart_delay = restart_delay
+        self.processes = {}
+        self.connections = {}
+        self.restarts = {spec.index: 0 for spec in self.specs}
+        self._locks = {spec.index: asyncio.Lock() for spec in self.specs}
+        self._request_ids = itertools.count(1)
+        self._watchers = []
+        self._shutdown = None
+        self.stopping = False
+        self.stopped = asyncio.Event()
+
+    def _spawn(self, spec):
+        parent, child = self.context.Pipe()
+        process = self.context.Process(target=run_shard, args=(spec, child, self.budgets[spec.account]),
+                                       name=f"shard-{spec.index}")
+        process.start()
+        child.close()
+        self.processes[spec.index], self.connections[spec.index] = process, parent
+        return process
+
+    async def start(self):
+        """Starts every shard and keeps them running until stop()."""
+        logging.info(f"Starting {len(self.specs)} shard(s): {'; '.join(spec.name for spec in self.specs)}.")
+        self._watchers = [asyncio.create_task(self._watch(spec)) for spec in self.specs]
+        await asyncio.gather(*self._watchers, return_exceptions=True)
+
+    async def _watch(self, spec):
+        backoff = Backoff(self.restart_delay, max(self.restart_delay, 30.0))
+        while not self.stopping:
+            process = self._spawn(spec)
+            started = time.monotonic()
+            # A thread per shard blocked in join() would starve the default executor.
+            await _readable(process.sentinel)
+            process.join()
+            if self.stopping:
+                return
+            self.restarts[spec.index] += 1
+            metrics.count("shard_restarts")
+            if time.monotonic() - started >= _STABLE_AFTER:
+                backoff.reset()
+            delay = backoff.next()
+            logging.error(f"{spec.name} exited with code {process.exitcode}, restarting it in {delay:.1f} s.")
+            await asyncio.sleep(delay)
+
+    async def _ask(self, spec, command, *args, timeout=QUERY_TIMEOUT):
+        """Sends a command to one shard. Returns its answer, or None if it is down or too slow."""
+        async with self._locks[spec.index]:
+            process, conn = self.processes.get(spec.index), self.connections.get(spec.index)
+            if process is None or not process.is_alive():
+                return None
+            request_id = next(self._request_ids)
+            end = time.monotonic() + timeout
+            try:
+                conn.send((request_id, command, args))
+                # Answers to earlier requests that timed out are skipped.
+                while conn.poll() or await _readable(conn.fileno(), max(end - time.monotonic(), 0)):
+                    answer_id, result = conn.recv()
+                    if answer_id == request_id:
+                        return None if isinstance(result, Exception) else result
+            except (EOFError, OSError):
+                pass
+            logging.warning(f"{spec.name} did not answer {command}.")
+            return None
+
+    async def _ask_all(self, command, *args, timeout=QUERY_TIMEOUT):
+        results = await asyncio.gather(*(self._ask(spec, command, *args, timeout=timeout) for spec in self.specs))
+        return list(zip(self.specs, results))
+
+    async def _per_account(self, command):
+        # Shards of one account see the same account, so the first answer per account is enough.
+        answers = {}
+        for spec, result in await self._ask_all(command):
+            if result is not None:
+                answers.setdefault(spec.account, result)
+        if len(self.budgets) == 1:
+            return next(iter(answers.values()), None)
+        return {f"account {account}": result for account, result in sorted(answers.items())} or None
+
+    async def get_balance(self):
+        return await self._per_account("balance")
+
+    async def get_positions(self):
+        return await self._per_account("positions")
+
+    async def stats_report(self):
+        """Every shard's stats table under its name, and the restart counts."""
+        sections = [f"== {spec.name}, restarted {self.restarts[spec.index]} time(s) ==\n"
+                    f"{result if result is not None else 'not running'}"
+                    for spec, result in await self._ask_all("stats")]
+        return "\n".join(sections)
+
+    async def stop(self, deadline=SHUTDOWN_DEADLINE):
+        """Stops every shard within ``deadline``, each cancelling its own orders.
+
+        Calling it again waits for the same shutdown.
+
+        Returns:
+            ShardedShutdownReport: The report of each shard.
+        """
+        if self._shutdown is None:
+            self._shutdown = asyncio.ensure_future(self._shut_down(deadline))
+        return await asyncio.shield(self._shutdown)
+
+    async def _shut_down(self, deadline):
+        logging.info("Stopping shards...")
+        self.stopping = True
+        answers = await self._ask_all("stop", deadline, timeout=deadline + QUERY_TIMEOUT)
+        report = ShardedShutdownReport({spec.name: result for spec, result in answers})
+        # Each watcher returns once its shard has exited.
+        if self._watchers:
+            await asyncio.wait(self._watchers, timeout=QUERY_TIMEOUT)
+        for process in self.processes.values():
+            if process.is_alive():
+                logging.warning(f"{process.name} did not exit, terminating it.")
+                process.terminate()
+        await asyncio.gather(*self._watchers, return_exceptions=True)
+        for conn in self.connections.values():
+            conn.close()
+        logging.info(report.summary())
+        self.stopped.set()
+        return report
@@ -0,0 +1,99 @@
+"""Cancelling every open order within a deadline, for shutdown.
+
+Orders are cancelled on the same endpoints the executor places them on
+(``/order`` and ``/orders``), which have no cancel-all. The open orders of
+every symbol the bot may trade are queried, all symbols at once, and merged
+with the orders the bot tracks itself. Each of them is then cancelled, also
+concurrently, and the open orders are queried again. This repeats until the
+queries come back empty or the deadline passes.
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+
+from trading_bot.core.account_state import parse_open_orders
+
+
+@dataclass
+class ShutdownReport:
+    started: float = field(default_factory=time.monotonic)
+    elapsed: float = 0.0
+    dropped_signals: int = 0
+    dropped_orders: int = 0
+    abandoned_orders: int = 0
+    queried_symbols: list = field(default_factory=list)
+    cancelled_orders: list = field(default_factory=list)
+    remaining: dict = field(default_factory=dict)
+    confirmed: bool = False
+    timed_out: bool = False
+
+    def finish(self):
+        self.elapsed = time.monotonic() - self.started
+        return self
+
+    def summary(self):
+        lines = [f"Shutdown took {self.elapsed:.2f} s" + (" (deadline reached)" if self.timed_out else "") + ".",
+                 f"Open orders queried for: {', '.join(self.queried_symbols) or 'none'}; "
+                 f"{len(self.cancelled_orders)} order(s) cancelled."]
+        if self.dropped_signals or self.dropped_orders:
+            lines.append(f"Dropped {self.dropped_signals} signal(s) and {self.dropped_orders} unsent order(s).")
+        if self.abandoned_orders:
+            lines.append(f"{self.abandoned_orders} order request(s) were still in flight.")
+        if self.remaining:
+            lines.append("Still open: " + ", ".join(f"{order_id} ({order['symbol']})"
+                                                   for order_id, order in sorted(self.remaining.items())))
+        elif self.confirmed:
+            lines.append("The exchange reports no open orders.")
+        else:
+            lines.append("Could not confirm that no orders are open.")
+        return "\n".join(lines)
+
+
+async def _query_open_orders(api_client, symbols, pending, timeout):
+    """The open orders of ``symbols`` as the exchange lists them, and the symbols whose query failed.
+
+    For a symbol whose query failed, and for orders without a symbol, the
+    orders in ``pending`` are kept.
+    """
+    responses = await asyncio.gather(*(api_client.get_open_orders_async({"symbol": symbol}, timeout=timeout)
+                                       for symbol in symbols))
+    failed = [symbol for symbol, response in zip(symbols, responses) if response is None]
+    listed = {order_id: order for order_id, order in pending.items()
+              if order["symbol"] in failed or order["symbol"] not in symbols}
+    for response in responses:
+        if response is not None:
+            listed.update(parse_open_orders(response))
+    return listed, failed
+
+
+async def cancel_open_orders(api_client, symbols, orders, report, deadline):
+    """Cancels the open orders of ``symbols``, and ``orders`` ({order_id: order}), until ``deadline``.
+
+    Progress is written to ``report`` as it happens, so it stays accurate if
+    the caller gives up first. ``deadline`` is a ``time.monotonic()`` value.
+    """
+    def left():
+        return max(deadline - time.monotonic(), 0.001)
+
+    pending = dict(orders)
+    symbols = sorted(set(symbols) | {order["symbol"] for order in pending.values() if order["symbol"]})
+    report.remaining = dict(pending)
+    pending, failed = await _query_open_orders(api_client, symbols, pending, left())
+    report.queried_symbols = [symbol for symbol in symbols if symbol not in failed]
+    report.remaining = pending
+    report.confirmed = not pending and not failed
+
+    while pending and time.monotonic() < deadline:
+        ids = list(pending)
+        responses = await asyncio.gather(*(api_client.cancel_order_async(order_id, timeout=left())
+                                           for order_id in ids))
+        cancelled = {order_id for order_id, response in zip(ids, responses) if response is not None}
+        report.cancelled_orders += [order_id for order_id in ids if order_id in cancelled]
+        pending = {order_id: order for order_id, order in pending.items() if order_id not in cancelled}
+        pending, failed = await _query_open_orders(api_client, symbols, pending, left())
+        report.remaining = pending
+        report.confirmed = not pending and not failed
+        if pending:
+            # Gives the exchange a moment to apply the cancels before trying again.
+            await asyncio.sleep(min(0.1, left()))
+    return report
@@ -0,0 +1,186 @@
+"""Runs many strategy modules in parallel worker processes.
+
+Strategies are pinned to workers (strategy ``i`` always runs on worker
+``i % workers``), so streaming strategies keep their state between bars.
+Candle buffers live in shared memory. For each bar, a worker only receives
+the buffer's name and length, never the data. Signals come back in strategy
+order, so the result of a bar does not depend on which worker finished first.
+History bars reach streaming strategies through ``update``, which feeds them
+to ``on_bar`` in one batch per worker and discards the signals.
+
+A strategy that takes its worker down (a crash in native code, ``os._exit``)
+breaks that worker's executor for good. The worker is then started again,
+losing the state of its streaming strategies, and its strategies give no
+signals for that bar.
+"""
+import asyncio
+import importlib
+import importlib.util
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from trading_bot.core.candle_store import CandleBuffer
+from trading_bot.core.metrics import metrics
+
+_modules = {}
+_buffers = {}
+
+
+def discover_strategies(modules=(), directory=None):
+    """Returns strategy references: module names, then ``.py`` files of a directory in name order."""
+    refs = list(modules)
+    if directory:
+        refs += sorted(str(path) for path in Path(directory).glob("*.py") if not path.name.startswith("_"))
+    return refs
+
+
+def import_strategy(ref):
+    """Imports a strategy by module name or by file path, once per process."""
+    module = _modules.get(ref)
+    if module is None:
+        if ref.endswith(".py"):
+            spec = importlib.util.spec_from_file_location(f"strategy_{Path(ref).stem}", ref)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+        else:
+            module = importlib.import_module(ref)
+        _modules[ref] = module
+    return module
+
+
+def _attached_buffer(name, capacity, total):
+    buffer = _buffers.get(name)
+    if buffer is None:
+        buffer = _buffers[name] = CandleBuffer.attach(name, capacity, total)
+    buffer._total = total
+    return buffer
+
+
+def _evaluate(jobs, shm_name, capacity, total, new_bar, symbol, interval):
+    """Runs in a worker: evaluates its strategies against one shared candle buffer."""
+    buffer = _attached_buffer(shm_name, capacity, total)
+    results = []
+    for index, ref in jobs:
+        try:
+            module = import_strategy(ref)
+            on_bar = getattr(module, "on_bar", None)
+            if callable(on_bar):
+                signal = on_bar(buffer.last(), new_bar, symbol=symbol, interval=interval)
+            else:
+                signal = module.check_strategy(buffer.to_frame(), symbol=symbol, interval=interval)
+            results.append((index, signal, None))
+        except Exception as e:
+            results.append((index, None, f"{type(e).__name__}: {e}"))
+    return results
+
+
+def _update(jobs, bars, symbol, interval):
+    """Runs in a worker: feeds (bar, new_bar) pairs to its streaming strategies and drops their signals."""
+    errors = []
+    for index, ref in jobs:
+        try:
+            on_bar = getattr(import_strategy(ref), "on_bar", None)
+            if callable(on_bar):
+                for bar, new_bar in bars:
+                    on_bar(bar, new_bar, symbol=symbol, interval=interval)
+        except Exception as e:
+            errors.append((index, f"{type(e).__name__}: {e}"))
+    return errors
+
+
+def _warm_up(refs):
+    for ref in refs:
+        import_strategy(ref)
+    return os.getpid()
+
+
+class StrategyPool:
+    def __init__(self, refs, workers=None):
+        if not refs:
+            raise ValueError("StrategyPool needs at least one strategy")
+        self.refs = list(refs)
+        self.workers = max(1, min(workers or os.cpu_count() or 1, len(self.refs)))
+        self._lanes = []
+        self._jobs = [[] for _ in range(self.workers)]
+        for index, ref in enumerate(self.refs):
+            self._jobs[index % self.workers].append((index, ref))
+
+    async def start(self):
+        """Starts the worker processes and imports every strategy before the first bar."""
+        if self._lanes:
+            return
+        self._lanes = [self._new_lane() for _ in range(self.workers)]
+        await asyncio.gather(*(self._warm_up(worker) for worker in range(self.workers)))
+        logging.info(f"Started {self.workers} strategy worker(s) for {len(self.refs)} strategies.")
+
+    @staticmethod
+    def _new_lane():
+        return ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+
+    async def _warm_up(self, worker):
+        await asyncio.get_running_loop().run_in_executor(self._lanes[worker], _warm_up,
+                                                         [ref for _, ref in self._jobs[worker]])
+
+    async def _run(self, worker, function, *args):
+        """Runs ``function(jobs, *args)`` on a worker. Returns [] if the worker died, after starting it again."""
+        lane = self._lanes[worker]
+        try:
+            return await asyncio.get_running_loop().run_in_executor(lane, function, self._jobs[worker], *args)
+        except BrokenProcessPool:
+            # Concurrent calls on the same dead worker restart it once.
+            if self._lanes and self._lanes[worker] is lane:
+                refs = ", ".join(ref for _, ref in self._jobs[worker])
+                logging.error(f"Strategy worker {worker} ({refs}) died, restarting it.")
+                metrics.count("strategy_worker_restarts")
+                lane.shutdown(wait=False, cancel_futures=True)
+                self._lanes[worker] = self._new_lane()
+                await self._warm_up(worker)
+            return []
+
+    async def evaluate(self, buffer, new_bar, symbol=None, interval=None):
+        """Evaluates every strategy on a shared CandleBuffer.
+
+        Args:
+            symbol (str): The symbol of the buffer, passed on to ``on_bar``.
+            interval (str): Its candle interval, passed on to ``on_bar``.
+
+        Returns:
+            list: Non-empty signals, in strategy order.
+        """
+        if buffer.shm is None:
+            raise ValueError("StrategyPool needs a shared-memory CandleBuffer")
+        await self.start()
+        batches = await asyncio.gather(*(
+            self._run(worker, _evaluate, buffer.shm.name, buffer.capacity, buffer.total, new_bar, symbol, interval)
+            for worker in range(self.workers)
+        ))
+        signals = []
+        results = sorted((result for batch in batches for result in batch), key=lambda result: result[0])
+        for index, signal, error in results:
+            if error:
+                logging.error(f"Strategy {self.refs[index]} failed: {error}")
+            elif signal:
+                signals.append(signal)
+        return signals
+
+    async def update(self, bars, symbol=None, interval=None):
+        """Feeds history bars, as (bar, new_bar) pairs, to every streaming strategy.
+
+        The signals they return are stale, so they are dropped.
+        """
+        if not bars:
+            return
+        await self.start()
+        batches = await asyncio.gather(*(self._run(worker, _update, bars, symbol, interval)
+                                         for worker in range(self.workers)))
+        for index, error in sorted(error for batch in batches for error in batch):
+            logging.error(f"Strategy {self.refs[index]} failed on history: {error}")
+
+    def close(self):
+        for lane in self._lanes:
+            lane.shutdown(wait=True, cancel_futures=True)
+        self._lanes = []
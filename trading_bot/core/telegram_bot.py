@@ -1,7 +1,10 @@
+import asyncio
+import html
+import inspect
 import logging
 from telegram import Update
 from telegram.ext import Application, CommandHandler, ContextTypes
-from trading_bot.core.config import TELEGRAM_BOT_TOKEN
+from trading_bot.core.config import TELEGRAM_BOT_TOKEN, TELEGRAM_CONCURRENT_UPDATES, TELEGRAM_REPLY_TIMEOUT
 from trading_bot.core.trading_engine import TradingEngine
 
 class TelegramBot:
@@ -11,10 +14,13 @@ class TelegramBot:
 
     def setup(self):
         """Sets up the Telegram bot application."""
-        self.application = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+        # Updates are handled concurrently, so a slow REST read never holds up other commands.
+        self.application = (Application.builder().token(TELEGRAM_BOT_TOKEN)
+                            .concurrent_updates(TELEGRAM_CONCURRENT_UPDATES).build())
         self.application.add_handler(CommandHandler("start", self.start))
         self.application.add_handler(CommandHandler("balance", self.balance))
         self.application.add_handler(CommandHandler("positions", self.positions))
+        self.application.add_handler(CommandHandler("stats", self.stats))
         self.application.add_handler(CommandHandler("stop", self.stop))
 
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -23,7 +29,7 @@ class TelegramBot:
 
     async def balance(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Fetches and displays the user's current futures account balance."""
-        balance_info = self.trading_engine.api_client.get_balance()
+        balance_info = await self._fetch(self.trading_engine.get_balance())
         if balance_info:
             await update.message.reply_text(f"Balance: {balance_info}")
         else:
@@ -31,18 +37,42 @@ class TelegramBot:
 
     async def positions(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Fetches and displays a list of all currently open futures positions."""
-        positions_info = self.trading_engine.api_client.get_positions()
+        positions_info = await self._fetch(self.trading_engine.get_positions())
         if positions_info:
             await update.message.reply_text(f"Positions: {positions_info}")
         else:
             await update.message.reply_text("Could not fetch positions.")
 
+    async def stats(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Shows the latency percentiles of each hot-path stage and the event counters."""
+        report = self.trading_engine.stats_report()
+        if inspect.isawaitable(report):
+            report = await report
+        await update.message.reply_text(f"<pre>{html.escape(report)}</pre>", parse_mode="HTML")
+
     async def stop(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-        """Initiates a graceful shutdown of the bot."""
-        self.trading_engine.stop()
-        await update.message.reply_text("Trading bot is shutting down...")
-
-    def run(self):
-        """Starts the Telegram bot."""
-        self.setup()
-        self.application.run_polling()
+        """Cancels all open orders and shuts the bot down, then reports the outcome."""
+        await update.message.reply_text("Trading bot is shutting down, cancelling open orders...")
+        report = await self.trading_engine.stop()
+        await update.message.reply_text(report.summary())
+
+    async def _fetch(self, read):
+        # Replies within the PRD's 2 seconds even when the exchange is slow.
+        try:
+            return await asyncio.wait_for(read, TELEGRAM_REPLY_TIMEOUT)
+        except asyncio.TimeoutError:
+            logging.warning(f"Telegram command timed out after {TELEGRAM_REPLY_TIMEOUT} s.")
+            return None
+
+    async def run(self):
+        """Polls for commands on the running event loop, next to the engine, until cancelled."""
+        if self.application is None:
+            self.setup()
+        async with self.application:
+            await self.application.start()
+            await self.application.updater.start_polling()
+            try:
+                await asyncio.Future()
+            finally:
+                await self.application.updater.stop()
+                await self.application.stop()
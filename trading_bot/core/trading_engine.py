@@ -1,12 +1,68 @@
 import asyncio
+import contextlib
 import importlib
 import logging
+import time
+import numpy as np
+from trading_bot.core.account_state import AccountState, parse_open_orders
 from trading_bot.core.api_client import CoinSwitchProApiClient
+from trading_bot.core.candle_store import COLUMNS, CandleStore, parse_candle
+from trading_bot.core.config import (ACCOUNT_RECONCILE_INTERVAL, CANDLE_BUFFER_CAPACITY, EXECUTION_QUEUE_SIZE, EXECUTION_WORKERS,
+                                     INBOUND_OVERFLOW_POLICY, INBOUND_QUEUE_SIZE, KLINE_CACHE_DIR,
+                                     KLINE_DOWNLOAD_CONCURRENCY, KLINE_PAGE_LIMIT, MARKET_DATA_PAIRS, METRICS_FILE,
+                                     METRICS_INTERVAL, METRICS_WINDOW, RECORD_DIR, RECORD_SEGMENT_MB, SHUTDOWN_DEADLINE,
+                                     STRATEGY_DIR, STRATEGY_MODULES, STRATEGY_WORKERS)
+from trading_bot.core.execution import OrderExecutor
+from trading_bot.core.instruments import InstrumentRegistry
+from trading_bot.core.kline_cache import KlineCache, KlineDownloader, interval_ms
+from trading_bot.core.logging_config import flush_logging
+from trading_bot.core.market_data import EVENT_CANDLES, MarketDataService, default_events, split_pair
+from trading_bot.core.metrics import metrics
+from trading_bot.core.order_book import OrderBookManager
+from trading_bot.core.order_manager import OrderManager
+from trading_bot.core.recorder import Recorder, Replayer
+from trading_bot.core.risk import RiskEngine
+from trading_bot.core.shutdown import ShutdownReport, cancel_open_orders
+from trading_bot.core.strategy_pool import StrategyPool, discover_strategies
+
+_TICKS = logging.getLogger("trading_bot.ticks")
+_TRADES = logging.getLogger("trading_bot.trades")
+_QUEUE = metrics.histogram("queue")
+_STRATEGY = metrics.histogram("strategy")
+_RISK = metrics.histogram("risk")
 
 class TradingEngine:
     def __init__(self):
         self.api_client = CoinSwitchProApiClient()
-        self.strategy = self._load_strategy()
+        strategy_refs = discover_strategies(STRATEGY_MODULES, STRATEGY_DIR)
+        self.strategy_pool = StrategyPool(strategy_refs, STRATEGY_WORKERS or None) if strategy_refs else None
+        # Worker processes read candles straight from shared memory.
+        self.candles = CandleStore(CANDLE_BUFFER_CAPACITY, shared=self.strategy_pool is not None)
+        self.account = AccountState(self.api_client, ACCOUNT_RECONCILE_INTERVAL, on_resync=self._account_resynced)
+        # Orders go out under client IDs and are tracked from the private stream.
+        self.orders = OrderManager(self.api_client)
+        # Signals are rounded to each symbol's tick and lot from metadata held in memory.
+        self.instruments = InstrumentRegistry(self.api_client)
+        # Every signal passes the pre-trade limits before it is queued.
+        self.risk = RiskEngine()
+        self.orders.listeners.append(self.risk.on_order)
+        self.executor = OrderExecutor(self.orders, EXECUTION_WORKERS, EXECUTION_QUEUE_SIZE)
+        self.order_books = OrderBookManager(self.api_client)
+        self.market_data = MarketDataService(queue_size=INBOUND_QUEUE_SIZE, overflow_policy=INBOUND_OVERFLOW_POLICY,
+                                             on_reconnect=self.backfill_candles)
+        self._market_data_consumers = {}
+        self.kline_cache = KlineCache(KLINE_CACHE_DIR)
+        self.kline_downloader = KlineDownloader(self.api_client, self.kline_cache, page_limit=KLINE_PAGE_LIMIT,
+                                                concurrency=KLINE_DOWNLOAD_CONCURRENCY)
+        self.recorder = Recorder(RECORD_DIR, RECORD_SEGMENT_MB << 20) if RECORD_DIR else None
+        self.api_client.recorder = self.market_data.recorder = self.recorder
+        self.strategy = None if self.strategy_pool else self._load_strategy()
+        self._metrics_task = None
+        self._stream_task = None
+        self._shutdown = None
+        self.stopping = False
+        self.stopped = asyncio.Event()
+        self.dropped_signals = 0
 
     def _load_strategy(self):
         try:
@@ -16,32 +72,380 @@ class TradingEngine:
             return None
 
     async def _handle_websocket_message(self, message):
-        # For now, we'll just log the message.
-        # In the future, we'll parse the message and pass it to the strategy.
-        logging.info(f"Received message: {message}")
-        if self.strategy:
-            # The PRD specifies a check_strategy function that takes a dataframe.
-            # We will need to adapt this to handle real-time data streams.
-            # For now, we'll just call a placeholder function.
-            trade_signal = self.strategy.check_strategy(message)
-            if trade_signal:
+        _TICKS.info("Received message: %s", message)
+        self.orders.apply(message)
+        self.risk.apply(message)
+        if self.account.apply(message):
+            return
+        await self._process_message(message)
+
+    async def _handle_market_event(self, event):
+        data = event.data.get("data", event.data) if isinstance(event.data, dict) else event.data
+        if not isinstance(data, dict):
+            return
+        message = dict(data)
+        message.setdefault("symbol", event.symbol)
+        if event.interval:
+            message.setdefault("interval", event.interval)
+        await self._process_message(message)
+
+    async def _consume_market_data(self, queue):
+        while True:
+            event = await queue.get()
+            _QUEUE.record(time.time_ns() - event.received_at)
+            try:
+                await self._handle_market_event(event)
+            except Exception:
+                logging.exception(f"Error handling {event.kind} update for {event.symbol}")
+
+    async def watch(self, pair, *events):
+        """Subscribes to market data for a pair at runtime and starts consuming its updates."""
+        await self.market_data.subscribe(pair, *(events or default_events(pair)))
+        self.consume(split_pair(pair)[0])
+
+    def consume(self, symbol):
+        """Starts handling the market-data queue of a symbol, if that is not running yet."""
+        if symbol not in self._market_data_consumers:
+            queue = self.market_data.queue(symbol)
+            self._market_data_consumers[symbol] = asyncio.create_task(self._consume_market_data(queue))
+
+    async def unwatch(self, pair, *events):
+        await self.market_data.unsubscribe(pair, *events)
+
+    async def warm_up_candles(self, pairs):
+        """Fills the candle buffers of 'BTCUSDT_5'-style pairs with history before streaming starts.
+
+        Only bars missing from the local kline cache are downloaded; the rest
+        comes straight from disk.
+        """
+        pairs = [split_pair(pair) for pair in pairs]
+        pairs = [(symbol, interval) for symbol, interval in pairs if interval]
+        if not pairs:
+            return 0
+        now = int(time.time() * 1000)
+        results = await asyncio.gather(*(
+            self.kline_downloader.download(symbol, interval, now - CANDLE_BUFFER_CAPACITY * interval_ms(interval))
+            for symbol, interval in pairs), return_exceptions=True)
+        for (symbol, interval), result in zip(pairs, results):
+            if isinstance(result, Exception):
+                logging.warning(f"Could not refresh {symbol} {interval} history: {result}")
+
+        loaded = 0
+        for symbol, interval in pairs:
+            loaded += await self._load_history(symbol, interval,
+                                               self.kline_cache.load(symbol, interval, limit=CANDLE_BUFFER_CAPACITY))
+        logging.info(f"Loaded {loaded} historical bar(s) for {len(pairs)} pair(s).")
+        return loaded
+
+    async def _load_history(self, symbol, interval, columns):
+        """Adds historical bars to a candle buffer and the streaming indicators.
+
+        Returns:
+            int: The number of bars given.
+        """
+        buffer = self.candles.get(symbol, interval)
+        rows = np.column_stack([columns[column] for column in COLUMNS]).tolist()
+        async with self._writing(symbol, interval):
+            if not len(buffer):
+                buffer.extend(columns)
+                rows = rows[-buffer.capacity:]
+                results = [True] * len(rows)
+            else:
+                results = [buffer.upsert(dict(zip(COLUMNS, row))) for row in rows]
+            # The indicators need these bars too, but their signals are stale, so they are ignored.
+            on_bar = getattr(self.strategy, "on_bar", None)
+            if self.strategy_pool or callable(on_bar):
+                bars = [(dict(zip(COLUMNS, row)), new_bar) for row, new_bar in zip(rows, results)
+                        if new_bar is not None]
+                if self.strategy_pool:
+                    await self.strategy_pool.update(bars, symbol, interval)
+                else:
+                    for bar, new_bar in bars:
+                        on_bar(bar, new_bar, symbol=symbol, interval=interval)
+        return len(rows)
+
+    def _writing(self, symbol, interval):
+        # Pooled strategies read a shared buffer from their own processes while
+        # they evaluate it, so it is written only under its lock, and the lock
+        # is held until the evaluation is done.
+        if self.strategy_pool:
+            return self.candles.lock(symbol, interval)
+        return contextlib.nullcontext()
+
+    async def backfill_candles(self, since_ms):
+        """Fetches the closed candles missed during a market-data outage that began at ``since_ms``."""
+        pairs = sorted({split_pair(pair) for event, pair in self.market_data.subscriptions if event == EVENT_CANDLES})
+        pairs = [(symbol, interval) for symbol, interval in pairs if interval and (symbol, interval) in self.candles]
+        for symbol, interval in pairs:
+            buffer = self.candles.get(symbol, interval)
+            start = buffer.last_open_time if buffer.last_open_time is not None else since_ms
+            try:
+                await self.kline_downloader.download(symbol, interval, start)
+            except Exception as e:
+                logging.warning(f"Could not backfill {symbol} {interval} candles: {e}")
+                continue
+            count = await self._load_history(symbol, interval,
+                                             self.kline_cache.load(symbol, interval, start_time=start))
+            logging.info(f"Backfilled {count} {symbol} {interval} bar(s) after a market-data outage.")
+
+    async def backfill_account(self, since_ms):
+        """Re-reads orders, fills and balances missed while the private stream was down."""
+        logging.info(f"Private stream back after an outage since {since_ms}, resyncing the account.")
+        await self.account.sync()
+
+    async def _account_resynced(self, requested):
+        """Brings orders and risk in line with an account snapshot requested at ``requested``."""
+        # The snapshot's open orders are the truth; tracked orders it lacks were filled or canceled meanwhile.
+        closed = await self.orders.reconcile(self.account.orders, requested)
+        if closed:
+            _TRADES.warning(f"{len(closed)} order(s) closed while the account was out of sync: "
+                            + ", ".join(f"{order.order_id} {order.state}" for order in closed))
+        self.risk.load(self.account)
+        self.risk.rebuild(self.orders.open_orders(), self.executor.queued())
+
+    async def _process_message(self, message):
+        if self.order_books.handle_message(message):
+            return
+        if not self.strategy and not self.strategy_pool:
+            return
+
+        candle = parse_candle(message)
+        if candle is None:
+            return
+        symbol, interval, bar = candle
+        self.risk.mark(symbol, bar["close"])
+        buffer = self.candles.get(symbol, interval)
+        if self.strategy_pool:
+            async with self._writing(symbol, interval):
+                new_bar = buffer.upsert(bar)
+                if new_bar is None:
+                    return
+                start = time.perf_counter_ns()
+                # Strategies run in worker processes; the loop stays free meanwhile.
+                trade_signals = await self.strategy_pool.evaluate(buffer, new_bar, symbol, interval)
+            _STRATEGY.record_since(start)
+            for trade_signal in trade_signals:
                 self.execute_trade(trade_signal)
+            return
+
+        new_bar = buffer.upsert(bar)
+        if new_bar is None:
+            # Late bar older than what we already hold.
+            return
+        start = time.perf_counter_ns()
+
+        trade_signal = self._evaluate_strategy(buffer, new_bar, symbol, interval)
+        _STRATEGY.record_since(start)
+        if trade_signal:
+            self.execute_trade(trade_signal)
+
+    def _evaluate_strategy(self, buffer, new_bar, symbol, interval):
+        # Streaming strategies get the latest bar and the stream it belongs to;
+        # others get a DataFrame view over the candle buffer, built only when
+        # it is actually needed.
+        on_bar = getattr(self.strategy, "on_bar", None)
+        if callable(on_bar):
+            return on_bar(buffer.last(), new_bar, symbol=symbol, interval=interval)
+        return self.strategy.check_strategy(buffer.to_frame(), symbol=symbol, interval=interval)
 
     def execute_trade(self, trade_signal):
-        logging.info(f"Executing trade: {trade_signal}")
-        # Implement the logic to create an order using the api_client
-        # For now, we'll just log the signal.
-        pass
+        # Orders are sent by the executor's workers; this only queues the
+        # signal, so market data keeps flowing while the order is in flight.
+        if self.stopping:
+            self.dropped_signals += 1
+            _TRADES.info("Shutting down, dropping signal: %s", trade_signal)
+            return None
+        _TRADES.info("Executing trade: %s", trade_signal)
+        metrics.count("signals")
+        start = time.perf_counter_ns()
+        rounded, rejected = self.instruments.normalize(trade_signal)
+        if rejected:
+            _RISK.record_since(start)
+            metrics.count("instrument_rejected")
+            _TRADES.warning(f"Instrument rules rejected {trade_signal}: {rejected}")
+            return None
+        trade_signal = rounded
+        rejected = self.risk.check(trade_signal)
+        _RISK.record_since(start)
+        if rejected:
+            metrics.count("risk_rejected")
+            _TRADES.warning(f"Risk check rejected {trade_signal}: {rejected}")
+            return None
+        order = self.executor.submit(trade_signal)
+        if order is None:
+            self.risk.release(trade_signal)
+        return order
+
+    def inbound_stats(self):
+        """Dropped/coalesced counters and lag of the private stream and market-data queues."""
+        return {"private_stream": self.api_client.inbound.stats(), "market_data": self.market_data.stats()}
+
+    async def get_balance(self):
+        """Balances from the account mirror, or from (cached) REST until the mirror is synced."""
+        if self.account.synced:
+            return self.account.balance()
+        return await self.api_client.get_balance_async()
+
+    async def get_positions(self):
+        if self.account.synced:
+            return {symbol: self.account.position(symbol) for symbol in self.account.positions}
+        return await self.api_client.get_positions_async()
+
+    def read_cache_stats(self):
+        """Hits, misses and shared in-flight requests of the balance/positions cache."""
+        return self.api_client.read_cache.stats()
+
+    def risk_stats(self):
+        """Accepted and rejected signals per limit, open orders, gross notional and leverage."""
+        return self.risk.stats()
+
+    def instrument_stats(self):
+        """Instruments loaded, when they were fetched, and signals rounded or rejected per rule."""
+        return self.instruments.stats()
+
+    def stream_stats(self):
+        """Reconnect count and outage-to-first-message times of both streams."""
+        return {"private_stream": self.api_client.private_stream_health.stats(),
+                "market_data": self.market_data.health.stats()}
+
+    def stats_report(self):
+        """Latency percentiles of every hot-path stage, and event counters, as a table."""
+        return metrics.format_text()
+
+    async def _metrics_loop(self):
+        # Dumps the stats every METRICS_INTERVAL and starts a new histogram window every METRICS_WINDOW.
+        while True:
+            await asyncio.sleep(METRICS_INTERVAL)
+            if time.monotonic() - metrics.rotated >= METRICS_WINDOW:
+                metrics.rotate()
+            if METRICS_FILE:
+                try:
+                    metrics.dump(METRICS_FILE)
+                except OSError as e:
+                    logging.warning(f"Could not write stats to {METRICS_FILE}: {e}")
+
+    def execution_stats(self):
+        """Signal-to-ack latency percentiles of the acknowledged orders."""
+        return self.executor.latency.summary()
 
     async def start(self):
-        if not self.strategy:
+        if (not self.strategy and not self.strategy_pool) or self.stopping:
             return
 
         logging.info("Starting trading engine...")
-        # Start the private stream
-        await self.api_client.start_private_stream(self._handle_websocket_message)
+        if self._metrics_task is None:
+            self._metrics_task = asyncio.create_task(self._metrics_loop())
+        # Open pooled REST connections now so the first order skips the handshake.
+        warm = await self.api_client.warm_up()
+        logging.info(f"Warmed up {warm} REST connection(s).")
+        await self.instruments.start()
+        await self.account.start()
+        await self.executor.start()
+        if self.strategy_pool:
+            await self.strategy_pool.start()
+        if MARKET_DATA_PAIRS:
+            await self.warm_up_candles(MARKET_DATA_PAIRS)
+            for pair in MARKET_DATA_PAIRS:
+                await self.watch(pair)
+            await self.market_data.connect()
+        # Start the private stream; it runs until stop() cancels it.
+        self._stream_task = asyncio.create_task(self.api_client.start_private_stream(
+            self._handle_websocket_message, on_reconnect=self.backfill_account))
+        try:
+            await self._stream_task
+        except asyncio.CancelledError:
+            if not self.stopping:
+                raise
+
+    async def replay(self, directory, speed=1.0, start_ns=None, end_ns=None, send_orders=False):
+        """Streams a recording (see RECORD_DIR) through the engine instead of the live exchange.
+
+        Returns:
+            Replayer: The frame count and, unless ``send_orders``, the signals the strategy produced.
+        """
+        # Replayed frames must not be recorded again.
+        self.api_client.recorder = self.market_data.recorder = None
+        if send_orders:
+            await self.executor.start()
+        if self.strategy_pool:
+            await self.strategy_pool.start()
+        replayer = Replayer(self, directory, speed, send_orders)
+        await replayer.run(start_ns, end_ns)
+        return replayer
+
+    async def stop(self, deadline=SHUTDOWN_DEADLINE):
+        """Shuts down within ``deadline`` seconds, cancelling every open order on the exchange.
 
-    def stop(self):
+        New signals are dropped from the start. Queued orders that were not
+        sent are discarded and in-flight ones get up to half the deadline to
+        finish, so their cancels cover them. Then open orders are cancelled
+        (see shutdown.cancel_open_orders), and the streams, connections and
+        logs are closed and flushed. Calling it again waits for the same shutdown.
+
+        Returns:
+            ShutdownReport: How long it took and any orders still open.
+        """
+        if self._shutdown is None:
+            self._shutdown = asyncio.ensure_future(self._shut_down(deadline))
+        return await asyncio.shield(self._shutdown)
+
+    async def _shut_down(self, deadline):
         logging.info("Stopping trading engine...")
-        # Implement graceful shutdown logic here
-        pass
+        report = ShutdownReport()
+        end = report.started + deadline
+        self.stopping = True
+        for task in self._market_data_consumers.values():
+            task.cancel()
+
+        report.dropped_orders = self.executor.discard()
+        try:
+            await asyncio.wait_for(self.executor.queue.join(), max(min(end - time.monotonic(), deadline / 2), 0))
+        except asyncio.TimeoutError:
+            report.abandoned_orders = self.executor.in_flight
+        await self.executor.stop(drain=False)
+        report.dropped_signals = self.dropped_signals
+
+        orders = {order["order_id"]: order for order in self.account.open_orders()}
+        orders.update({order.order_id: {"order_id": order.order_id, "symbol": order.symbol}
+                       for order in self.orders.open_orders() if order.order_id is not None})
+        symbols = {split_pair(pair)[0] for pair in MARKET_DATA_PAIRS}
+        for order in self.executor.completed:
+            symbols.add(str(order.signal.get("symbol", "")).upper())
+            orders.update(parse_open_orders(order.response) if order.response else {})
+        symbols.discard("")
+        try:
+            await asyncio.wait_for(cancel_open_orders(self.api_client, symbols, orders, report, end),
+                                   max(end - time.monotonic(), 0))
+        except asyncio.TimeoutError:
+            report.timed_out = True
+
+        await self._close()
+        report.finish()
+        if report.remaining or not report.confirmed:
+            logging.warning(report.summary())
+        else:
+            logging.info(report.summary())
+        await asyncio.to_thread(flush_logging)
+        self.stopped.set()
+        return report
+
+    async def _close(self):
+        tasks = [task for task in (self._stream_task, self._metrics_task) if task is not None]
+        tasks += self._market_data_consumers.values()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.account.stop()
+        await self.orders.stop()
+        await self.instruments.stop()
+        try:
+            await self.market_data.disconnect()
+        except Exception as e:
+            logging.warning(f"Could not disconnect market data: {e}")
+        if self.strategy_pool:
+            self.strategy_pool.close()
+        # After the workers are gone, so no process still maps the shared buffers.
+        self.candles.close()
+        if self.recorder is not None:
+            self.recorder.close()
+        await self.api_client.aclose()
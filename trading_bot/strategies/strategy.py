@@ -1,15 +1,19 @@
+import numpy as np
 import pandas as pd
+from trading_bot.core.indicators import SMA, IndicatorSet
 
-def check_strategy(dataframe):
+def check_strategy(dataframe, symbol=None, interval=None):
     """
     Analyzes market data and decides whether to enter a trade.
 
     Args:
         dataframe (pandas.DataFrame): A DataFrame containing the latest market data (e.g., OHLCV).
+        symbol (str): The symbol the candles belong to, e.g. 'BTCUSDT'.
+        interval (str): The candle interval, e.g. '5'.
 
     Returns:
-        dict or None: A dictionary defining the trade action or None to do nothing.
-        Example: {'action': 'BUY', 'symbol': 'BTC-USDT', 'quantity': 0.01}
+        dict or None: A dictionary defining the trade action for ``symbol`` or None to do nothing.
+        Example: {'action': 'BUY', 'symbol': 'BTCUSDT', 'quantity': 0.01}
     """
     # Example: Simple Moving Average Crossover Strategy
     df = dataframe.copy()
@@ -17,13 +21,60 @@ def check_strategy(dataframe):
     df['sma_long'] = df['close'].rolling(window=50).mean()
 
     last_row = df.iloc[-1]
+    return _crossover_signal(last_row['sma_short'], last_row['sma_long'], symbol)
 
+
+# The same strategy on streaming indicators. They keep running state, so each
+# update costs the same no matter how much history has been seen. Every
+# (symbol, interval) stream gets its own set, so symbols never mix.
+indicators = {}
+
+def on_bar(bar, new_bar=True, symbol=None, interval=None):
+    """
+    Incremental counterpart of check_strategy, called once per bar or tick.
+
+    Args:
+        bar (dict): The latest candle with 'open', 'high', 'low', 'close' and 'volume' keys.
+        new_bar (bool): True when the bar is a new candle, False when it revises the forming one.
+        symbol (str): The symbol the bar belongs to, e.g. 'BTCUSDT'.
+        interval (str): The candle interval, e.g. '5'.
+
+    Returns:
+        dict or None: The same trade action check_strategy would return, for ``symbol``.
+    """
+    state = indicators.get((symbol, interval))
+    if state is None:
+        state = indicators[(symbol, interval)] = IndicatorSet(sma_short=SMA(10), sma_long=SMA(50))
+    state.update(bar, new_bar)
+    return _crossover_signal(state['sma_short'], state['sma_long'], symbol)
+
+
+def generate_signals(data):
+    """
+    Vectorized counterpart of check_strategy, used by the backtester.
+
+    Args:
+        data (dict): Column arrays ('open_time', 'open', 'high', 'low', 'close', 'volume') for every bar.
+
+    Returns:
+        numpy.ndarray: The target position after each bar (NaN keeps the current one).
+    """
+    close = pd.Series(data['close'])
+    sma_short = close.rolling(window=10).mean().to_numpy()
+    sma_long = close.rolling(window=50).mean().to_numpy()
+    targets = np.full(len(close), np.nan)
+    targets[sma_short > sma_long] = 0.01
+    targets[sma_short < sma_long] = -0.01
+    return targets
+
+
+def _crossover_signal(sma_short, sma_long, symbol):
     # Buy signal
-    if last_row['sma_short'] > last_row['sma_long']:
-        return {'action': 'BUY', 'symbol': 'BTC-USDT', 'quantity': 0.01}
+    if sma_short > sma_long:
+        return {'action': 'BUY', 'symbol': symbol, 'quantity': 0.01}
 
     # Sell signal
-    elif last_row['sma_short'] < last_row['sma_long']:
-        return {'action': 'SELL', 'symbol': 'BTC-USDT', 'quantity': 0.01}
+    elif sma_short < sma_long:
+        return {'action': 'SELL', 'symbol': symbol, 'quantity': 0.01}
 
     return None
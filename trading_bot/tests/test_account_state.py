@@ -0,0 +1,113 @@
+import asyncio
+import pytest
+from trading_bot.core.account_state import AccountState
+
+PORTFOLIO = {"data": [
+    {"currency": "USDT", "main_balance": "1000", "available_balance": "800"},
+    {"symbol": "BTCUSDT", "position_size": "0.5", "avg_entry_price": "30000", "leverage": "5"},
+]}
+OPEN_ORDERS = {"data": {"orders": [
+    {"order_id": "1", "symbol": "BTCUSDT", "side": "BUY", "price": "29000", "quantity": "0.1", "status": "OPEN"},
+]}}
+
+class FakeAccountClient:
+    def __init__(self, portfolio=PORTFOLIO, orders=OPEN_ORDERS, delay=0):
+        self.portfolio = portfolio
+        self.orders = orders
+        self.delay = delay
+        self.calls = 0
+
+    async def get_balance_async(self, fresh=False):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.portfolio
+
+    async def get_open_orders_async(self, params=None):
+        return self.orders
+
+def _account_update(balance, quantity):
+    return {"e": "ACCOUNT_UPDATE", "a": {"B": [{"a": "USDT", "wb": balance, "cw": balance}],
+                                          "P": [{"s": "BTCUSDT", "pa": quantity, "ep": "30000", "up": "0"}]}}
+
+async def test_snapshot_seeds_the_mirror():
+    account = AccountState(FakeAccountClient())
+    assert await account.sync()
+    assert account.balance("usdt") == {"wallet": 1000, "available": 800}
+    assert account.position("BTCUSDT")["quantity"] == 0.5
+    assert account.position("BTCUSDT")["leverage"] == 5
+    assert [order["order_id"] for order in account.open_orders("BTCUSDT")] == ["1"]
+
+async def test_stream_events_are_applied_without_rest_calls():
+    client = FakeAccountClient()
+    account = AccountState(client)
+    await account.sync()
+    calls = client.calls
+    assert account.apply(_account_update("990", "0.6"))
+    assert account.apply({"e": "ORDER_TRADE_UPDATE", "o": {"s": "BTCUSDT", "i": 2, "S": "SELL", "X": "NEW",
+                                                          "q": "0.1", "p": "31000"}})
+    assert account.apply({"e": "ORDER_TRADE_UPDATE", "o": {"s": "BTCUSDT", "i": 1, "X": "FILLED"}})
+    assert account.apply({"e": "ACCOUNT_CONFIG_UPDATE", "ac": {"s": "BTCUSDT", "l": 10}})
+    assert not account.apply({"e": "depthUpdate", "s": "BTCUSDT"})
+    assert account.balance("USDT")["wallet"] == 990
+    assert account.position("BTCUSDT")["quantity"] == 0.6
+    assert account.position("BTCUSDT")["leverage"] == 10
+    assert [order["order_id"] for order in account.open_orders()] == ["2"]
+    assert client.calls == calls
+
+async def test_closed_position_is_removed():
+    account = AccountState(FakeAccountClient())
+    await account.sync()
+    account.apply(_account_update("1000", "0"))
+    assert account.position("BTCUSDT") is None
+
+async def test_events_during_snapshot_are_replayed_on_top():
+    account = AccountState(FakeAccountClient(delay=0.01))
+    syncing = asyncio.create_task(account.sync())
+    await asyncio.sleep(0)
+    account.apply(_account_update("950", "0.7"))
+    await syncing
+    assert account.balance("USDT")["wallet"] == 950
+    assert account.position("BTCUSDT")["quantity"] == 0.7
+
+async def test_concurrent_syncs_share_one_snapshot_after_the_one_in_flight():
+    client = FakeAccountClient(delay=0.01)
+    running, overlaps = [], []
+
+    async def on_resync(requested):
+        overlaps.append(len(running))
+        running.append(requested)
+        await asyncio.sleep(0.01)
+        running.remove(requested)
+
+    account = AccountState(client, on_resync=on_resync)
+    first = asyncio.create_task(account.sync())
+    await asyncio.sleep(0)
+    # Two reconnects while the start-up sync is in flight.
+    results = await asyncio.gather(first, account.sync(), account.sync())
+    assert results == [True, True, True]
+    assert client.calls == 2 and overlaps == [0, 0]
+    assert await account.reconcile() == [] and client.calls == 3
+
+async def test_reconcile_detects_drift_and_resyncs():
+    client = FakeAccountClient()
+    resyncs = []
+
+    async def on_resync(requested):
+        resyncs.append(requested)
+
+    account = AccountState(client, on_resync=on_resync)
+    await account.sync()
+    assert await account.reconcile() == [] and len(resyncs) == 1
+    account.positions["BTCUSDT"]["quantity"] = 0.4
+    account.orders.pop("1")
+    differences = await account.reconcile()
+    assert len(differences) == 2
+    assert account.drifts == 1
+    assert account.position("BTCUSDT")["quantity"] == 0.5
+    assert "1" in account.orders
+    assert len(resyncs) == 2 and resyncs[0] <= resyncs[1]
+
+async def test_failed_snapshot_leaves_mirror_unsynced():
+    account = AccountState(FakeAccountClient(portfolio=None))
+    assert not await account.sync()
+    assert not account.synced
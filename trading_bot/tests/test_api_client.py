@@ -1,3 +1,6 @@
+import asyncio
+import json
+import httpx
 import pytest
 from unittest.mock import patch, MagicMock
 from trading_bot.core.api_client import CoinSwitchProApiClient
@@ -18,7 +21,7 @@ def test_generate_signature(client):
     assert isinstance(signature, str)
     assert len(signature) == 64
 
-@patch('requests.request')
+@patch('requests.Session.request')
 def test_get_listen_key(mock_request, client):
     mock_response = MagicMock()
     mock_response.status_code = 200
@@ -29,7 +32,7 @@ def test_get_listen_key(mock_request, client):
     assert listen_key == "test_listen_key"
     assert client.listen_key == "test_listen_key"
 
-@patch('requests.request')
+@patch('requests.Session.request')
 def test_get_balance(mock_request, client):
     mock_response = MagicMock()
     mock_response.status_code = 200
@@ -39,7 +42,7 @@ def test_get_balance(mock_request, client):
     balance = client.get_balance()
     assert balance == {"balance": 1000}
 
-@patch('requests.request')
+@patch('requests.Session.request')
 def test_create_order(mock_request, client):
     mock_response = MagicMock()
     mock_response.status_code = 200
@@ -48,3 +51,70 @@ def test_create_order(mock_request, client):
 
     order = client.create_order("BTC/INR", "buy", 1, 50000)
     assert order == {"status": "success"}
+
+@patch('requests.Session.request')
+def test_request_sends_signed_body_with_timeout(mock_request, client):
+    mock_request.return_value.json.return_value = {}
+    client.create_order("BTC/INR", "buy", 1, 50000, timeout=0.5)
+    kwargs = mock_request.call_args.kwargs
+    assert kwargs['timeout'] == 0.5
+    timestamp = kwargs['headers']['x-api-timestamp']
+    assert kwargs['headers']['x-api-signature'] == client._generate_signature(timestamp, kwargs['data'].decode())
+
+def _mock_async_client(client, handler):
+    client._async_client = httpx.AsyncClient(base_url=client.base_rest_url, transport=httpx.MockTransport(handler))
+
+@pytest.mark.asyncio
+async def test_create_order_async(client):
+    requests_seen = []
+
+    def handler(request):
+        requests_seen.append(request)
+        return httpx.Response(200, json={"status": "success"})
+
+    _mock_async_client(client, handler)
+    order = await client.create_order_async("BTC/INR", "buy", 1, 50000)
+    assert order == {"status": "success"}
+    request = requests_seen[0]
+    assert request.url.path == "/trade/api/v2/order"
+    assert json.loads(request.content)["symbol"] == "BTC/INR"
+    assert request.headers['x-api-signature'] == client._generate_signature(
+        request.headers['x-api-timestamp'], request.content.decode())
+
+@pytest.mark.asyncio
+async def test_async_request_error_returns_none(client):
+    _mock_async_client(client, lambda request: httpx.Response(500))
+    assert await client.get_balance_async() is None
+
+@pytest.mark.asyncio
+async def test_warm_up_opens_connections(client):
+    _mock_async_client(client, lambda request: httpx.Response(200, json={}))
+    assert await client.warm_up(connections=3) == 3
+    await client.aclose()
+    assert client._async_client is None
+
+@pytest.mark.asyncio
+async def test_rate_limited_request_is_retried_after_retry_after(client):
+    responses = [httpx.Response(429, headers={"Retry-After": "0"}), httpx.Response(200, json={"ok": True})]
+    _mock_async_client(client, lambda request: responses.pop(0))
+    assert await client.get_balance_async() == {"ok": True}
+    assert client.scheduler.rate_limited["account"] == 1
+    assert client.scheduler.granted["account"] == 2
+
+@pytest.mark.asyncio
+async def test_balance_and_positions_share_cached_reads(client):
+    seen = []
+
+    def handler(request):
+        seen.append(request.url.path)
+        return httpx.Response(200, json={"balance": 1})
+
+    _mock_async_client(client, handler)
+    balances = await asyncio.gather(client.get_balance_async(), client.get_positions_async())
+    assert balances == [{"balance": 1}, {"balance": 1}]
+    assert await client.get_balance_async() == {"balance": 1}
+    assert len(seen) == 1
+    await client.create_order_async("BTC/INR", "buy", 1, 50000)
+    await client.get_balance_async()
+    assert seen[-1] == "/trade/api/v2/user/portfolio"
+    assert len(seen) == 3
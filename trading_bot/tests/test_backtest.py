@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+from trading_bot.core.backtest import klines_to_arrays, run_backtest, simulate
+
+def _klines(n, seed=3):
+    rng = np.random.default_rng(seed)
+    close = 30000 + np.cumsum(rng.normal(0, 40, n))
+    return pd.DataFrame({
+        'open_time': np.arange(n) * 60_000, 'open': np.concatenate(([close[0]], close[:-1])),
+        'high': close + 15, 'low': close - 15, 'close': close, 'volume': rng.uniform(1, 5, n),
+    })
+
+def test_vectorized_and_incremental_paths_agree():
+    klines = _klines(2_000)
+    vectorized = run_backtest('trading_bot.strategies.strategy', klines)
+    incremental = run_backtest('trading_bot.strategies.strategy', klines, mode='incremental')
+    assert vectorized.mode == 'vectorized' and incremental.mode == 'incremental'
+    assert vectorized.trades > 2
+    assert vectorized.trades == incremental.trades
+    np.testing.assert_allclose(vectorized.positions, incremental.positions)
+    np.testing.assert_allclose(vectorized.equity, incremental.equity)
+
+def test_check_strategy_path_uses_bounded_lookback():
+    class DataFrameOnly:
+        seen = []
+
+        @classmethod
+        def check_strategy(cls, df, symbol=None, interval=None):
+            cls.seen.append(len(df))
+            return {'action': 'BUY', 'quantity': 1}
+
+    result = run_backtest(DataFrameOnly, _klines(30), initial_capital=100_000, lookback=8)
+    assert max(DataFrameOnly.seen) == 8
+    assert result.positions.tolist() == [0] + [1] * 29
+
+def test_fills_fees_and_pnl():
+    data = {'open': np.array([100., 100., 110., 120.]), 'close': np.array([100., 110., 120., 120.])}
+    equity, positions, trades, fees, liquidated_at = simulate(
+        data, [1, np.nan, 0, np.nan], fee_rate=0.001, leverage=10, initial_capital=1000)
+    assert positions.tolist() == [0, 1, 1, 0]
+    assert trades == 2
+    assert fees == pytest.approx(0.22)
+    np.testing.assert_allclose(equity, [1000, 1009.9, 1019.9, 1019.78])
+    assert liquidated_at is None
+
+def test_position_is_capped_by_leverage():
+    data = {'open': np.full(3, 100.), 'close': np.full(3, 100.)}
+    _, positions, _, _, _ = simulate(data, [100, 100, 100], fee_rate=0, leverage=2, initial_capital=1000)
+    assert positions.tolist() == [0, 20, 20]
+
+def test_liquidation_flattens_the_account():
+    data = {'open': np.array([100., 100., 95., 90.]), 'close': np.array([100., 95., 90., 90.])}
+    equity, positions, _, _, liquidated_at = simulate(
+        data, [10, np.nan, np.nan, np.nan], fee_rate=0, leverage=20, initial_capital=100)
+    assert liquidated_at == 2
+    assert positions[-1] == 0
+    assert equity[-1] == 0
+
+def test_klines_to_arrays_accepts_kline_dicts():
+    rows = [{'t': 2, 'o': '2', 'h': '3', 'l': '1', 'c': '2.5', 'v': '7'},
+            {'t': 1, 'o': '1', 'h': '2', 'l': '0.5', 'c': '1.5', 'v': '4'}]
+    data = klines_to_arrays(rows)
+    assert data['open_time'].tolist() == [1, 2]
+    assert data['close'].tolist() == [1.5, 2.5]
+    assert data['close'].dtype == np.float64
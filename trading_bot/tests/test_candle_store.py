@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from trading_bot.core.candle_store import CandleBuffer, CandleStore, parse_candle
+
+def _fill(buffer, n):
+    for i in range(n):
+        buffer.append(i * 60_000, i, i + 1, i - 1, i + 0.5, 10)
+
+def test_view_is_ordered_after_wraparound():
+    buffer = CandleBuffer(capacity=4)
+    _fill(buffer, 7)
+    assert len(buffer) == 4
+    assert buffer.column('open').tolist() == [3, 4, 5, 6]
+    assert buffer.column('close', 2).tolist() == [5.5, 6.5]
+
+def test_views_share_memory_and_do_not_reallocate():
+    buffer = CandleBuffer(capacity=8)
+    storage = buffer._data
+    _fill(buffer, 100)
+    assert buffer._data is storage
+    assert np.shares_memory(buffer.view(), storage)
+    assert np.shares_memory(buffer.to_frame().to_numpy(), storage)
+
+def test_upsert_updates_forming_bar():
+    buffer = CandleBuffer(capacity=4)
+    bar = {'open_time': 1, 'open': 1, 'high': 2, 'low': 0.5, 'close': 1.5, 'volume': 1}
+    assert buffer.upsert(bar) is True
+    assert buffer.upsert({**bar, 'close': 1.8, 'high': 2.5}) is False
+    assert buffer.upsert({**bar, 'open_time': 0}) is None
+    assert len(buffer) == 1
+    assert buffer.last() == {**bar, 'close': 1.8, 'high': 2.5}
+
+def test_to_frame_columns():
+    buffer = CandleBuffer(capacity=3)
+    _fill(buffer, 5)
+    df = buffer.to_frame()
+    assert list(df.columns) == ['open_time', 'open', 'high', 'low', 'close', 'volume']
+    assert df['open'].tolist() == [2, 3, 4]
+
+def test_store_keeps_one_buffer_per_symbol_interval():
+    store = CandleStore(capacity=10)
+    assert store.get('BTCUSDT', 5) is store.get('BTCUSDT', '5')
+    assert store.get('BTCUSDT', 5) is not store.get('ETHUSDT', 5)
+    assert ('BTCUSDT', 5) in store
+
+@pytest.mark.parametrize("message, expected", [
+    ({"symbol": "BTCUSDT", "interval": "5", "start_time": 1, "open": "1", "high": "2", "low": "0",
+      "close": "1", "volume": "3"}, ("BTCUSDT", "5")),
+    ({"data": {"s": "ethusdt_15", "t": 1, "o": 1, "h": 2, "l": 0, "c": 1, "v": 3}}, ("ETHUSDT", "15")),
+])
+def test_parse_candle(message, expected):
+    symbol, interval, bar = parse_candle(message)
+    assert (symbol, interval) == expected
+    assert bar['open_time'] == 1.0 and bar['high'] == 2.0
+
+def test_parse_candle_rejects_other_messages():
+    assert parse_candle({"data": "test_message"}) is None
+    assert parse_candle({"symbol": "BTCUSDT", "price": 1}) is None
@@ -0,0 +1,71 @@
+import asyncio
+import time
+import pytest
+from trading_bot.core.execution import LatencyStats, OrderExecutor, order_arguments
+
+class FakeApiClient:
+    def __init__(self, delay=0.01, response=None):
+        self.delay = delay
+        self.response = response if response is not None else {"status": "success"}
+        self.calls = []
+
+    async def create_order_async(self, trace=None, **kwargs):
+        trace.signed = time.perf_counter_ns()
+        trace.sent = time.perf_counter_ns()
+        self.calls.append(kwargs)
+        await asyncio.sleep(self.delay)
+        return self.response
+
+SIGNAL = {'action': 'BUY', 'symbol': 'BTC-USDT', 'quantity': 0.01}
+
+def test_order_arguments():
+    assert order_arguments(SIGNAL) == {'symbol': 'BTC-USDT', 'side': 'BUY', 'quantity': 0.01,
+                                       'price': None, 'order_type': 'MARKET'}
+    assert order_arguments({**SIGNAL, 'price': 100})['order_type'] == 'LIMIT'
+
+@pytest.mark.asyncio
+async def test_submit_does_not_wait_for_the_order():
+    client = FakeApiClient(delay=0.2)
+    executor = OrderExecutor(client)
+    await executor.start()
+    started = time.perf_counter()
+    order = executor.submit(SIGNAL)
+    assert time.perf_counter() - started < 0.01
+    assert order.response is None
+    await executor.stop()
+    assert order.response == {"status": "success"}
+    timing = order.timing
+    assert timing.signal <= timing.enqueued <= timing.signed <= timing.sent <= timing.acked
+    assert order.timing.stages_ms()['round_trip'] >= 200
+
+@pytest.mark.asyncio
+async def test_latency_percentiles_only_count_acked_orders():
+    executor = OrderExecutor(FakeApiClient(delay=0), workers=2)
+    await executor.start()
+    for _ in range(5):
+        executor.submit(SIGNAL)
+    await executor.stop()
+    assert executor.latency.summary()['count'] == 5
+
+    failing_client = FakeApiClient(delay=0)
+    failing_client.response = None
+    failing = OrderExecutor(failing_client)
+    await failing.start()
+    order = failing.submit(SIGNAL)
+    await failing.stop()
+    assert order.error == "no response"
+    assert len(failing.latency) == 0
+
+def test_submit_rejects_when_queue_is_full():
+    executor = OrderExecutor(FakeApiClient(), max_queue=1)
+    assert executor.submit(SIGNAL) is not None
+    assert executor.submit(SIGNAL) is None
+
+def test_latency_stats_summary():
+    stats = LatencyStats()
+    assert stats.summary()['p50_ms'] is None
+    for value in range(1, 101):
+        stats.add(value)
+    summary = stats.summary()
+    assert summary['p50_ms'] == pytest.approx(50.5)
+    assert summary['p99_ms'] == pytest.approx(99.01)
@@ -0,0 +1,93 @@
+import asyncio
+import pytest
+from trading_bot.benchmarks.fake_exchange import FakeExchange, synthetic_price
+from trading_bot.core.api_client import CoinSwitchProApiClient
+from trading_bot.core.kline_cache import parse_klines
+from trading_bot.core.market_data import (EVENT_CANDLES, EVENT_ORDER_BOOK, EVENT_TICKER_INFO, EVENT_TRADES,
+                                          MarketDataService)
+from trading_bot.core.order_book import OrderBookManager
+
+
+@pytest.fixture
+async def exchange():
+    exchange = FakeExchange(speed=0, ticks_per_bar=5, fill_delay=0.01)
+    await exchange.start()
+    yield exchange
+    await exchange.stop()
+
+
+@pytest.fixture
+async def client(exchange):
+    client = CoinSwitchProApiClient()
+    client.api_key, client.api_secret = "test_key", "test_secret"
+    client.base_rest_url = exchange.rest_url
+    client.base_ws_url = exchange.ws_url
+    yield client
+    await client.aclose()
+
+
+async def test_klines_are_closed_aligned_bars(client):
+    response = await client.get_klines_async({"symbol": "BTCUSDT", "interval": "5", "limit": 3})
+    bars = parse_klines(response)
+    assert len(bars["open_time"]) == 3
+    assert all(open_time % 300_000 == 0 for open_time in bars["open_time"])
+    assert bars["open"][0] == pytest.approx(synthetic_price("BTCUSDT", bars["open_time"][0]))
+
+
+async def test_order_is_acked_then_filled_on_the_private_stream(exchange, client):
+    messages = []
+
+    async def handler(message):
+        messages.append(message)
+
+    stream = asyncio.create_task(client.start_private_stream(handler))
+    while client._live_connections == 0:
+        await asyncio.sleep(0.01)
+    ack = await client.create_order_async("BTCUSDT", "buy", 2, None, "MARKET")
+    assert ack["data"]["status"] == "OPEN"
+    while len(messages) < 3:
+        await asyncio.sleep(0.01)
+    stream.cancel()
+    assert [message["e"] for message in messages] == ["ORDER_TRADE_UPDATE", "ORDER_TRADE_UPDATE", "ACCOUNT_UPDATE"]
+    assert messages[1]["o"]["X"] == "FILLED"
+    portfolio = await client.get_balance_async(fresh=True)
+    assert {"symbol": "BTCUSDT", "position_size": 2.0, "side": "BUY"}.items() <= portfolio["data"][1].items()
+
+
+async def test_candle_feed_reaches_market_data_service(exchange):
+    service = MarketDataService(url=exchange.rest_url)
+    await service.subscribe("BTCUSDT_1", EVENT_CANDLES)
+    await service.connect()
+    try:
+        event = await asyncio.wait_for(service.queue("BTCUSDT").get(), 5)
+    finally:
+        await service.disconnect()
+    assert event.kind == "candles"
+    assert event.interval == "1"
+    assert event.data["data"]["sent_ns"] <= event.received_at
+
+
+async def test_depth_feed_keeps_an_order_book_in_sync(exchange, client):
+    exchange.book_interval = 0.01
+    service = MarketDataService(url=exchange.rest_url)
+    books = OrderBookManager(client)
+    await service.subscribe("BTCUSDT", EVENT_ORDER_BOOK, EVENT_TICKER_INFO, EVENT_TRADES)
+    await service.connect()
+    kinds, matched = set(), 0
+    try:
+        while len(kinds) < 3 or matched < 5:
+            event = await asyncio.wait_for(service.queue("BTCUSDT").get(), 5)
+            kinds.add(event.kind)
+            books.handle_message(event.data)
+            book, depth = books.get("BTCUSDT"), exchange.depth("BTCUSDT")
+            if book is not None and book.last_update_id == depth.update_id:
+                matched += 1
+                assert book.bids.levels() == sorted(depth.bids.items(), reverse=True)
+                assert book.asks.levels() == sorted(depth.asks.items())
+                if matched == 2:
+                    # A REST resync lands on the update id the stream carries on from.
+                    assert await books.seed("BTCUSDT")
+    finally:
+        await service.disconnect()
+    assert kinds == {"order_book", "ticker", "trades"}
+    assert books.get("BTCUSDT").synced and books.resyncs == 0
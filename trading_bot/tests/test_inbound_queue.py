@@ -0,0 +1,68 @@
+import asyncio
+import pytest
+from trading_bot.core.inbound_queue import ConflatingQueue, classify_message, merge_depth_diffs
+
+def _drain(queue):
+    items = []
+    while not queue.empty():
+        items.append(queue.get_nowait())
+    return items
+
+def test_latest_value_wins_per_key():
+    queue = ConflatingQueue()
+    queue.put_nowait({"c": 1}, key=("BTCUSDT", "ticker"))
+    queue.put_nowait({"fill": 1})
+    queue.put_nowait({"c": 2}, key=("BTCUSDT", "ticker"))
+    queue.put_nowait({"c": 9}, key=("ETHUSDT", "ticker"))
+    assert _drain(queue) == [{"c": 2}, {"fill": 1}, {"c": 9}]
+    assert queue.coalesced == 1
+
+def test_unkeyed_messages_are_never_dropped():
+    queue = ConflatingQueue(maxsize=2)
+    for i in range(4):
+        assert queue.put_nowait({"fill": i})
+    assert queue.overflowed == 2 and queue.dropped == 0
+    assert len(_drain(queue)) == 4
+
+@pytest.mark.parametrize("policy, expected", [
+    ("drop_oldest", [{"fill": 0}, {"c": 1}, {"c": 2}]),
+    ("drop_newest", [{"c": 0}, {"fill": 0}, {"c": 1}]),
+])
+def test_overflow_policies(policy, expected):
+    queue = ConflatingQueue(maxsize=3, policy=policy)
+    queue.put_nowait({"c": 0}, key="a")
+    queue.put_nowait({"fill": 0})
+    queue.put_nowait({"c": 1}, key="b")
+    queue.put_nowait({"c": 2}, key="c")
+    assert _drain(queue) == expected
+    assert queue.dropped == 1
+
+def test_invalid_policy():
+    with pytest.raises(ValueError):
+        ConflatingQueue(policy="lifo")
+
+@pytest.mark.asyncio
+async def test_get_waits_and_reports_lag():
+    queue = ConflatingQueue()
+    getter = asyncio.create_task(queue.get())
+    await asyncio.sleep(0)
+    queue.put_nowait("x")
+    assert await getter == "x"
+    assert queue.stats()["size"] == 0
+    assert queue.max_lag_ns >= 0
+
+def test_depth_diffs_are_merged_not_replaced():
+    older = {"s": "BTCUSDT", "U": 1, "u": 2, "b": [["100", "1"], ["99", "2"]], "a": []}
+    newer = {"s": "BTCUSDT", "U": 3, "u": 4, "b": [["100", "0"]], "a": [["101", "1"]]}
+    merged = merge_depth_diffs(older, newer)
+    assert (merged["U"], merged["u"]) == (1, 4)
+    assert sorted(merged["b"]) == [["100", "0"], ["99", "2"]]
+    assert merged["a"] == [["101", "1"]]
+
+def test_classify_message():
+    assert classify_message({"e": "ORDER_TRADE_UPDATE", "s": "BTCUSDT"}) == (None, None)
+    assert classify_message({"data": {"symbol": "BTCUSDT", "bids": [], "asks": []}})[0] == ("BTCUSDT", "order_book")
+    key, merge = classify_message({"s": "BTCUSDT", "u": 5, "b": [], "a": []})
+    assert merge is merge_depth_diffs
+    assert classify_message({"symbol": "BTCUSDT", "interval": "5", "start_time": 1, "close": 1})[0] == \
+        ("BTCUSDT", "candles", "5", 1)
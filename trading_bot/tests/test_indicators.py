@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+from trading_bot.core.indicators import ATR, EMA, RSI, SMA, IndicatorSet, RollingMax, RollingMin, RollingVariance
+
+@pytest.fixture
+def bars():
+    rng = np.random.default_rng(42)
+    close = 30000 + np.cumsum(rng.normal(0, 25, 600))
+    high = close + rng.uniform(0, 30, close.size)
+    low = close - rng.uniform(0, 30, close.size)
+    return pd.DataFrame({"high": high, "low": low, "close": close})
+
+def _stream(indicator, values):
+    return np.array([indicator.update(v) for v in values])
+
+def _rsi(close, period):
+    delta = close.diff()
+    gain = delta.clip(lower=0).rolling(period).mean()
+    loss = (-delta.clip(upper=0)).rolling(period).mean()
+    return 100 - 100 / (1 + gain / loss)
+
+def _atr(df, period):
+    prev_close = df['close'].shift()
+    true_range = pd.concat([
+        df['high'] - df['low'],
+        (df['high'] - prev_close).abs(),
+        (df['low'] - prev_close).abs(),
+    ], axis=1).max(axis=1)
+    return true_range.rolling(period).mean()
+
+@pytest.mark.parametrize("indicator, expected", [
+    (lambda: SMA(10), lambda s: s.rolling(10).mean()),
+    (lambda: SMA(50), lambda s: s.rolling(50).mean()),
+    (lambda: EMA(20), lambda s: s.ewm(span=20, adjust=False).mean()),
+    (lambda: RollingMin(15), lambda s: s.rolling(15).min()),
+    (lambda: RollingMax(15), lambda s: s.rolling(15).max()),
+    (lambda: RollingVariance(30), lambda s: s.rolling(30).var()),
+    (lambda: RSI(14), lambda s: _rsi(s, 14)),
+])
+def test_matches_pandas(bars, indicator, expected):
+    result = _stream(indicator(), bars['close'])
+    np.testing.assert_allclose(result, expected(bars['close']).to_numpy(), rtol=1e-9, equal_nan=True)
+
+def test_atr_matches_pandas(bars):
+    atr = ATR(14)
+    result = np.array([atr.update(h, l, c) for h, l, c in bars[['high', 'low', 'close']].to_numpy()])
+    np.testing.assert_allclose(result, _atr(bars, 14).to_numpy(), rtol=1e-9, equal_nan=True)
+
+@pytest.mark.parametrize("indicator, expected", [
+    (lambda: SMA(10), lambda s: s.rolling(10).mean()),
+    (lambda: EMA(10), lambda s: s.ewm(span=10, adjust=False).mean()),
+    (lambda: RollingMin(10), lambda s: s.rolling(10).min()),
+    (lambda: RollingMax(10), lambda s: s.rolling(10).max()),
+    (lambda: RollingVariance(10), lambda s: s.rolling(10).var()),
+    (lambda: RSI(10), lambda s: _rsi(s, 10)),
+])
+def test_amend_revises_forming_bar(bars, indicator, expected):
+    ind = indicator()
+    closes = bars['close'].to_numpy()[:120]
+    for i, close in enumerate(closes):
+        # Two intermediate ticks before the bar settles on its close.
+        ind.update(close + 40)
+        ind.amend(close - 40)
+        value = ind.amend(close)
+        np.testing.assert_allclose(value, expected(pd.Series(closes[:i + 1])).iloc[-1], rtol=1e-9, equal_nan=True)
+
+def test_indicator_set_reads_current_values(bars):
+    indicators = IndicatorSet(sma=SMA(3), atr=ATR(3))
+    for row in bars.head(5).to_dict('records'):
+        indicators.update(row)
+    assert indicators['sma'] == pytest.approx(bars['close'].head(5).tail(3).mean())
+    assert set(indicators.values) == {'sma', 'atr'}
+
+def test_streaming_strategy_matches_dataframe_strategy(bars, monkeypatch):
+    from trading_bot.strategies import strategy
+    monkeypatch.setattr(strategy, 'indicators', {})
+    other = bars.head(80).iloc[::-1].to_dict('records')
+    for i, row in enumerate(bars.head(80).to_dict('records')):
+        # Bars of another symbol in between must not move this symbol's indicators.
+        strategy.on_bar(other[i], symbol='ETHUSDT', interval='5')
+        expected = strategy.check_strategy(bars.head(i + 1), symbol='BTCUSDT', interval='5')
+        assert strategy.on_bar(row, symbol='BTCUSDT', interval='5') == expected
+        assert expected is None or expected['symbol'] == 'BTCUSDT'
+    assert set(strategy.indicators) == {('ETHUSDT', '5'), ('BTCUSDT', '5')}
+
+def test_invalid_period():
+    with pytest.raises(ValueError):
+        SMA(0)
@@ -0,0 +1,98 @@
+import pytest
+from trading_bot.benchmarks.fake_exchange import FakeExchange
+from trading_bot.core.api_client import CoinSwitchProApiClient
+from trading_bot.core.instruments import InstrumentRegistry, parse_instrument
+from trading_bot.core.trading_engine import TradingEngine
+
+
+class FakeApiClient:
+    def __init__(self, response):
+        self.response = response
+        self.calls = 0
+
+    async def futures_instrument_info_async(self, symbol=None, exchange="EXCHANGE_2"):
+        self.calls += 1
+        return self.response
+
+
+RESPONSE = {"data": {"BTCUSDT": {"price_precision": 1, "quantity_precision": 3, "min_quantity": 0.002,
+                                 "min_notional": 100, "max_leverage": 125},
+                     "DOGEUSDT": {"symbol": "DOGEUSDT", "tick_size": "0.00005", "lot_size": "10",
+                                  "quantity_precision": 0},
+                     "BROKEN": {"base_asset": "BRO"}}}
+
+
+def test_rounding_is_exact_and_never_more_aggressive():
+    btc = parse_instrument("BTCUSDT", RESPONSE["data"]["BTCUSDT"])
+    assert (btc.price_scale, btc.tick, btc.quantity_scale, btc.lot, btc.min_quantity) == (10, 1, 1000, 1, 2)
+    assert btc.round_price(65000.17, "BUY") == 65000.1
+    assert btc.round_price(65000.11, "SELL") == 65000.2
+    assert btc.round_price(0.1 + 0.2) == 0.3
+    assert btc.round_quantity(0.0029999) == 0.002
+    assert btc.round_quantity(0.29) == 0.29
+    assert btc.check(btc.quantity_units(0.0019)).startswith("min_quantity")
+    assert btc.check(btc.quantity_units(0.002), btc.price_units(40_000)).startswith("min_notional")
+    assert btc.check(btc.quantity_units(0.003), btc.price_units(40_000)) is None
+
+    doge = parse_instrument("DOGEUSDT", RESPONSE["data"]["DOGEUSDT"])
+    assert (doge.price_scale, doge.tick, doge.lot) == (100_000, 5, 10)
+    assert doge.round_price(0.123456, "BUY") == 0.12345
+    assert doge.round_price(0.123456, "SELL") == 0.1235
+    assert doge.round_quantity(1234.5) == 1230
+    assert parse_instrument("BROKEN", RESPONSE["data"]["BROKEN"]) is None
+
+
+def test_normalize_rounds_rejects_and_passes_unknown_symbols():
+    registry = InstrumentRegistry(FakeApiClient(RESPONSE), path="")
+    assert registry.update(RESPONSE) == 2
+    signal = {"action": "BUY", "symbol": "btcusdt", "quantity": 0.0071, "price": 65000.19}
+    rounded, reason = registry.normalize(signal)
+    assert reason is None and rounded == {**signal, "quantity": 0.007, "price": 65000.1}
+    unchanged = {"action": "SELL", "symbol": "BTCUSDT", "quantity": 0.01, "price": 65000.5}
+    assert registry.normalize(unchanged)[0] is unchanged
+    assert registry.normalize({"action": "BUY", "symbol": "BTCUSDT", "quantity": 0.001})[1].startswith("min_quantity")
+    other = {"action": "BUY", "symbol": "SOLUSDT", "quantity": 0.123456}
+    assert registry.normalize(other) == (other, None)
+    assert registry.stats()["rejected"] == {"min_quantity": 1}
+    assert registry.rounded == 1 and registry.missing == 1
+
+
+@pytest.mark.asyncio
+async def test_metadata_is_saved_and_a_restart_needs_no_fetch(tmp_path):
+    path = tmp_path / "instruments.json"
+    first = InstrumentRegistry(FakeApiClient(RESPONSE), path=path, refresh_interval=0)
+    await first.start()
+    assert first.api_client.calls == 1 and path.exists()
+
+    restarted = InstrumentRegistry(FakeApiClient(None), path=path, refresh_interval=3600)
+    await restarted.start()
+    await restarted.stop()
+    assert restarted.api_client.calls == 0
+    assert restarted.get("DOGEUSDT") == first.get("DOGEUSDT") and restarted.fetched == first.fetched
+
+
+@pytest.mark.asyncio
+async def test_engine_rounds_orders_so_the_exchange_accepts_them(tmp_path):
+    exchange = FakeExchange(fill_delay=60)
+    await exchange.start()
+    client = CoinSwitchProApiClient()
+    client.api_key, client.api_secret = "test_key", "test_secret"
+    client.base_rest_url = exchange.rest_url
+    engine = TradingEngine()
+    engine.api_client.api_key, engine.api_client.api_secret = "test_key", "test_secret"
+    engine.api_client.base_rest_url = exchange.rest_url
+    try:
+        assert await client.create_order_async("BTCUSDT", "BUY", 0.0015, 100.001) is None
+        engine.instruments = InstrumentRegistry(client, path=tmp_path / "instruments.json", refresh_interval=0)
+        await engine.instruments.start()
+        assert "ETHUSDT" in engine.instruments
+        await engine.executor.start()
+        order = engine.execute_trade({"action": "BUY", "symbol": "BTCUSDT", "quantity": 0.0015, "price": 1000.009})
+        await engine.executor.stop()
+    finally:
+        await client.aclose()
+        await engine.api_client.aclose()
+        await exchange.stop()
+    assert order.response is not None
+    created = next(iter(exchange.orders.values()))
+    assert created["quantity"] == 0.001 and created["price"] == 1000.0
@@ -0,0 +1,112 @@
+import asyncio
+import time
+import numpy as np
+import pytest
+from trading_bot.core.candle_store import CandleBuffer
+from trading_bot.core.kline_cache import KlineCache, KlineDownloader, interval_ms, parse_klines
+
+STEP = 60_000
+
+class FakeKlinesClient:
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def get_klines_async(self, params):
+        self.requests.append(params)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        start = -(-params['start_time'] // STEP) * STEP
+        times = range(start, params['end_time'] + 1, STEP)
+        return {'data': [{'start_time': t, 'open': t / STEP, 'high': t / STEP + 1, 'low': t / STEP - 1,
+                          'close': t / STEP + 0.5, 'volume': 1, 'symbol': params['symbol']} for t in times]}
+
+def _bars(times):
+    times = np.asarray(times, dtype=np.float64)
+    return {'open_time': times, 'open': times / STEP, 'high': times / STEP + 1, 'low': times / STEP - 1,
+            'close': times / STEP + 0.5, 'volume': np.ones(len(times))}
+
+def test_interval_ms():
+    assert interval_ms('15') == 15 * STEP
+    assert interval_ms('1h') == 60 * STEP
+    assert interval_ms('1D') == 1440 * STEP
+    with pytest.raises(ValueError):
+        interval_ms('fortnight')
+
+def test_parse_klines_accepts_dict_and_list_rows():
+    data = parse_klines({'data': [{'start_time': 1, 'o': '2', 'h': '3', 'l': '1', 'c': '2.5', 'v': '9'}]})
+    assert data['close'].tolist() == [2.5]
+    assert parse_klines([[1, 2, 3, 1, 2.5, 9]])['volume'].tolist() == [9]
+
+def test_cache_appends_merges_and_memory_maps(tmp_path):
+    cache = KlineCache(tmp_path)
+    assert cache.write('btcusdt', '1', _bars([2, 3, 4])) == 3
+    assert cache.write('BTCUSDT', '1', _bars([4, 5])) == 1
+    assert cache.write('BTCUSDT', '1', _bars([1, 3])) == 1
+    data = cache.load('BTCUSDT', '1')
+    assert isinstance(data['close'].base, np.memmap)
+    assert data['open_time'].tolist() == [1, 2, 3, 4, 5]
+    assert cache.load('BTCUSDT', '1', start_time=2, end_time=4, limit=2)['open_time'].tolist() == [3, 4]
+
+def test_cache_ignores_half_written_bar(tmp_path):
+    cache = KlineCache(tmp_path)
+    cache.write('BTCUSDT', '1', _bars([1, 2]))
+    with open(tmp_path / 'BTCUSDT' / '1' / 'open_time.f64', 'ab') as file:
+        file.write(np.array([3.0]).tobytes())
+    assert cache.count('BTCUSDT', '1') == 2
+    assert cache.write('BTCUSDT', '1', _bars([3])) == 1
+    assert cache.load('BTCUSDT', '1')['open_time'].tolist() == [1, 2, 3]
+
+async def test_download_pages_concurrently_then_fetches_only_the_tail(tmp_path):
+    client = FakeKlinesClient()
+    downloader = KlineDownloader(client, KlineCache(tmp_path), page_limit=100, concurrency=4)
+    end = (int(time.time() * 1000) // STEP - 10) * STEP
+    start = end - 999 * STEP
+    assert await downloader.download('BTCUSDT', '1', start, end) == 1000
+    assert len(client.requests) == 10
+    assert 1 < client.max_in_flight <= 4
+    data = downloader.cache.load('BTCUSDT', '1')
+    assert np.all(np.diff(data['open_time']) == STEP)
+
+    client.requests.clear()
+    assert await downloader.download('BTCUSDT', '1', start) == 9
+    assert len(client.requests) == 1
+    assert client.requests[0]['start_time'] == end + STEP
+    assert downloader.cache.last_open_time('BTCUSDT', '1') < (int(time.time() * 1000) // STEP) * STEP
+
+async def test_download_past_the_cache_fills_the_gap_to_keep_it_contiguous(tmp_path):
+    client = FakeKlinesClient()
+    downloader = KlineDownloader(client, KlineCache(tmp_path))
+    end = (int(time.time() * 1000) // STEP - 30) * STEP
+    await downloader.download('BTCUSDT', '1', end - 29 * STEP, end - 20 * STEP)
+    await downloader.download('BTCUSDT', '1', end - 5 * STEP, end)
+    await downloader.download('BTCUSDT', '1', end - 40 * STEP, end - 35 * STEP)
+    data = downloader.cache.load('BTCUSDT', '1')
+    assert data['open_time'][0] == end - 40 * STEP and data['open_time'][-1] == end
+    assert np.all(np.diff(data['open_time']) == STEP)
+    client.requests.clear()
+    assert await downloader.download('BTCUSDT', '1', end - 15 * STEP, end) == 0
+    assert client.requests == []
+
+async def test_download_is_skipped_when_cache_is_current(tmp_path):
+    client = FakeKlinesClient()
+    downloader = KlineDownloader(client, KlineCache(tmp_path))
+    end = (int(time.time() * 1000) // STEP - 5) * STEP
+    await downloader.download('BTCUSDT', '1', end - 10 * STEP, end)
+    client.requests.clear()
+    assert await downloader.download('BTCUSDT', '1', end - 5 * STEP, end) == 0
+    assert client.requests == []
+
+def test_buffer_extend_keeps_the_last_bars(tmp_path):
+    cache = KlineCache(tmp_path)
+    cache.write('BTCUSDT', '1', _bars(np.arange(10) * STEP))
+    buffer = CandleBuffer(capacity=4)
+    buffer.append(-STEP, 0, 0, 0, 0)
+    buffer.extend(cache.load('BTCUSDT', '1'))
+    assert buffer.total == 11
+    assert buffer.column('open').tolist() == [6, 7, 8, 9]
+    assert buffer.upsert({'open_time': 10 * STEP, 'open': 10, 'high': 11, 'low': 9, 'close': 10.5}) is True
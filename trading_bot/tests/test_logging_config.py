@@ -0,0 +1,72 @@
+import logging
+import threading
+from trading_bot.core.logging_config import SamplingFilter, parse_rules, setup_logging, stop_logging
+
+
+def _record(name, level=logging.INFO):
+    return logging.LogRecord(name, level, __file__, 1, "message %s", ({"price": 1},), None)
+
+
+def test_parse_rules():
+    assert parse_rules("trading_bot.ticks=0.1, trading_bot.book=5,") == {"trading_bot.ticks": 0.1,
+                                                                          "trading_bot.book": 5.0}
+    assert parse_rules("") == {}
+
+
+def test_sampling_keeps_every_nth_tick_but_never_trades_or_errors():
+    sampling = SamplingFilter(sample={"trading_bot": 0.25})
+    kept = [sampling.filter(_record("trading_bot.ticks")) for _ in range(100)]
+    assert sum(kept) == 25
+    assert sampling.dropped == {"trading_bot": 75}
+    assert all(sampling.filter(_record("trading_bot.trades")) for _ in range(10))
+    assert all(sampling.filter(_record("trading_bot.ticks", logging.ERROR)) for _ in range(10))
+    assert sampling.filter(_record("other"))
+
+
+def test_rate_limit_caps_records_per_second():
+    sampling = SamplingFilter(rate_limit={"trading_bot.ticks": 5})
+    assert sum(sampling.filter(_record("trading_bot.ticks.BTCUSDT")) for _ in range(100)) == 5
+    assert sampling.filter(_record("trading_bot"))
+
+
+def test_background_writer_rotates_the_file(tmp_path):
+    path = tmp_path / "bot.log"
+    listener = setup_logging(log_file=str(path), max_mb=0.001, backups=2, console=False,
+                             sample="", rate_limit="trading_bot.ticks=1")
+    writers = set()
+    handler = listener.handlers[0]
+    emit = handler.emit
+    handler.emit = lambda record: (writers.add(threading.current_thread()), emit(record))
+    try:
+        for i in range(100):
+            logging.getLogger("trading_bot.trades").info("Order %d acked", i)
+            logging.getLogger("trading_bot.ticks").info("tick %d", i)
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logging.getLogger("trading_bot").exception("failed")
+    finally:
+        stop_logging()
+
+    assert writers and threading.current_thread() not in writers
+    files = sorted(tmp_path.iterdir())
+    assert [file.name for file in files] == ["bot.log", "bot.log.1", "bot.log.2"]
+    text = path.read_text()
+    assert "Order 99 acked" in text and "ValueError: boom" in text
+    assert "tick 99" not in "".join(file.read_text() for file in files)
+
+
+def test_synchronous_mode_samples_each_record_once(tmp_path, capsys):
+    path = tmp_path / "bot.log"
+    assert setup_logging(log_file=str(path), asynchronous=False, sample="trading_bot.ticks=0.5", rate_limit="") is None
+    try:
+        for i in range(10):
+            logging.getLogger("trading_bot.ticks").info("tick %d", i)
+        sampling = logging.getLogger().handlers[-1].filters[0]
+    finally:
+        stop_logging()
+
+    written = path.read_text()
+    assert written.count("INFO - tick") == 5 and "tick 9" in written
+    assert capsys.readouterr().err.count("INFO - tick") == 5
+    assert sampling.dropped == {"trading_bot.ticks": 5}
@@ -0,0 +1,78 @@
+import pytest
+from trading_bot.core.market_data import (EVENT_CANDLES, EVENT_ORDER_BOOK, EVENT_TRADES, MarketDataService,
+                                          default_events, split_pair)
+
+class FakeSocketClient:
+    def __init__(self):
+        self.handlers = {}
+        self.emitted = []
+        self.connected = False
+
+    def on(self, event, handler=None, namespace=None):
+        self.handlers[event] = handler
+
+    async def connect(self, url, **kwargs):
+        self.connected = True
+        await self.handlers["connect"]()
+
+    async def disconnect(self):
+        self.connected = False
+
+    async def emit(self, event, data=None, namespace=None):
+        self.emitted.append((event, data))
+
+@pytest.fixture
+def service():
+    return MarketDataService(client=FakeSocketClient())
+
+def test_split_pair_and_default_events():
+    assert split_pair("btcusdt_5") == ("BTCUSDT", "5")
+    assert default_events("BTCUSDT_5") == (EVENT_CANDLES,)
+    assert EVENT_ORDER_BOOK in default_events("BTCUSDT")
+
+@pytest.mark.asyncio
+async def test_subscriptions_are_sent_on_connect_and_at_runtime(service):
+    await service.subscribe("btcusdt", EVENT_TRADES)
+    assert service.sio.emitted == []
+    await service.connect()
+    assert service.sio.emitted == [(EVENT_TRADES, {"event": "subscribe", "pair": "BTCUSDT"})]
+
+    await service.subscribe("ETHUSDT_5", EVENT_CANDLES)
+    await service.unsubscribe("BTCUSDT", EVENT_TRADES)
+    assert service.sio.emitted[1:] == [
+        (EVENT_CANDLES, {"event": "subscribe", "pair": "ETHUSDT_5"}),
+        (EVENT_TRADES, {"event": "unsubscribe", "pair": "BTCUSDT"}),
+    ]
+    assert service.subscriptions == {(EVENT_CANDLES, "ETHUSDT_5")}
+
+@pytest.mark.asyncio
+async def test_updates_are_routed_to_per_symbol_queues(service):
+    await service.subscribe("BTCUSDT", EVENT_TRADES, EVENT_ORDER_BOOK)
+    await service.subscribe("ETHUSDT_5", EVENT_CANDLES)
+    await service.sio.handlers[EVENT_TRADES]({"s": "BTCUSDT", "p": "100"})
+    await service.sio.handlers[EVENT_ORDER_BOOK]({"symbol": "ETHUSDT", "bids": [], "asks": []})
+    await service.sio.handlers[EVENT_CANDLES]({"symbol": "ETHUSDT", "o": 1})
+
+    btc = service.queue("BTCUSDT").get_nowait()
+    assert (btc.kind, btc.symbol, btc.data["p"]) == ("trades", "BTCUSDT", "100")
+    eth_book, eth_candle = service.queue("ETHUSDT").get_nowait(), service.queue("ETHUSDT").get_nowait()
+    assert eth_book.kind == "order_book"
+    assert (eth_candle.kind, eth_candle.interval) == ("candles", "5")
+
+def test_update_without_symbol_uses_the_only_subscription(service):
+    service.subscriptions.add((EVENT_TRADES, "BTCUSDT"))
+    assert service.dispatch("trades", [{"p": "1"}]).symbol == "BTCUSDT"
+    service.subscriptions.add((EVENT_TRADES, "ETHUSDT"))
+    assert service.dispatch("trades", [{"p": "1"}]) is None
+
+def test_full_queue_drops_market_state_but_never_trades():
+    service = MarketDataService(client=FakeSocketClient(), queue_size=1)
+    service.dispatch("ticker", {"s": "BTCUSDT", "c": "1"})
+    service.dispatch("ticker", {"s": "BTCUSDT", "c": "2"})
+    service.dispatch("order_book", {"s": "BTCUSDT", "bids": [], "asks": []})
+    service.dispatch("trades", {"s": "BTCUSDT"})
+    stats = service.stats()["BTCUSDT"]
+    assert (stats["coalesced"], stats["dropped"], stats["overflowed"]) == (1, 1, 1)
+    assert service.dropped == 1
+    kinds = [service.queue("BTCUSDT").get_nowait().kind for _ in range(2)]
+    assert kinds == ["order_book", "trades"]
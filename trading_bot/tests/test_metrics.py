@@ -0,0 +1,66 @@
+import asyncio
+import time
+import numpy as np
+import pytest
+from trading_bot.core.execution import OrderExecutor
+from trading_bot.core.metrics import Histogram, Metrics, bucket_index, bucket_value, metrics
+
+
+class FakeApiClient:
+    async def create_order_async(self, trace=None, **kwargs):
+        trace.granted = trace.signed = trace.sent = time.perf_counter_ns()
+        await asyncio.sleep(0.01)
+        return {"status": "success"}
+
+
+def test_bucket_value_is_within_three_percent():
+    for value in (0, 1, 63, 64, 65, 999, 123_456, 10**9, 2**62):
+        assert abs(bucket_value(bucket_index(value)) - value) <= max(value * 0.03, 0.5)
+    assert bucket_index(2**63 - 1) < len(Histogram().counts)
+
+
+def test_percentiles_match_the_samples():
+    samples = np.random.default_rng(1).integers(1_000, 5_000_000, 10_000)
+    histogram = Histogram()
+    for sample in samples.tolist():
+        histogram.record(sample)
+    for expected, actual in zip(np.percentile(samples, [50, 90, 99]), histogram.percentiles(50, 90, 99)):
+        assert actual == pytest.approx(expected, rel=0.03)
+    assert histogram.summary()["max_us"] == samples.max() / 1e3
+
+
+def test_rotation_keeps_one_previous_window():
+    histogram = Histogram()
+    histogram.record(1_000)
+    histogram.rotate()
+    histogram.record(2_000)
+    assert histogram.summary()["count"] == 2
+    histogram.rotate()
+    histogram.rotate()
+    assert histogram.summary() == {"count": 0, "lifetime": 2}
+
+
+def test_prometheus_dump(tmp_path):
+    registry = Metrics()
+    registry.histogram("sign").record(20_000)
+    registry.count("signals", 3)
+    path = tmp_path / "stats.prom"
+    registry.dump(path)
+    text = path.read_text()
+    assert 'trading_bot_stage_seconds{stage="sign",quantile="0.5"} 0.0000200' in text
+    assert 'trading_bot_stage_seconds_count{stage="sign"} 1' in text
+    assert 'trading_bot_events_total{name="signals"} 3' in text
+    assert "sign" in registry.format_text()
+
+
+@pytest.mark.asyncio
+async def test_executor_records_order_stages():
+    metrics.reset()
+    executor = OrderExecutor(FakeApiClient())
+    await executor.start()
+    executor.submit({'action': 'BUY', 'symbol': 'BTC-USDT', 'quantity': 0.01})
+    await executor.stop()
+    stages = metrics.snapshot()["stages"]
+    assert stages["ack"]["count"] == stages["signal_to_ack"]["count"] == 1
+    assert stages["ack"]["p50_us"] >= 9_000
+    assert metrics.counters["orders_acked"] == 1
@@ -0,0 +1,76 @@
+import asyncio
+import pytest
+from trading_bot.core.order_book import OrderBook, OrderBookManager
+
+@pytest.fixture
+def book():
+    book = OrderBook("BTCUSDT")
+    book.apply_snapshot(bids=[["100", "1"], ["99", "2"], ["98", "3"]],
+                        asks=[["101", "1.5"], ["102", "2"], ["103", "4"]], update_id=10)
+    return book
+
+def test_top_of_book(book):
+    assert book.best_bid() == 100
+    assert book.best_ask() == 101
+    assert book.spread() == 1
+    assert book.mid() == 100.5
+    assert book.bids.levels(2) == [(100, 1), (99, 2)]
+    assert book.asks.levels(2) == [(101, 1.5), (102, 2)]
+
+def test_depth_and_vwap(book):
+    assert book.depth_at("BUY", 99) == 2
+    assert book.depth_at("SELL", 99) == 0
+    assert book.cumulative_volume("SELL", 2) == 3.5
+    assert book.vwap_to_fill("BUY", 2.5) == pytest.approx((1.5 * 101 + 1 * 102) / 2.5)
+    assert book.vwap_to_fill("SELL", 1) == 100
+    assert book.vwap_to_fill("BUY", 100) is None
+    with pytest.raises(ValueError):
+        book.vwap_to_fill("SELL", 0)
+
+def test_diff_updates_levels(book):
+    assert book.apply_update([["100", "0"], ["99.5", "4"]], [["101", "3"]], first_id=11, last_id=12)
+    assert book.best_bid() == 99.5
+    assert book.depth_at("SELL", 101) == 3
+    assert book.last_update_id == 12
+
+def test_gap_and_stale_updates(book):
+    assert book.apply_update([["100", "9"]], [], first_id=5, last_id=9)
+    assert book.depth_at("BUY", 100) == 1
+    assert not book.apply_update([["100", "9"]], [], first_id=15, last_id=16)
+    assert not book.synced
+
+def test_crossed_book_needs_resync(book):
+    assert not book.apply_update([["101.5", "1"]], [], first_id=11, last_id=11)
+    assert not book.synced
+
+class FakeApiClient:
+    def __init__(self):
+        self.calls = 0
+
+    async def get_depth_async(self, params):
+        self.calls += 1
+        return {"data": {"symbol": params["symbol"], "lastUpdateId": 20,
+                         "bids": [["100", "1"]], "asks": [["101", "1"]]}}
+
+@pytest.mark.asyncio
+async def test_manager_resyncs_on_gap_and_replays_buffered_updates():
+    client = FakeApiClient()
+    manager = OrderBookManager(client)
+    # First diff arrives before any snapshot: it is buffered and a resync starts.
+    assert manager.handle_message({"s": "btcusdt", "U": 19, "u": 21, "b": [["100", "5"]], "a": []})
+    await asyncio.sleep(0)
+    await asyncio.gather(*manager._resync_tasks.values())
+    book = manager.get("BTCUSDT")
+    assert book.synced and book.last_update_id == 21
+    assert book.depth_at("BUY", 100) == 5
+
+    manager.handle_message({"s": "BTCUSDT", "U": 30, "u": 31, "b": [], "a": []})
+    assert not book.synced
+    await asyncio.gather(*manager._resync_tasks.values())
+    assert client.calls == 2 and manager.resyncs == 2
+
+def test_manager_handles_snapshot_messages_and_ignores_others():
+    manager = OrderBookManager()
+    assert manager.handle_message({"data": {"symbol": "ETHUSDT", "bids": [["10", "1"]], "asks": [["11", "1"]]}})
+    assert manager.get("ethusdt").spread() == 1
+    assert not manager.handle_message({"symbol": "ETHUSDT", "close": 10})
@@ -0,0 +1,181 @@
+import asyncio
+import time
+import pytest
+from trading_bot.benchmarks.fake_exchange import FakeExchange
+from trading_bot.core.api_client import CoinSwitchProApiClient
+from trading_bot.core.order_manager import (ACKED, CANCELED, FILLED, PARTIALLY_FILLED, PENDING, REJECTED, UNKNOWN,
+                                            ClientOrderIds, OrderManager)
+from trading_bot.core.trading_engine import TradingEngine
+
+
+class FakeApiClient:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.client_order_ids = []
+
+    async def create_order_async(self, symbol, side, quantity, price, order_type="LIMIT", timeout=None, trace=None,
+                                 client_order_id=None):
+        self.client_order_ids.append(client_order_id)
+        return self.responses.pop(0)
+
+    async def get_open_orders_async(self, params=None):
+        return {"data": {"orders": []}}
+
+    async def get_closed_orders_async(self, params=None):
+        return {"data": {"orders": []}}
+
+    async def get_order_async(self, order_id, timeout=None):
+        raise AssertionError("status of a tracked order must not need REST")
+
+
+def _event(order_id, client_order_id, status, filled=0):
+    return {"e": "ORDER_TRADE_UPDATE", "o": {"i": order_id, "c": client_order_id, "s": "BTCUSDT", "S": "BUY",
+                                             "q": 2, "z": filled, "X": status}}
+
+
+def test_client_order_ids_are_unique():
+    ids = ClientOrderIds("cb-")
+    generated = {ids.next() for _ in range(10_000)}
+    assert len(generated) == 10_000
+    assert ClientOrderIds("cb-").next() not in generated
+
+
+@pytest.mark.asyncio
+async def test_state_machine_follows_the_stream_and_ignores_stale_events():
+    manager = OrderManager(FakeApiClient([{"data": {"order_id": "7", "status": "OPEN"}}]))
+    await manager.create_order_async("btcusdt", "buy", 2, 100)
+    order = manager.get(order_id="7")
+    assert order.state == ACKED and order.symbol == "BTCUSDT"
+    assert manager.get(order.client_order_id) is order
+
+    assert manager.apply(_event("7", order.client_order_id, "PARTIALLY_FILLED", 1))
+    assert order.state == PARTIALLY_FILLED and order.filled == 1
+    manager.apply(_event("7", None, "FILLED", 2))
+    manager.apply(_event("7", order.client_order_id, "NEW"))
+    manager.apply(_event("7", order.client_order_id, "CANCELED", 2))
+    assert order.state == FILLED and order.filled == 2
+    assert manager.open_orders("BTCUSDT") == []
+    assert await manager.status("7") == FILLED
+    assert not manager.apply(_event("8", "someone-else", "NEW"))
+
+
+@pytest.mark.asyncio
+async def test_failed_request_is_retried_with_the_same_client_id():
+    client = FakeApiClient([None, {"data": {"order_id": "9", "status": "NEW"}}])
+    manager = OrderManager(client, retries=2, ack_grace=0.01)
+    await manager.create_order_async("ETHUSDT", "sell", 1, None, "MARKET")
+    assert len(client.client_order_ids) == 2 and len(set(client.client_order_ids)) == 1
+    assert manager.get(order_id="9").attempts == 2
+
+    rejected = OrderManager(FakeApiClient([None, None]), retries=1, ack_grace=0)
+    assert await rejected.create_order_async("ETHUSDT", "sell", 1, None) is None
+    assert rejected.stats()["states"] == {REJECTED: 1}
+
+
+@pytest.mark.asyncio
+async def test_order_rest_cannot_account_for_is_not_sent_again_or_closed():
+    class FlakyClient(FakeApiClient):
+        lookups = 0
+
+        async def get_closed_orders_async(self, params=None):
+            self.lookups += 1
+            if self.lookups == 1:
+                return None
+            return {"data": {"orders": [{"order_id": "5", "client_order_id": self.client_order_ids[0],
+                                         "status": "EXECUTED", "executed_qty": 1}]}}
+
+    client = FlakyClient([None, None])
+    manager = OrderManager(client, retries=1, ack_grace=0, lookup_retry=0.01)
+    assert await manager.create_order_async("ETHUSDT", "sell", 1, None, "MARKET") is None
+    order = next(iter(manager.orders.values()))
+    assert len(client.client_order_ids) == 1 and order.state == UNKNOWN
+    assert manager.open_orders() == [order]
+    for _ in range(100):
+        if order.done:
+            break
+        await asyncio.sleep(0.01)
+    await manager.stop()
+    assert order.state == FILLED and order.order_id == "5" and order.filled == 1
+
+
+@pytest.mark.asyncio
+async def test_reconcile_closes_orders_rest_no_longer_lists():
+    class LookupClient(FakeApiClient):
+        async def get_order_async(self, order_id, timeout=None):
+            return {"8": {"data": {"order_id": "8", "status": "FILLED", "executed_qty": 2}},
+                    "10": {"data": {"order_id": "10", "status": "OPEN"}}}.get(order_id)
+
+    manager = OrderManager(LookupClient([{"data": {"order_id": str(i), "status": "NEW"}} for i in range(7, 11)]))
+    for _ in range(4):
+        await manager.create_order_async("BTCUSDT", "buy", 2, 100)
+    listed = {"7": {"status": "PARTIALLY_FILLED", "filled": 1.0}}
+    closed = await manager.reconcile(listed, time.time())
+    assert [order.order_id for order in closed] == ["8"]
+    # The lookup of 9 failed: it may have filled, so it stays open until the exchange says.
+    assert [manager.get(order_id=i).state for i in "7 8 9 10".split()] == [PARTIALLY_FILLED, FILLED, UNKNOWN, ACKED]
+    assert manager.get(order_id="7").filled == 1 and manager.get(order_id="8").filled == 2
+    assert await manager.reconcile({}, manager.get(order_id="7").created) == []
+    await manager.stop()
+    manager.apply(_event("9", manager.get(order_id="9").client_order_id, "FILLED", 2))
+    assert manager.get(order_id="9").state == FILLED
+
+
+@pytest.mark.asyncio
+async def test_timed_out_order_that_reached_the_exchange_is_not_sent_again():
+    exchange = FakeExchange(latency=0.3, fill_delay=60)
+    await exchange.start()
+    client = CoinSwitchProApiClient()
+    client.api_key, client.api_secret = "test_key", "test_secret"
+    client.base_rest_url = exchange.rest_url
+    try:
+        manager = OrderManager(client, retries=2, ack_grace=0.05)
+        response = await manager.create_order_async("BTCUSDT", "buy", 1, 100, timeout=0.1)
+        # A process that did not place the order looks it up where it was placed.
+        untracked = await OrderManager(client).status(next(iter(exchange.orders)))
+    finally:
+        await client.aclose()
+        await exchange.stop()
+    assert len(exchange.orders) == 1 and untracked == ACKED
+    order = next(iter(manager.orders.values()))
+    assert response["data"]["state"] == order.state == ACKED
+    assert order.attempts == 1 and order.order_id == next(iter(exchange.orders))
+    assert PENDING not in manager.stats()["states"] and CANCELED not in manager.stats()["states"]
+
+
+@pytest.mark.asyncio
+async def test_timed_out_order_that_filled_at_once_is_not_sent_again():
+    exchange = FakeExchange(latency=0.3, fill_delay=0)
+    await exchange.start()
+    client = CoinSwitchProApiClient()
+    client.api_key, client.api_secret = "test_key", "test_secret"
+    client.base_rest_url = exchange.rest_url
+    try:
+        manager = OrderManager(client, retries=2, ack_grace=0.05)
+        response = await manager.create_order_async("BTCUSDT", "buy", 1, None, "MARKET", timeout=0.1)
+    finally:
+        await client.aclose()
+        await exchange.stop()
+    # Gone from the open orders by the time it is looked for, but listed among the closed ones.
+    assert len(exchange.orders) == 1
+    order = next(iter(manager.orders.values()))
+    assert response["data"]["state"] == order.state == FILLED and order.attempts == 1
+
+
+@pytest.mark.asyncio
+async def test_engine_closes_orders_cancelled_while_the_stream_was_down():
+    exchange = FakeExchange(fill_delay=60)
+    await exchange.start()
+    engine = TradingEngine()
+    engine.api_client.api_key, engine.api_client.api_secret = "test_key", "test_secret"
+    engine.api_client.base_rest_url = exchange.rest_url
+    try:
+        await engine.orders.create_order_async("BTCUSDT", "BUY", 1, 100)
+        await engine.orders.create_order_async("ETHUSDT", "BUY", 1, 100)
+        # Cancelled on the exchange with no stream event to tell the bot.
+        exchange.orders["1"]["status"] = "CANCELLED"
+        await engine.backfill_account(0)
+    finally:
+        await engine.api_client.aclose()
+        await exchange.stop()
+    assert engine.orders.get(order_id="1").state == CANCELED
+    assert [order.order_id for order in engine.orders.open_orders()] == ["2"]
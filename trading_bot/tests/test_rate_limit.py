@@ -0,0 +1,95 @@
+import asyncio
+import multiprocessing
+import time
+import pytest
+from trading_bot.core.rate_limit import (ACCOUNT, MARKET, ORDER, RequestScheduler, SharedBuckets, endpoint_class,
+                                         retry_after_seconds)
+
+def test_endpoint_classes():
+    assert endpoint_class("POST", "/trade/api/v2/order") == ORDER
+    assert endpoint_class("DELETE", "/trade/api/v2/futures/order") == ORDER
+    assert endpoint_class("POST", "/trade/api/v2/futures/cancel_all") == ORDER
+    assert endpoint_class("GET", "/trade/api/v2/futures/order?order_id=1") == ACCOUNT
+    assert endpoint_class("GET", "/trade/api/v2/user/portfolio") == ACCOUNT
+    assert endpoint_class("GET", "/trade/api/v2/futures/klines?symbol=BTCUSDT") == MARKET
+    assert endpoint_class("GET", "/trade/api/v2/futures/order_book") == MARKET
+
+def test_retry_after_parsing():
+    assert retry_after_seconds("2.5") == 2.5
+    assert retry_after_seconds(None, 1) == 1
+    assert retry_after_seconds("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    assert retry_after_seconds("soon", 3) == 3
+
+async def test_order_goes_ahead_of_queued_balance_calls():
+    scheduler = RequestScheduler({"global": 10, ORDER: 10, ACCOUNT: 10, MARKET: 10}, reserve=2)
+    granted = []
+
+    async def call(name, tag):
+        await scheduler.acquire(name)
+        granted.append(tag)
+
+    balance_calls = [asyncio.create_task(call(ACCOUNT, f"balance{i}")) for i in range(12)]
+    await asyncio.sleep(0)
+    # The account lane may only use the global budget down to the order reserve.
+    assert len(granted) == 8
+    started = time.monotonic()
+    await call(ORDER, "stop-loss")
+    assert time.monotonic() - started < 0.05
+    assert granted[8] == "stop-loss"
+    await asyncio.gather(*balance_calls)
+    assert granted[-1] == "balance11"
+
+async def test_queued_order_is_served_before_lower_lanes():
+    scheduler = RequestScheduler({"global": 20, ORDER: 20, ACCOUNT: 20, MARKET: 20}, reserve=0)
+    scheduler.global_bucket.tokens = 0
+    granted = []
+
+    async def call(name):
+        await scheduler.acquire(name)
+        granted.append(name)
+
+    tasks = [asyncio.create_task(call(MARKET)) for _ in range(3)]
+    await asyncio.sleep(0)
+    tasks.append(asyncio.create_task(call(ORDER)))
+    await asyncio.gather(*tasks)
+    assert granted[0] == ORDER
+
+async def test_rate_limited_class_is_paused():
+    scheduler = RequestScheduler({"global": 100, ORDER: 100, ACCOUNT: 100, MARKET: 100})
+    assert scheduler.rate_limited_by_server(MARKET, 0.05) == 0.05
+    started = time.monotonic()
+    await scheduler.acquire(ORDER)
+    assert time.monotonic() - started < 0.05
+    await scheduler.acquire(MARKET)
+    assert time.monotonic() - started >= 0.04
+    assert scheduler.rate_limited_by_server(ACCOUNT) == 1
+    assert scheduler.rate_limited_by_server(ACCOUNT) == 2
+    scheduler.succeeded(ACCOUNT)
+    assert scheduler._backoff[ACCOUNT] == 0
+
+def test_stats_report_budget_usage():
+    scheduler = RequestScheduler({"global": 10, ORDER: 5, ACCOUNT: 5, MARKET: 5})
+    scheduler.acquire_sync(ORDER)
+    stats = scheduler.stats()
+    assert stats[ORDER]["granted"] == 1
+    assert stats[ORDER]["used_pct"] == pytest.approx(20, abs=1)
+    assert stats["global"]["used_pct"] == pytest.approx(10, abs=1)
+    assert stats["queued"] == 0
+
+def _take_orders(budget, count):
+    scheduler = RequestScheduler({}, reserve=0, shared=budget)
+    for _ in range(count):
+        scheduler.acquire_sync(ORDER)
+
+def test_processes_share_one_budget():
+    context = multiprocessing.get_context("spawn")
+    budget = SharedBuckets({"global": 10, ORDER: 10, ACCOUNT: 10, MARKET: 10}, context)
+    process = context.Process(target=_take_orders, args=(budget, 6))
+    process.start()
+    process.join(30)
+    assert process.exitcode == 0
+
+    # The tokens the other process took are gone for this one too.
+    scheduler = RequestScheduler({}, reserve=0, shared=budget)
+    assert scheduler.global_bucket.tokens < 5 and scheduler.buckets[ORDER].tokens < 5
+    assert scheduler.buckets[MARKET].tokens == 10
@@ -0,0 +1,71 @@
+import asyncio
+import pytest
+from trading_bot.core.read_cache import ReadCache, is_account_event
+
+PORTFOLIO = "/trade/api/v2/user/portfolio"
+
+class FakeFetch:
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        call = self.calls
+        await asyncio.sleep(self.delay)
+        return {"call": call}
+
+async def test_concurrent_reads_share_one_request():
+    cache = ReadCache({PORTFOLIO: 5})
+    fetch = FakeFetch()
+    results = await asyncio.gather(*(cache.get(PORTFOLIO, None, fetch) for _ in range(10)))
+    assert fetch.calls == 1
+    assert all(result == {"call": 1} for result in results)
+    assert await cache.get(PORTFOLIO, None, fetch) == {"call": 1}
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["shared"] == 9
+    assert cache.stats()["hits"] == 1
+
+async def test_entries_expire_after_ttl():
+    cache = ReadCache({PORTFOLIO: 0.02})
+    fetch = FakeFetch(delay=0)
+    await cache.get(PORTFOLIO, None, fetch)
+    await asyncio.sleep(0.03)
+    assert await cache.get(PORTFOLIO, None, fetch) == {"call": 2}
+
+async def test_invalidation_drops_entries_and_in_flight_results():
+    cache = ReadCache({PORTFOLIO: 5})
+    fetch = FakeFetch()
+    first = asyncio.create_task(cache.get(PORTFOLIO, None, fetch))
+    await asyncio.sleep(0)
+    cache.invalidate(PORTFOLIO)
+    # A read after the account changed must not reuse the older in-flight request.
+    assert await cache.get(PORTFOLIO, None, fetch) == {"call": 2}
+    assert await first == {"call": 1}
+    assert await cache.get(PORTFOLIO, None, fetch) == {"call": 2}
+
+async def test_failed_reads_are_not_cached():
+    cache = ReadCache({PORTFOLIO: 5})
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        return None
+
+    assert await cache.get(PORTFOLIO, None, failing) is None
+    assert await cache.get(PORTFOLIO, None, failing) is None
+    assert len(calls) == 2
+
+def test_sync_reads_use_the_ttl():
+    cache = ReadCache({PORTFOLIO: 5})
+    calls = []
+    fetch = lambda: calls.append(1) or {"balance": 1}
+    assert cache.get_sync(PORTFOLIO, None, fetch) == {"balance": 1}
+    assert cache.get_sync(PORTFOLIO, None, fetch) == {"balance": 1}
+    assert len(calls) == 1
+
+def test_account_events():
+    assert is_account_event({"e": "ORDER_TRADE_UPDATE"})
+    assert is_account_event({"data": {"e": "ACCOUNT_UPDATE"}})
+    assert is_account_event({"order_id": "1", "status": "FILLED"})
+    assert not is_account_event({"e": "depthUpdate", "s": "BTCUSDT"})
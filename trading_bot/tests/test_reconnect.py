@@ -0,0 +1,100 @@
+import asyncio
+import json
+import time
+import pytest
+from websockets.exceptions import ConnectionClosedError
+from trading_bot.core.api_client import CoinSwitchProApiClient
+from trading_bot.core.reconnect import Backoff, RecentMessages, StreamHealth
+
+class FakeConnection:
+    def __init__(self, messages, error=None, delay=0):
+        self.messages = messages
+        self.error = error
+        self.delay = delay
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for message in self.messages:
+            await asyncio.sleep(self.delay)
+            yield json.dumps(message)
+        if self.error:
+            raise self.error
+        await asyncio.sleep(3600)
+
+def test_backoff_is_jittered_and_capped():
+    backoff = Backoff(0.025, 1.0, rng=lambda: 1.0)
+    assert [backoff.next() for _ in range(3)] == [0.025, 0.05, 0.1]
+    for _ in range(10):
+        backoff.next()
+    assert backoff.next() == 1.0
+    backoff.reset()
+    assert backoff.next() == 0.025
+    assert 0 <= Backoff(0.025).next() <= 0.025
+
+def test_stream_health_measures_outage_to_first_message():
+    health = StreamHealth()
+    assert health.message() is None
+    before = int(time.time() * 1000)
+    health.disconnected()
+    health.disconnected()
+    assert not health.connected
+    since = health.message()
+    assert since >= before
+    assert health.connected
+    assert health.stats()["reconnects"] == 1
+    assert health.stats()["p50_ms"] is not None
+
+def test_recent_messages_drop_duplicates():
+    recent = RecentMessages(size=2)
+    assert not recent.seen("a")
+    assert recent.seen("a")
+    recent.seen("b")
+    recent.seen("c")
+    assert not recent.seen("a")
+    assert recent.duplicates == 1
+
+def _client(connections):
+    client = CoinSwitchProApiClient()
+    client.listen_key = "key"
+    client.ws_connect = lambda url: connections.pop(0)
+    return client
+
+async def test_private_stream_reconnects_fast_and_backfills():
+    closed = ConnectionClosedError(None, None)
+    client = _client([FakeConnection([{"e": "first"}], error=closed),
+                      FakeConnection([{"e": "second"}])])
+    backfills = []
+
+    async def on_reconnect(since):
+        backfills.append(since)
+
+    reader = asyncio.create_task(client._read_private_stream(on_reconnect))
+    started = time.perf_counter()
+    while len(client.inbound) < 2 and time.perf_counter() - started < 1:
+        await asyncio.sleep(0.001)
+    reader.cancel()
+    await asyncio.gather(reader, return_exceptions=True)
+    assert [client.inbound.get_nowait()["e"] for _ in range(2)] == ["first", "second"]
+    assert len(backfills) == 1
+    stats = client.private_stream_health.stats()
+    assert stats["reconnects"] == 1
+    assert stats["p50_ms"] < 100
+
+async def test_standby_connection_drops_duplicates():
+    messages = [{"e": "ORDER_TRADE_UPDATE", "o": {"i": n, "X": "NEW"}} for n in range(3)]
+    client = _client([FakeConnection(messages, delay=0.001), FakeConnection(messages, delay=0.001)])
+    client.private_stream_standby = True
+    reader = asyncio.create_task(client._read_private_stream())
+    await asyncio.sleep(0.05)
+    reader.cancel()
+    await asyncio.gather(reader, return_exceptions=True)
+    assert len(client.inbound) == 3
+    assert client._recent_messages.duplicates == 3
@@ -0,0 +1,63 @@
+import json
+import pytest
+from trading_bot.core.recorder import PRIVATE, Recorder, read_records, segments
+from trading_bot.core.trading_engine import TradingEngine
+
+
+def _candle(minute, close):
+    return {"pair": "BTCUSDT_1", "data": {"symbol": "BTCUSDT", "interval": "1", "start_time": minute * 60_000,
+                                          "open": 100, "high": 110, "low": 90, "close": close, "volume": 1}}
+
+
+def test_records_round_trip_across_segments(tmp_path):
+    recorder = Recorder(tmp_path, segment_bytes=200, index_interval=0)
+    for i in range(20):
+        recorder.record("candles", _candle(i, 100 + i), received_ns=1_000 + i)
+    recorder.record(PRIVATE, '{"e": "ORDER_TRADE_UPDATE"}', received_ns=2_000)
+    recorder.close()
+
+    assert len(segments(tmp_path)) == recorder.segments > 1
+    records = list(read_records(tmp_path))
+    assert [received_ns for received_ns, _, _ in records] == [1_000 + i for i in range(20)] + [2_000]
+    assert json.loads(records[3][2]) == _candle(3, 103)
+    assert records[-1][1:] == (PRIVATE, b'{"e": "ORDER_TRADE_UPDATE"}')
+
+    window = list(read_records(tmp_path, start_ns=1_010, end_ns=1_014))
+    assert [received_ns for received_ns, _, _ in window] == [1_010, 1_011, 1_012, 1_013, 1_014]
+
+
+def test_truncated_record_ends_the_segment(tmp_path):
+    recorder = Recorder(tmp_path)
+    recorder.record("candles", _candle(0, 100), received_ns=1)
+    recorder.record("candles", _candle(1, 101), received_ns=2)
+    recorder.close()
+    path = segments(tmp_path)[0]
+    path.write_bytes(path.read_bytes()[:-5])
+    assert [received_ns for received_ns, _, _ in read_records(tmp_path)] == [1]
+
+
+class EveryBar:
+    def on_bar(self, bar, new_bar=True, symbol=None, interval=None):
+        return {"action": "BUY", "symbol": "BTCUSDT", "quantity": 1} if new_bar else None
+
+
+@pytest.mark.asyncio
+async def test_replay_feeds_recorded_frames_through_the_engine(tmp_path):
+    live = TradingEngine()
+    live.market_data.recorder = live.api_client.recorder = Recorder(tmp_path)
+    for minute in range(3):
+        for close in (100, 101):
+            live.market_data.dispatch("candles", _candle(minute, close))
+    live.api_client._on_private_message(json.dumps({"e": "ORDER_TRADE_UPDATE", "o": {
+        "i": "7", "s": "BTCUSDT", "S": "BUY", "o": "LIMIT", "p": 100, "q": 1, "z": 0, "X": "NEW"}}))
+    live.market_data.recorder.close()
+
+    engine = TradingEngine()
+    engine.strategy = EveryBar()
+    replayer = await engine.replay(tmp_path, speed=0)
+    assert replayer.frames == 7
+    assert len(replayer.signals) == 3
+    assert engine.executor.queue.qsize() == 0
+    buffer = engine.candles.get("BTCUSDT", "1")
+    assert len(buffer) == 3 and buffer.last()["close"] == 101
+    assert engine.account.open_orders("BTCUSDT")[0]["order_id"] == "7"
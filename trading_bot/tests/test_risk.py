@@ -0,0 +1,117 @@
+import asyncio
+import pytest
+from trading_bot.core.order_manager import OrderManager
+from trading_bot.core.risk import RiskEngine, RiskLimits
+from trading_bot.core.trading_engine import TradingEngine
+
+
+def _buy(quantity, symbol="BTCUSDT", price=100.0):
+    return {"action": "BUY", "symbol": symbol, "quantity": quantity, "price": price}
+
+
+def _account_update(wallet, quantity, symbol="BTCUSDT"):
+    return {"e": "ACCOUNT_UPDATE", "a": {"B": [{"a": "USDT", "wb": wallet}],
+                                         "P": [{"s": symbol, "pa": quantity, "ep": 100}]}}
+
+
+def test_each_limit_reports_its_name():
+    risk = RiskEngine(RiskLimits(max_order_quantity=5, max_order_notional=400, max_position_notional=600,
+                                 max_gross_notional=900, max_open_orders=10, max_open_orders_per_symbol=3))
+    assert risk.check(_buy(6)).startswith("max_order_quantity")
+    assert risk.check(_buy(5)).startswith("max_order_notional")
+    assert risk.check(_buy(4)) is None
+    assert risk.check(_buy(3)).startswith("max_position_notional")
+    assert risk.check({"action": "SELL", "symbol": "BTCUSDT", "quantity": 2, "price": 100}) is None
+    assert risk.check(_buy(2)) is None
+    assert risk.check(_buy(1)).startswith("max_open_orders_per_symbol")
+    assert risk.check(_buy(4, "ETHUSDT")).startswith("max_gross_notional")
+    assert risk.check(_buy(3, "ETHUSDT")) is None
+    assert risk.check({"action": "BUY", "symbol": "SOLUSDT", "quantity": 1}).startswith("no_price")
+    assert risk.check({"action": "BUY", "symbol": "SOLUSDT", "quantity": 0}).startswith("invalid")
+    assert risk.rejected["max_position_notional"] == 1
+    assert risk.gross == pytest.approx(900)
+
+
+def test_leverage_and_rate_limits():
+    risk = RiskEngine(RiskLimits(max_leverage=2, max_orders_per_second=2))
+    assert risk.check(_buy(1)).startswith("max_leverage: equity unknown")
+    risk.apply(_account_update(1_000, 0))
+    assert risk.equity == 1_000
+    assert risk.check(_buy(21)).startswith("max_leverage")
+    assert risk.check(_buy(10)) is None
+    assert risk.check(_buy(1)) is None
+    assert risk.check(_buy(1)).startswith("max_orders_per_second")
+
+
+def test_fills_and_cancels_move_the_counters():
+    class AckingClient:
+        async def create_order_async(self, *args, client_order_id=None, **kwargs):
+            return {"data": {"order_id": "1", "status": "NEW"}}
+
+    risk = RiskEngine(RiskLimits(max_position_notional=1_000, max_open_orders=1))
+    manager = OrderManager(AckingClient())
+    manager.listeners.append(risk.on_order)
+    assert risk.check(_buy(8)) is None
+    asyncio.run(manager.create_order_async("BTCUSDT", "BUY", 8, 100))
+    order = manager.get(order_id="1")
+    assert risk.check(_buy(1)).startswith("max_open_orders")
+
+    manager.apply({"e": "ORDER_TRADE_UPDATE", "o": {"i": "1", "s": "BTCUSDT", "z": 3, "X": "PARTIALLY_FILLED"}})
+    assert risk.positions["BTCUSDT"] == 3 and risk.open_buys["BTCUSDT"] == 5
+    manager.apply({"e": "ORDER_TRADE_UPDATE", "o": {"i": "1", "s": "BTCUSDT", "z": 3, "X": "CANCELED"}})
+    assert order.done and risk.open_buys["BTCUSDT"] == 0 and risk.total_open_orders == 0
+    risk.mark("BTCUSDT", 200)
+    assert risk.gross == pytest.approx(600)
+    assert risk.check(_buy(3, price=None)).startswith("max_position_notional")
+    risk.apply(_account_update(1_000, 1))
+    assert risk.check(_buy(3, price=None)) is None
+
+
+def test_engine_rejects_signals_before_queueing():
+    engine = TradingEngine()
+    engine.risk.limits.max_order_quantity = 1
+    assert engine.execute_trade(_buy(2)) is None
+    assert engine.executor.queue.qsize() == 0
+    assert engine.execute_trade(_buy(1)) is not None
+    assert engine.risk_stats()["rejected"] == {"max_order_quantity": 1}
+
+
+@pytest.mark.asyncio
+async def test_account_resync_reloads_risk_from_the_reconciled_orders():
+    class ExchangeClient:
+        def __init__(self):
+            self.open = []
+            self.ids = iter(range(1, 10))
+
+        async def create_order_async(self, symbol, side, quantity, price, *args, client_order_id=None, **kwargs):
+            return {"data": {"order_id": str(next(self.ids)), "status": "NEW"}}
+
+        async def get_balance_async(self, fresh=False):
+            return {"data": [{"currency": "USDT", "main_balance": "500"}]}
+
+        async def get_open_orders_async(self, params=None):
+            return {"data": {"orders": self.open}}
+
+        async def get_order_async(self, order_id, timeout=None):
+            return {"data": {"order_id": order_id, "status": "CANCELLED"}}
+
+    engine = TradingEngine()
+    client = engine.account.api_client = engine.orders.api_client = ExchangeClient()
+    engine.risk.limits.max_open_orders = 2
+    for symbol in ("BTCUSDT", "ETHUSDT"):
+        assert engine.risk.check(_buy(1, symbol)) is None
+        await engine.orders.create_order_async(symbol, "BUY", 1, 100)
+    engine.risk.set_position("BTCUSDT", 5)
+    assert engine.risk.check(_buy(1, "SOLUSDT")).startswith("max_open_orders")
+
+    # While the stream was down, order 1 went away and the BTCUSDT position was closed.
+    client.open = [{"order_id": "2", "symbol": "ETHUSDT", "side": "BUY", "quantity": 1, "status": "OPEN"}]
+    # A signal still waiting in the executor's queue keeps its reservation.
+    engine.executor.submit(_buy(2, "XRPUSDT"))
+    await engine.backfill_account(0)
+    risk = engine.risk
+    assert risk.equity == 500 and risk.positions["BTCUSDT"] == 0
+    assert risk.total_open_orders == 2 and risk.open_orders == {"ETHUSDT": 1, "XRPUSDT": 1}
+    assert risk.open_buys == {"ETHUSDT": 1.0, "XRPUSDT": 2.0} and risk.gross == pytest.approx(100)
+    engine.risk.limits.max_open_orders = 3
+    assert risk.check(_buy(1, "SOLUSDT")) is None
@@ -0,0 +1,60 @@
+import asyncio
+import time
+import pytest
+from trading_bot.benchmarks.fake_exchange import FakeExchange
+from trading_bot.core.shards import ShardSupervisor, plan_shards
+
+
+def test_pairs_are_split_by_symbol_and_shards_dealt_over_accounts():
+    pairs = ["ETHUSDT_1", "BTCUSDT_1", "SOLUSDT_1", "BTCUSDT_5", "XRPUSDT_1"]
+    specs = plan_shards(pairs, 2, accounts=[("k1", "s1"), ("k2", "s2")])
+    assert [spec.pairs for spec in specs] == [["BTCUSDT_1", "BTCUSDT_5", "SOLUSDT_1"], ["ETHUSDT_1", "XRPUSDT_1"]]
+    assert [(spec.account, spec.api_key) for spec in specs] == [(0, "k1"), (1, "k2")]
+    assert "s1" not in repr(specs[0])
+    assert len(plan_shards(pairs, 8)) == 4 and plan_shards([], 3)[0].pairs == []
+
+
+async def _until(condition, timeout=60):
+    deadline = time.monotonic() + timeout
+    while not await condition():
+        assert time.monotonic() < deadline
+        await asyncio.sleep(0.1)
+
+
+@pytest.mark.asyncio
+async def test_dead_shard_is_restarted_without_touching_the_others(tmp_path, monkeypatch):
+    exchange = FakeExchange(fill_delay=60)
+    await exchange.start()
+    # Shards are spawned processes: they read their settings from the environment.
+    for name, value in {"COINSWITCH_REST_URL": exchange.rest_url,
+                        "COINSWITCH_WS_URL": exchange.rest_url.replace("http://", "ws://"),
+                        "MARKET_DATA_URL": exchange.rest_url, "COINSWITCH_API_KEY": "test_key",
+                        "COINSWITCH_API_SECRET": "test_secret", "LOG_FILE": str(tmp_path / "bot.log"),
+                        "INSTRUMENTS_FILE": "", "KLINE_CACHE_DIR": str(tmp_path / "klines")}.items():
+        monkeypatch.setenv(name, value)
+    supervisor = ShardSupervisor(["BTCUSDT_1", "ETHUSDT_1", "SOLUSDT_1"], shards=2, restart_delay=0.05)
+    task = asyncio.create_task(supervisor.start())
+    try:
+        async def all_running():
+            return "not running" not in await supervisor.stats_report()
+
+        await _until(all_running)
+        assert await supervisor.get_balance() is not None
+        killed, other = supervisor.processes[0], supervisor.processes[1]
+        killed.kill()
+
+        async def restarted():
+            return supervisor.restarts[0] == 1 and await all_running()
+
+        await _until(restarted)
+        assert supervisor.processes[0] is not killed and supervisor.processes[1] is other
+        assert supervisor.restarts[1] == 0
+        report = await supervisor.stop(deadline=5)
+        await task
+    finally:
+        await supervisor.stop(deadline=1)
+        await exchange.stop()
+    assert "shard 0 (BTCUSDT, SOLUSDT): Shutdown took" in report.summary()
+    assert all(report.reports.values()) and supervisor.stopped.is_set()
+    assert not any(process.is_alive() for process in supervisor.processes.values())
+    assert (tmp_path / "bot.shard1.log").exists()
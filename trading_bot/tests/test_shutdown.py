@@ -0,0 +1,94 @@
+import asyncio
+import time
+import pytest
+from trading_bot.benchmarks.fake_exchange import FakeExchange
+from trading_bot.core.shutdown import ShutdownReport, cancel_open_orders
+from trading_bot.core.trading_engine import TradingEngine
+
+
+class FakeApiClient:
+    def __init__(self, open_orders, failing_symbols=(), stuck=()):
+        self.open_orders = dict(open_orders)
+        # Each of these symbols fails its first open-orders query.
+        self.failing_symbols = set(failing_symbols)
+        self.stuck = set(stuck)
+        self.active = self.peak = 0
+        self.calls = []
+
+    async def _call(self, name, result):
+        self.calls.append(name)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.02)
+        self.active -= 1
+        return result
+
+    async def get_open_orders_async(self, params=None, timeout=None):
+        symbol = params["symbol"]
+        if symbol in self.failing_symbols:
+            self.failing_symbols.discard(symbol)
+            return await self._call("open_orders", None)
+        orders = [order for order in self.open_orders.values() if order["symbol"] == symbol]
+        return await self._call("open_orders", {"data": {"orders": orders}})
+
+    async def cancel_order_async(self, order_id, timeout=None):
+        if order_id in self.stuck:
+            return await self._call("cancel", None)
+        self.open_orders.pop(order_id, None)
+        return await self._call("cancel", {"data": {}})
+
+
+def _order(order_id, symbol):
+    return {"order_id": order_id, "symbol": symbol, "status": "OPEN"}
+
+
+@pytest.mark.asyncio
+async def test_open_orders_are_queried_and_cancelled_concurrently():
+    orders = {str(i): _order(str(i), symbol) for i, symbol in enumerate(["BTCUSDT", "ETHUSDT", "SOLUSDT"] * 2)}
+    client = FakeApiClient(orders, failing_symbols={"SOLUSDT"})
+    # SOLUSDT is not a traded symbol, but the bot tracks an order on it.
+    report = await cancel_open_orders(client, ["BTCUSDT", "ETHUSDT"], {"2": orders["2"]}, ShutdownReport(),
+                                      time.monotonic() + 5)
+    assert report.queried_symbols == ["BTCUSDT", "ETHUSDT"]
+    # Order 5 is found once the failed SOLUSDT query is retried.
+    assert sorted(report.cancelled_orders) == ["0", "1", "2", "3", "4", "5"]
+    assert report.confirmed and not report.remaining and not client.open_orders
+    assert client.peak == 5 and client.calls.count("open_orders") == 9
+
+
+@pytest.mark.asyncio
+async def test_orders_left_at_the_deadline_are_reported():
+    client = FakeApiClient({"1": _order("1", "BTCUSDT")}, stuck={"1"})
+    start = time.monotonic()
+    report = await cancel_open_orders(client, ["BTCUSDT"], {}, ShutdownReport(), start + 0.3)
+    assert time.monotonic() - start < 0.5
+    assert list(report.remaining) == ["1"] and not report.confirmed
+    assert "Still open: 1 (BTCUSDT)" in report.finish().summary()
+
+
+@pytest.mark.asyncio
+async def test_engine_stop_cancels_orders_on_the_exchange():
+    exchange = FakeExchange(fill_delay=60)
+    await exchange.start()
+    engine = TradingEngine()
+    engine.api_client.api_key, engine.api_client.api_secret = "test_key", "test_secret"
+    engine.api_client.base_rest_url = exchange.rest_url
+    try:
+        await engine.executor.start()
+        for symbol in ("BTCUSDT", "ETHUSDT", "BTCUSDT"):
+            engine.execute_trade({"action": "BUY", "symbol": symbol, "quantity": 1, "price": 10})
+        while len(engine.executor.completed) < 3:
+            await asyncio.sleep(0.01)
+        assert sum(order["status"] == "OPEN" for order in exchange.orders.values()) == 3
+        assert not exchange.futures_orders
+
+        report = await engine.stop(deadline=5)
+        assert engine.execute_trade({"action": "SELL", "symbol": "BTCUSDT", "quantity": 1}) is None
+        assert await engine.stop() is report
+    finally:
+        await exchange.stop()
+    assert report.queried_symbols == ["BTCUSDT", "ETHUSDT"] and len(report.cancelled_orders) == 3
+    assert report.confirmed and not report.timed_out and report.elapsed < 5
+    assert engine.dropped_signals == 1
+    assert all(order["status"] == "CANCELLED" for order in exchange.orders.values())
+    assert engine.stopped.is_set()
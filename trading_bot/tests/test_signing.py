@@ -0,0 +1,41 @@
+import hashlib
+import hmac
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
+from trading_bot.core.signing import Ed25519Signer, HmacSigner, Signer
+
+@pytest.fixture
+def ed25519_key():
+    key = ed25519.Ed25519PrivateKey.generate()
+    raw = key.private_bytes(serialization.Encoding.Raw, serialization.PrivateFormat.Raw,
+                            serialization.NoEncryption())
+    return key, raw.hex()
+
+def test_hmac_signer_matches_fresh_hmac():
+    signer = HmacSigner("key", "secret")
+    for message in ("a", "b", "a"):
+        assert signer.sign(message) == hmac.new(b"secret", message.encode(), hashlib.sha256).hexdigest()
+
+def test_hmac_sign_request_headers():
+    signer = HmacSigner("key", "secret")
+    headers = signer.sign_request("POST", "/trade/api/v2/order", '{"a":1}', timestamp="1")
+    assert headers['x-api-key'] == "key"
+    assert headers['x-api-signature'] == signer.sign('1key{"a":1}')
+    assert signer.sign_request("POST", "/trade/api/v2/order", '{"a":1}', timestamp="1", request_id="r") == headers
+
+def test_signer_is_abstract():
+    with pytest.raises(TypeError):
+        Signer()
+
+def test_ed25519_signer_signature_verifies(ed25519_key):
+    key, secret_hex = ed25519_key
+    signer = Ed25519Signer("key", secret_hex)
+    headers = signer.sign_request("GET", "/trade/api/v2/ping", timestamp="1700000000000")
+    key.public_key().verify(bytes.fromhex(headers['X-AUTH-SIGNATURE']), b"GET/trade/api/v2/ping1700000000000")
+    assert headers['X-AUTH-APIKEY'] == "key"
+    assert headers['X-AUTH-EPOCH'] == "1700000000000"
+
+def test_ed25519_signer_rejects_invalid_key():
+    with pytest.raises(ValueError):
+        Ed25519Signer("key", "not-hex")
@@ -0,0 +1,102 @@
+import pytest
+from trading_bot.core.candle_store import CandleBuffer
+from trading_bot.core.strategy_pool import StrategyPool, discover_strategies
+
+DATAFRAME_STRATEGY = """
+def check_strategy(dataframe, symbol=None, interval=None):
+    return {'action': 'BUY', 'symbol': symbol or 'A', 'quantity': len(dataframe), 'close': float(dataframe['close'].iloc[-1])}
+"""
+
+STREAMING_STRATEGY = """
+bars_seen = 0
+
+def on_bar(bar, new_bar=True, symbol=None, interval=None):
+    global bars_seen
+    bars_seen += new_bar
+    return {'action': 'SELL', 'symbol': symbol or 'B', 'quantity': bars_seen, 'close': bar['close']}
+"""
+
+FAILING_STRATEGY = """
+def check_strategy(dataframe, symbol=None, interval=None):
+    raise RuntimeError("boom")
+"""
+
+CRASHING_STRATEGY = """
+import os
+
+def on_bar(bar, new_bar=True, symbol=None, interval=None):
+    if bar['close'] < 0:
+        os._exit(1)
+    return {'action': 'BUY', 'symbol': symbol or 'C', 'quantity': 1, 'close': bar['close']}
+"""
+
+@pytest.fixture
+def strategy_dir(tmp_path):
+    (tmp_path / "a_dataframe.py").write_text(DATAFRAME_STRATEGY)
+    (tmp_path / "b_streaming.py").write_text(STREAMING_STRATEGY)
+    (tmp_path / "c_failing.py").write_text(FAILING_STRATEGY)
+    (tmp_path / "_helpers.py").write_text("")
+    return tmp_path
+
+def test_discover_strategies(strategy_dir):
+    refs = discover_strategies(["trading_bot.strategies.strategy"], strategy_dir)
+    assert refs[0] == "trading_bot.strategies.strategy"
+    assert [ref.rsplit("/", 1)[-1] for ref in refs[1:]] == ["a_dataframe.py", "b_streaming.py", "c_failing.py"]
+
+def test_shared_buffer_is_visible_through_attach():
+    buffer = CandleBuffer(capacity=4, shared=True)
+    try:
+        buffer.append(1, 1, 2, 0, 1.5, 10)
+        reader = CandleBuffer.attach(buffer.shm.name, buffer.capacity, buffer.total)
+        assert reader.last() == buffer.last()
+        reader.close()
+    finally:
+        buffer.close()
+
+@pytest.mark.asyncio
+async def test_pool_evaluates_strategies_in_order(strategy_dir):
+    pool = StrategyPool(discover_strategies(directory=strategy_dir), workers=2)
+    buffer = CandleBuffer(capacity=10, shared=True)
+    try:
+        buffer.append(1, 1, 2, 0, 1.5, 10)
+        signals = await pool.evaluate(buffer, True)
+        assert signals == [
+            {'action': 'BUY', 'symbol': 'A', 'quantity': 1, 'close': 1.5},
+            {'action': 'SELL', 'symbol': 'B', 'quantity': 1, 'close': 1.5},
+        ]
+        buffer.append(2, 1, 2, 0, 1.7, 10)
+        buffer.update_last(1, 2, 0, 1.8, 10)
+        signals = await pool.evaluate(buffer, False, "ETHUSDT", "5")
+        # Streaming state survives between calls because strategies stay on their worker.
+        assert [signal['quantity'] for signal in signals] == [2, 1]
+        assert [signal['symbol'] for signal in signals] == ['ETHUSDT', 'ETHUSDT']
+        assert [signal['close'] for signal in signals] == [1.8, 1.8]
+        # History bars move the streaming state without producing signals.
+        await pool.update([({'close': 1.0}, True)] * 3, "ETHUSDT", "5")
+        signals = await pool.evaluate(buffer, False)
+        assert [signal['quantity'] for signal in signals] == [2, 4]
+    finally:
+        pool.close()
+        buffer.close()
+
+@pytest.mark.asyncio
+async def test_pool_restarts_a_worker_that_died(strategy_dir, tmp_path_factory):
+    crashing = tmp_path_factory.mktemp("crashing") / "crashing.py"
+    crashing.write_text(CRASHING_STRATEGY)
+    pool = StrategyPool([str(strategy_dir / "b_streaming.py"), str(crashing)], workers=2)
+    buffer = CandleBuffer(capacity=10, shared=True)
+    try:
+        buffer.append(1, 1, 2, 0, 1.5, 10)
+        assert len(await pool.evaluate(buffer, True)) == 2
+        buffer.append(2, 1, 2, 0, -1.0, 10)
+        # The dead worker's strategy gives no signal; the other one is untouched.
+        assert [signal['symbol'] for signal in await pool.evaluate(buffer, True)] == ['B']
+        buffer.append(3, 1, 2, 0, 1.6, 10)
+        assert [signal['symbol'] for signal in await pool.evaluate(buffer, True)] == ['B', 'C']
+    finally:
+        pool.close()
+        buffer.close()
+
+def test_pool_requires_strategies():
+    with pytest.raises(ValueError):
+        StrategyPool([])
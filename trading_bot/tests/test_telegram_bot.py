@@ -0,0 +1,52 @@
+import asyncio
+import time
+import pytest
+from trading_bot.core import telegram_bot
+from trading_bot.core.telegram_bot import TelegramBot
+
+
+class FakeMessage:
+    def __init__(self, replies):
+        self.replies = replies
+
+    async def reply_text(self, text, **kwargs):
+        self.replies.append((time.monotonic(), text))
+
+
+class FakeUpdate:
+    def __init__(self, replies):
+        self.message = FakeMessage(replies)
+
+
+class SlowEngine:
+    async def get_balance(self):
+        await asyncio.sleep(10)
+        return {"USDT": 1}
+
+    async def get_positions(self):
+        return {"BTCUSDT": {"quantity": 1}}
+
+    def stats_report(self):
+        return "stage  count"
+
+
+def test_setup_processes_updates_concurrently(monkeypatch):
+    monkeypatch.setattr(telegram_bot, "TELEGRAM_BOT_TOKEN", "123:ABC")
+    bot = TelegramBot(SlowEngine())
+    bot.setup()
+    assert bot.application.concurrent_updates == telegram_bot.TELEGRAM_CONCURRENT_UPDATES > 1
+
+
+@pytest.mark.asyncio
+async def test_slow_exchange_does_not_hold_up_other_commands(monkeypatch):
+    monkeypatch.setattr(telegram_bot, "TELEGRAM_REPLY_TIMEOUT", 0.2)
+    bot = TelegramBot(SlowEngine())
+    replies = []
+    start = time.monotonic()
+    await asyncio.gather(bot.balance(FakeUpdate(replies), None),
+                         bot.positions(FakeUpdate(replies), None),
+                         bot.stats(FakeUpdate(replies), None))
+    assert sorted(text for _, text in replies[:2]) == ["<pre>stage  count</pre>",
+                                                       "Positions: {'BTCUSDT': {'quantity': 1}}"]
+    assert replies[1][0] - start < 0.1
+    assert replies[2][1] == "Could not fetch balance." and replies[2][0] - start < 1
@@ -1,5 +1,7 @@
+import asyncio
+import pandas as pd
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from trading_bot.core.trading_engine import TradingEngine
 
 @pytest.fixture
@@ -14,15 +16,117 @@ def engine():
 def test_load_strategy(engine):
     assert engine.strategy is not None
 
+CANDLE_MESSAGE = {"symbol": "BTCUSDT", "interval": "5", "start_time": 1700000000000,
+                  "open": "100", "high": "110", "low": "90", "close": "105", "volume": "3"}
+
 @pytest.mark.asyncio
 async def test_handle_websocket_message(engine):
-    message = {"data": "test_message"}
-    await engine._handle_websocket_message(message)
-    engine.strategy.check_strategy.assert_called_once_with(message)
+    engine.strategy = MagicMock(spec=['check_strategy'])
+    engine.strategy.check_strategy.return_value = None
+    await engine._handle_websocket_message(CANDLE_MESSAGE)
+    engine.strategy.check_strategy.assert_called_once()
+    dataframe = engine.strategy.check_strategy.call_args.args[0]
+    assert engine.strategy.check_strategy.call_args.kwargs == {'symbol': 'BTCUSDT', 'interval': '5'}
+    assert isinstance(dataframe, pd.DataFrame)
+    assert dataframe['close'].tolist() == [105.0]
+
+@pytest.mark.asyncio
+async def test_handle_websocket_message_streaming_strategy(engine):
+    engine.strategy = MagicMock(spec=['check_strategy', 'on_bar'])
+    engine.strategy.on_bar.return_value = None
+    await engine._handle_websocket_message(CANDLE_MESSAGE)
+    await engine._handle_websocket_message({**CANDLE_MESSAGE, "close": "107"})
+    first, second = engine.strategy.on_bar.call_args_list
+    assert first.args[1] is True and first.kwargs == {'symbol': 'BTCUSDT', 'interval': '5'}
+    assert second.args[0]['close'] == 107.0 and second.args[1] is False
+    engine.strategy.check_strategy.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_handle_websocket_message_ignores_non_candles(engine):
+    await engine._handle_websocket_message({"data": "test_message"})
+    engine.strategy.check_strategy.assert_not_called()
+    engine.strategy.on_bar.assert_not_called()
 
 def test_execute_trade(engine):
     trade_signal = {'action': 'BUY', 'symbol': 'BTC-USDT', 'quantity': 0.01}
-    with patch.object(engine, 'api_client', new_callable=MagicMock) as mock_api_client:
+    with patch.object(engine.orders, 'api_client', new_callable=MagicMock) as mock_api_client:
         engine.execute_trade(trade_signal)
-        # We'll expand this test later to check the actual API call
-        assert mock_api_client.create_order.called == False # Not implemented yet
+        # Orders go out from the executor's workers, never from the caller.
+        mock_api_client.create_order.assert_not_called()
+        mock_api_client.create_order_async.assert_not_called()
+
+def test_execute_trade_queues_the_signal(engine):
+    trade_signal = {'action': 'BUY', 'symbol': 'BTC-USDT', 'quantity': 0.01}
+    order = engine.execute_trade(trade_signal)
+    assert order.signal == trade_signal
+    assert engine.executor.queue.qsize() == 1
+
+@pytest.mark.asyncio
+async def test_market_event_candles_reach_the_strategy(engine):
+    from trading_bot.core.market_data import MarketEvent
+    engine.strategy = MagicMock(spec=['check_strategy'])
+    engine.strategy.check_strategy.return_value = None
+    data = {"symbol": "BTCUSDT", "start_time": 1, "open": 1, "high": 2, "low": 0.5, "close": 1.5, "volume": 1}
+    await engine._handle_market_event(MarketEvent("candles", "BTCUSDT", "5", data, 0))
+    assert ("BTCUSDT", "5") in engine.candles
+    engine.strategy.check_strategy.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_backfill_candles_fills_the_outage_gap(engine, tmp_path):
+    from trading_bot.core.kline_cache import KlineCache
+    from trading_bot.core.market_data import EVENT_CANDLES
+    engine.strategy = MagicMock(spec=['check_strategy', 'on_bar'])
+    engine.kline_cache = KlineCache(tmp_path)
+    engine.kline_downloader = MagicMock(cache=engine.kline_cache)
+
+    async def download(symbol, interval, start):
+        times = [start + i * 300_000 for i in range(3)]
+        engine.kline_cache.write(symbol, interval, {'open_time': times, 'open': [1, 2, 3], 'high': [1, 2, 3],
+                                                    'low': [1, 2, 3], 'close': [1.5, 2.5, 3.5], 'volume': [1, 1, 1]})
+
+    engine.kline_downloader.download = download
+    engine.market_data.subscriptions.add((EVENT_CANDLES, "BTCUSDT_5"))
+    await engine._handle_websocket_message(CANDLE_MESSAGE)
+    await engine.backfill_candles(CANDLE_MESSAGE["start_time"])
+    buffer = engine.candles.get("BTCUSDT", "5")
+    assert buffer.column('close').tolist() == [1.5, 2.5, 3.5]
+    assert [call.args[1] for call in engine.strategy.on_bar.call_args_list] == [True, False, True, True]
+
+@pytest.mark.asyncio
+async def test_history_reaches_pooled_strategies(engine):
+    engine.strategy, engine.strategy_pool = None, MagicMock(update=AsyncMock())
+    times = [CANDLE_MESSAGE["start_time"] + i * 300_000 for i in range(3)]
+    await engine._load_history('BTCUSDT', '5', {'open_time': times, 'open': [1, 2, 3], 'high': [1, 2, 3],
+                                                'low': [1, 2, 3], 'close': [1, 2, 3], 'volume': [1, 1, 1]})
+    bars, symbol, interval = engine.strategy_pool.update.call_args.args
+    assert [(bar['close'], new_bar) for bar, new_bar in bars] == [(1, True), (2, True), (3, True)]
+    assert (symbol, interval) == ('BTCUSDT', '5')
+
+@pytest.mark.asyncio
+async def test_buffer_is_not_written_while_pooled_strategies_read_it(engine):
+    class SlowPool:
+        def __init__(self):
+            self.seen = []
+
+        async def evaluate(self, buffer, new_bar, symbol=None, interval=None):
+            before = buffer.total
+            await asyncio.sleep(0.05)
+            self.seen.append((before, buffer.total))
+            return []
+
+        async def update(self, bars, symbol=None, interval=None):
+            pass
+
+        def close(self):
+            pass
+
+    engine.strategy, engine.strategy_pool = None, SlowPool()
+    times = [CANDLE_MESSAGE["start_time"] + i * 300_000 for i in range(1, 4)]
+    history = engine._load_history('BTCUSDT', '5', {'open_time': times, 'open': [1, 2, 3], 'high': [1, 2, 3],
+                                                    'low': [1, 2, 3], 'close': [1, 2, 3], 'volume': [1, 1, 1]})
+    await asyncio.gather(engine._process_message(CANDLE_MESSAGE), history)
+    assert engine.strategy_pool.seen == [(1, 1)]
+    assert engine.candles.get('BTCUSDT', '5').total == 4
+    with patch.object(engine.candles, 'close', wraps=engine.candles.close) as close:
+        await engine._close()
+    close.assert_called_once()